@@ -160,6 +160,30 @@ class Classifier(MLPClassifier):
         self.hidden_layer_sizes = np.full((self.num_layers,), self.num_neurons, dtype=int)
         super().fit(x, y)
 
+    #export of the trained network for the production system
+    def export_weights(self, path: str):
+        """
+           Saves the weights and biases of the trained network in a NumPy .npz file, so that
+           the production system can classify without scikit-learn.
+
+           Args:
+               path: path of the .npz file.
+
+           Returns:
+               None
+        """
+        arrays = {
+            'activation': np.array(self.activation),
+            'out_activation': np.array(self.out_activation_),
+            'label_type': np.array(self._label_binarizer.y_type_),
+            'classes': np.asarray(self.classes_),
+            'feature_names': np.array(getattr(self, 'feature_names_in_', []), dtype=str)
+        }
+        for i, (coefs, intercepts) in enumerate(zip(self.coefs_, self.intercepts_)):
+            arrays[f'coefs_{i}'] = coefs
+            arrays[f'intercepts_{i}'] = intercepts
+        np.savez(path, **arrays)
+
     #curve to show in the learning report view
     def get_loss_curve(self):
         """Get the MSE vector.
@@ -14,6 +14,7 @@ from development_system.learning_set_receiver_and_classifier_sender import Learn
 from development_system.testing_orchestrator import TestingOrchestrator
 from development_system.training_orchestrator import TrainingOrchestrator
 from development_system.validation_orchestrator import ValidationOrchestrator
+from utility.http_client.http_client import HttpClient
 
 
 class DevelopmentSystemOrchestrator:
@@ -22,6 +23,8 @@ class DevelopmentSystemOrchestrator:
     def __init__(self):
         """Initialize the orchestrator."""
         ConfigurationParameters.load_configuration()
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(ConfigurationParameters.params.get("http_client") or {}))
         self.service = ConfigurationParameters.params['service_flag']
         self.json_handler = JsonValidatorReaderAndWriter()
         self.dev_mess_broker = LearningSetReceiverAndClassifierSender(host='0.0.0.0', port=5004)  # instance of DevelopmentSystemMessageBroker class
@@ -42,7 +45,7 @@ class DevelopmentSystemOrchestrator:
 
         if self.service:
             # start the server
-            self.dev_mess_broker.start_server()
+            self.dev_mess_broker.start_server(ConfigurationParameters.params.get("serving"))
 
         # loop for the non-stop-and-go execution
         while True:
@@ -140,7 +143,8 @@ class DevelopmentSystemOrchestrator:
                 # SEND CLASSIFIER
                 if self.service:
                     print("send classifier:")
-                    response = self.dev_mess_broker.send_classifier()
+                    # binary upload, in chunks of model_transfer.chunk_size bytes
+                    response = self.dev_mess_broker.send_classifier(**ConfigurationParameters.params.get("model_transfer", {}))
                     print("Response from Module Production System:", response)
                     user_responses["TestOK"] = 2    #2 for sending timestamp
 
@@ -74,6 +74,9 @@ class JsonValidatorReaderAndWriter:
             params["overfitting_tolerance"] = tolerance.get('overfitting_tolerance')
             params["generalization_tolerance"] = tolerance.get('generalization_tolerance')
             params["service_flag"] = file_content.get('service_flag')
+            params["serving"] = file_content.get('serving')
+            params["http_client"] = file_content.get('http_client')
+            params["model_transfer"] = file_content.get('model_transfer', {})
 
             return params
 
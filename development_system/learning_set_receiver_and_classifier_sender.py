@@ -5,15 +5,21 @@ Represents the class to send and receive data.
 Author: Gabriele Pianigiani
 
 """
+import gzip
+import hashlib
 import json
+import os
+import shutil
 
 from flask import Flask, request, jsonify
-import threading
 import requests
 from queue import Queue
 from typing import Optional, Dict
 
 from development_system.json_validator_reader_and_writer import JsonValidatorReaderAndWriter
+from utility.http_client.headers import SENDER_PORT_HEADER, MODEL_ENCODING_HEADER, CLASSIFIER_CONTENT_TYPE
+from utility.http_client.http_client import HttpClient
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class LearningSetReceiverAndClassifierSender:
@@ -31,6 +37,8 @@ class LearningSetReceiverAndClassifierSender:
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
         self.json_handler = JsonValidatorReaderAndWriter()
         # Queue to hold received messages
         self.message_queue = Queue()
@@ -52,32 +60,39 @@ class LearningSetReceiverAndClassifierSender:
 
             return jsonify("Development System: learning set received"), 200
 
-    def start_server(self):
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
-    def send_classifier(self, test=False) -> Optional[Dict]:
+    def send_classifier(self, test=False, chunk_size: int = 1024 * 1024, compress: bool = False,
+                        max_retries: int = 3) -> Optional[Dict]:
         """
         Send the winner classifier to the target module production system.
         :param test: Boolean which is True only to test the function locally
+        :param chunk_size: Size (in bytes) of each chunk of the upload.
+        :param compress: Whether to compress the classifier with gzip before the upload.
+        :param max_retries: Number of times a failed chunk is sent again, resuming from the bytes already received.
         :return: The response from the target, if any.
         """
         # Retrieve ip address and port of the target system
         if not test:
-            classifier_file = "data/classifier.sav"
+            # the weights of the network: production classifies with a NumPy forward pass
+            classifier_file = "data/classifier.npz"
             self.json_handler.validate_json("conf/netconf.json", "schemas/netconf_schema.json")
             endpoint = self.json_handler.get_system_address("conf/netconf.json", "Production System")
 
-            target_ip = endpoint["ip"]
-            target_port = endpoint["port"]
-        else:
-            #this is true only for the local testing
-            classifier_file = "data/mock_classifier.json"
-            target_ip = "127.0.0.1"
-            target_port = 5001
+            return self.upload_classifier(classifier_file, endpoint["ip"], endpoint["port"],
+                                          chunk_size, compress, max_retries)
+
+        #this is true only for the local testing: the mock classifier is sent as a JSON message
+        classifier_file = "data/mock_classifier.json"
+        target_ip = "127.0.0.1"
+        target_port = 5001
 
         with open(classifier_file, "rb") as f:
             file_content = f.read()
@@ -89,7 +104,7 @@ class LearningSetReceiverAndClassifierSender:
             "message": message
         }
         try:
-            response = requests.post(url, json=payload)
+            response = self.http_client.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
@@ -98,6 +113,99 @@ class LearningSetReceiverAndClassifierSender:
             print(f"Error processing file: {e}")
         return None
 
+    def upload_classifier(self, classifier_file: str, target_ip: str, target_port: int,
+                          chunk_size: int = 1024 * 1024, compress: bool = False,
+                          max_retries: int = 3) -> Optional[Dict]:
+        """
+        Upload a classifier file in binary format to the /classifier route of the production system.
+        The file is sent in chunks read from disk, identified by its SHA-256: after an error the upload
+        resumes from the bytes already received by the production system.
+        :param classifier_file: Path of the classifier to upload.
+        :param target_ip: The IP address of the production system.
+        :param target_port: The port of the production system.
+        :param chunk_size: Size (in bytes) of each chunk.
+        :param compress: Whether to compress the classifier with gzip before the upload.
+        :param max_retries: Number of times a failed chunk is sent again.
+        :return: The response of the production system to the last chunk, None if the upload failed.
+        """
+        try:
+            digest = hashlib.sha256()
+            with open(classifier_file, "rb") as f:
+                for block in iter(lambda: f.read(chunk_size), b""):
+                    digest.update(block)
+            sha256 = digest.hexdigest()
+
+            upload_file = classifier_file
+            if compress:
+                upload_file = classifier_file + ".gz"
+                with open(classifier_file, "rb") as source, gzip.open(upload_file, "wb") as target:
+                    shutil.copyfileobj(source, target, chunk_size)
+            total = os.path.getsize(upload_file)
+        except IOError as e:
+            print(f"Error processing file: {e}")
+            return None
+
+        url = f"http://{target_ip}:{target_port}/classifier/{sha256}"
+        headers = {
+            "Content-Type": CLASSIFIER_CONTENT_TYPE,
+            SENDER_PORT_HEADER: str(self.port),
+            MODEL_ENCODING_HEADER: "gzip" if compress else "identity"
+        }
+
+        try:
+            # an interrupted upload of the same classifier is resumed
+            offset = self._uploaded_bytes(url)
+            retries = 0
+            with open(upload_file, "rb") as f:
+                while True:
+                    if offset >= total:
+                        # the production system already has the whole classifier (e.g. the response
+                        # to the last chunk was lost): it is not sent again
+                        return {"status": "received", "received": offset}
+                    f.seek(offset)
+                    chunk = f.read(chunk_size)
+                    last = offset + len(chunk) - 1
+                    response = None
+                    try:
+                        response = self.http_client.put(url, data=chunk, headers={
+                            **headers, "Content-Range": f"bytes {offset}-{last}/{total}"})
+                    except requests.RequestException as e:
+                        print(f"Error sending classifier chunk: {e}")
+
+                    if response is not None and response.status_code == 200:
+                        if last + 1 >= total:
+                            return response.json()
+                        offset = last + 1
+                        retries = 0
+                        continue
+
+                    if response is not None and response.status_code not in (409, 500, 502, 503, 504):
+                        print(f"Classifier refused by the production system: {response.status_code} {response.text}")
+                        return None
+
+                    retries += 1
+                    if retries > max_retries:
+                        print("Classifier upload failed")
+                        return None
+                    offset = self._uploaded_bytes(url)
+        finally:
+            if compress:
+                os.remove(upload_file)
+
+    def _uploaded_bytes(self, url: str) -> int:
+        """
+        Ask the production system how many bytes of a classifier it has received.
+        :param url: The URL of the classifier on the production system.
+        :return: The number of bytes received, 0 if unknown.
+        """
+        try:
+            response = self.http_client.get(url)
+            if response.status_code == 200:
+                return response.json()["received"]
+        except requests.RequestException as e:
+            print(f"Error reading the classifier upload: {e}")
+        return 0
+
     def send_configuration(self, test=False) -> Optional[Dict]:
         """
         Send the configuration to the target module messaging system.
@@ -124,7 +232,7 @@ class LearningSetReceiverAndClassifierSender:
             "message": restart_config
         }
         try:
-            response = requests.post(url, json=payload)
+            response = self.http_client.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
@@ -170,7 +278,7 @@ class LearningSetReceiverAndClassifierSender:
         }
 
         try:
-            response = requests.post(url, json=packet)
+            response = self.http_client.post(url, json=packet)
             if response.status_code == 200:
                 return True
         except requests.RequestException as e:
@@ -83,6 +83,8 @@ class TestingOrchestrator:
 
         # save winner network (we have to save again it because, now the test_error is updated)
         joblib.dump(self.winner_network, "data/classifier.sav")
+        # weights of the winner network, sent to the production system
+        self.winner_network.export_weights("data/classifier.npz")
 
         # CHECK TEST RESULT
         self.test_report_view.show_test_report(self.test_report)
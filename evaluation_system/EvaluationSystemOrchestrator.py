@@ -12,6 +12,8 @@ from evaluation_system.EvaluationSystemParameters import EvaluationSystemParamet
 from evaluation_system.LabelReceiver_and_ConfigurationSender import LabelReceiver_and_ConfigurationSender
 from evaluation_system.LabelsBuffer import LabelsBuffer
 from evaluation_system.EvaluationReportModel import EvaluationReportModel
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import Tracer
 
 
 class EvaluationSystemOrchestrator:
@@ -29,8 +31,13 @@ class EvaluationSystemOrchestrator:
         self.basedir = basedir
 
         EvaluationSystemParameters.loadParameters(self.basedir)
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(EvaluationSystemParameters.LOCAL_PARAMETERS.get("http_client") or {}))
         self.service = EvaluationSystemParameters.LOCAL_PARAMETERS["service"]
 
+        # spans of the labels received, reported to the Service Class if tracing is enabled
+        Tracer.configure("Evaluation System", EvaluationSystemParameters.LOCAL_PARAMETERS.get("tracing"))
+
         self.labels_buffer = LabelsBuffer()
         self.labelReceiver_and_configurationSender = LabelReceiver_and_ConfigurationSender(basedir=self.basedir)
         self.evaluation_report_model = EvaluationReportModel(self.basedir)
@@ -66,7 +73,7 @@ class EvaluationSystemOrchestrator:
 
         print("Evaluation System Orchestrator started.")
 
-        self.labelReceiver_and_configurationSender.start_server()
+        self.labelReceiver_and_configurationSender.start_server(EvaluationSystemParameters.LOCAL_PARAMETERS.get("serving"))
 
         while True:
             classifier_evaluation_exists, classifier_evaluation = self._get_classifier_evaluation()
@@ -6,13 +6,17 @@ Author: Giovanni Ligato
 from typing import Optional, Dict
 import json
 import queue
-import threading
+import time
 import requests
 import jsonschema
 from flask import Flask, request, jsonify
 
 from evaluation_system.EvaluationSystemParameters import EvaluationSystemParameters
 from evaluation_system.Label import Label
+from utility.http_client.http_client import HttpClient
+from utility.json_handler.schema_registry import SchemaRegistry
+from utility.tracing.tracer import Tracer, TRACE_HEADER
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class LabelReceiver_and_ConfigurationSender:
@@ -35,6 +39,8 @@ class LabelReceiver_and_ConfigurationSender:
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
         # Queue to store received labels
         self.label_queue = queue.Queue()
 
@@ -45,6 +51,8 @@ class LabelReceiver_and_ConfigurationSender:
         @self.app.route('/send', methods=['POST'])
         def receive_label():
 
+            received = time.time()
+
             # Get the sender's IP
             sender_ip = request.remote_addr
 
@@ -70,17 +78,22 @@ class LabelReceiver_and_ConfigurationSender:
                 label = Label(uuid=json_label['uuid'], movements=json_label['movements'], expert=expert)
                 self.label_queue.put(label)
 
+                # The Evaluation System is the last hop of the session
+                Tracer.get_instance().record(json_label['uuid'], request.headers.get(TRACE_HEADER), received)
+
                 return jsonify({"status": "received"}), 200
             else:
                 # JSON label is invalid
                 return jsonify({"status": "error", "message": "Invalid JSON label"}), 400
 
-    def start_server(self):
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
     def _validate_json_label(self, json_label: Dict) -> bool:
         """
@@ -89,11 +102,9 @@ class LabelReceiver_and_ConfigurationSender:
         :param json_label: The JSON label to validate.
         """
 
-        with open(self.label_schema_path, "r") as schema_file:
-            label_schema = json.load(schema_file)
-
         try:
-            jsonschema.validate(json_label, label_schema)
+            # the schema is read and compiled once, not on every label
+            SchemaRegistry.get_instance().validate(json_label, self.label_schema_path)
             return True
         except jsonschema.ValidationError as e:
             print(f"Invalid JSON label: {e}")
@@ -120,7 +131,7 @@ class LabelReceiver_and_ConfigurationSender:
                 "message": json.dumps(configuration)
             }
 
-            response = requests.post(url, json=packet)
+            response = self.http_client.post(url, json=packet)
             if response.status_code == 200:
                 return True
         except requests.RequestException as e:
@@ -162,7 +173,7 @@ class LabelReceiver_and_ConfigurationSender:
                 "message": json.dumps(timestamp_message)
             }
 
-            response = requests.post(url, json=packet)
+            response = self.http_client.post(url, json=packet)
             if response.status_code == 200:
                 return True
         except requests.RequestException as e:
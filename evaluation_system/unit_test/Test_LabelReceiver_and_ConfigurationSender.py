@@ -5,6 +5,7 @@ import jsonschema
 from evaluation_system.LabelReceiver_and_ConfigurationSender import LabelReceiver_and_ConfigurationSender
 from evaluation_system.EvaluationSystemParameters import EvaluationSystemParameters
 from evaluation_system.Label import Label
+from utility.http_client.http_client import HttpClient
 
 class TestLabelReceiverAndConfigurationSender(unittest.TestCase):
 
@@ -15,7 +16,7 @@ class TestLabelReceiverAndConfigurationSender(unittest.TestCase):
         EvaluationSystemParameters.loadParameters("..")
         cls.app = LabelReceiver_and_ConfigurationSender(host="127.0.0.1", port=5000, basedir="..")
 
-    @patch('requests.post')
+    @patch.object(HttpClient, 'post')
     def test_send_configuration_success(self, mock_post):
         """Test if the send_configuration method successfully sends the configuration"""
         mock_response = MagicMock()
@@ -26,7 +27,7 @@ class TestLabelReceiverAndConfigurationSender(unittest.TestCase):
         self.assertTrue(result)
         mock_post.assert_called_once()
 
-    @patch('requests.post')
+    @patch.object(HttpClient, 'post')
     def test_send_configuration_failure(self, mock_post):
         """Test if the send_configuration method fails to send the configuration"""
         mock_response = MagicMock()
@@ -37,7 +38,7 @@ class TestLabelReceiverAndConfigurationSender(unittest.TestCase):
         self.assertFalse(result)
         mock_post.assert_called_once()
 
-    @patch('requests.post')
+    @patch.object(HttpClient, 'post')
     def test_send_timestamp_success(self, mock_post):
         """Test if the send_timestamp method successfully sends the timestamp"""
         mock_response = MagicMock()
@@ -50,7 +51,7 @@ class TestLabelReceiverAndConfigurationSender(unittest.TestCase):
         self.assertTrue(result)
         mock_post.assert_called_once()
 
-    @patch('requests.post')
+    @patch.object(HttpClient, 'post')
     def test_send_timestamp_failure(self, mock_post):
         """Test if the send_timestamp method fails to send the timestamp"""
         mock_response = MagicMock()
@@ -180,7 +181,7 @@ class TestLabelReceiverAndConfigurationSender(unittest.TestCase):
                 self.assertEqual(response.status_code, 400)
                 self.assertEqual(response.json, {"status": "error", "message": "Invalid sender IP"})
 
-    @patch('requests.post')
+    @patch.object(HttpClient, 'post')
     def test_receive_label_expert(self, mock_post):
         """Test if the /send route correctly identifies an expert label"""
         valid_json_label = {
@@ -1,19 +1,25 @@
 """
 Author: Francesco Taverna
 """
-import contextlib
 import os
-import sqlite3
 
 from ingestion_system import DATABASE_FOLDER_PATH, DATABASE_FILE_PATH
+from utility.database.sqlite_connection_pool import SQLiteConnectionPool
 
 
 class DatabaseManager:
     """
     Class responsible for handling low-level database operations.
+
+    Each thread keeps its own long-lived connection (see SQLiteConnectionPool), in WAL mode by default.
     """
 
-    def __init__(self):
+    def __init__(self, journal_mode: str = "WAL", synchronous: str = "NORMAL", cache_size: int = -8000):
+        """
+        :param journal_mode: SQLite journal mode.
+        :param synchronous: SQLite synchronous mode (NORMAL: no fsync on each commit in WAL mode).
+        :param cache_size: page cache of each connection, in pages if positive or in KiB if negative.
+        """
 
         # create report folder
         try:
@@ -21,10 +27,9 @@ class DatabaseManager:
         except FileExistsError:
             pass
 
-        # flush it if already exists
-        except FileExistsError:
-            for file in os.listdir(DATABASE_FOLDER_PATH):
-                os.remove(DATABASE_FOLDER_PATH + file)
+        # connections to the database, opened on first use
+        self._pool = SQLiteConnectionPool(DATABASE_FILE_PATH, journal_mode=journal_mode,
+                                          synchronous=synchronous, cache_size=cache_size)
 
         #create database
         self.__create_database()
@@ -35,10 +40,8 @@ class DatabaseManager:
 
         """
 
-        if not os.path.exists(DATABASE_FILE_PATH):
-            #create IngestionSystem.db file
-            conn = sqlite3.connect(DATABASE_FILE_PATH)
-            conn.close()
+        #create IngestionSystem.db file (and set its journal mode)
+        self._pool.connection()
 
     def __execute_commit_query(self, query: str, values: tuple = None):
         """
@@ -47,20 +50,8 @@ class DatabaseManager:
         :param query: SQL query to execute.
         :param values: Tuple of values to substitute in the query (optional).
         """
-
-        # Connect to the database
-        #after with block, the connection is closed
-        with contextlib.closing(sqlite3.connect(DATABASE_FILE_PATH)) as conn:
-            # after with block, the cursor is closed
-            with contextlib.closing(conn.cursor()) as cursor:
-                # Execute the query with optional parameter substitution
-                if values is not None:
-                    #values will substitute ? query placeholder
-                    cursor.execute(query, values)
-                else:
-                    cursor.execute(query)
-                # Commit the transaction
-                conn.commit()
+        #values will substitute ? query placeholder
+        self._pool.execute(query, values)
 
     def perform_query(self, operation_type, query: str, values: tuple = None):
         """
@@ -77,17 +68,38 @@ class DatabaseManager:
             raise ValueError("Values must be a tuple or None.")
 
         if operation_type == 'select':
-            with contextlib.closing(sqlite3.connect(DATABASE_FILE_PATH)) as conn:
-                with contextlib.closing(conn.cursor()) as cursor:
-                    if values is not None:
-                        cursor.execute(query, values)
-                    else:
-                        cursor.execute(query)
-                    return cursor.fetchall() #tuple list returned
+            return self._pool.fetch_all(query, values) #tuple list returned
         else:
             self.__execute_commit_query(query, values)
             return True #query successfull
 
+    def perform_many(self, operation_type, query: str, values_list: list):
+        """
+        Perform a query once for each tuple of values, in a single transaction.
+
+        :param operation_type: Type of the operation ('insert', 'delete', 'update').
+        :param query: SQL query to execute.
+        :param values_list: List of tuples of values to substitute in the query.
+        """
+        if operation_type not in ['insert', 'delete', 'update']:
+            raise ValueError("Invalid operation type. Supported types: 'insert', 'delete', 'update'.")
+
+        if not all(isinstance(values, tuple) for values in values_list):
+            raise ValueError("Values must be tuples.")
+
+        self._pool.execute_many(query, values_list)
+        return True #query successfull
+
+    def perform_transaction(self, queries: list):
+        """
+        Execute several queries in a single transaction (one commit).
+
+        :param queries: List of (query, values) tuples, values is a tuple or None.
+        """
+        # the transaction is rolled back if a query fails
+        self._pool.execute_transaction(queries)
+        return True
+
     def create_table(self, query: str):
         """
         Create a table in the database.
@@ -108,8 +120,8 @@ class DatabaseManager:
         """
         Drop the entire database.
         """
-        if os.path.exists(DATABASE_FILE_PATH):
-            os.remove(DATABASE_FILE_PATH)
+        # the connections are closed before removing the files, they are reopened by the next query
+        self._pool.remove_database()
 
     def get_database_path(self):
         """
@@ -6,15 +6,20 @@ Author: Francesco Taverna
 
 """
 import json
+from collections import deque
 
 from flask import Flask, request, jsonify
-import threading
 import requests
 from queue import Queue, Empty
 from typing import Optional, Dict
 
 from ingestion_system import RECORD_SCHEMA_FILE_PATH
 from ingestion_system.ingestion_json_handler.json_handler import JsonHandler
+from ingestion_system.raw_session import RawSession
+from utility.http_client.headers import SENDER_PORT_HEADER, RAW_SESSION_CONTENT_TYPE, RECORD_STREAM_CONTENT_TYPE
+from utility.http_client.http_client import HttpClient
+from utility.json_handler.schema_registry import SchemaRegistry
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class SessionAndRecordExchanger:
@@ -23,19 +28,28 @@ class SessionAndRecordExchanger:
 
     This class supports sending and receiving messages using a thread-safe queue.
     """
-    def __init__(self, host: str = '0.0.0.0', port: int = 5000):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5000, max_batch_records: int = 1000):
         """
         Initialize the Flask communication server.
 
         :param host: The host address for the Flask server.
         :param port: The port number for the Flask server.
+        :param max_batch_records: Maximum number of records accepted by a single /send_batch request.
         """
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        self.max_batch_records = max_batch_records
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
 
         # Thread-safe queue for received messages
         self.message_queue = Queue()
+        # records of the last received batch not returned yet by get_message
+        self.batch_records = deque()
+
+        # targets that do not accept binary raw sessions, they receive JSON
+        self.json_only_targets = set()
 
         # Define a route to receive messages
         @self.app.route('/send', methods=['POST'])
@@ -57,20 +71,69 @@ class SessionAndRecordExchanger:
 
             return jsonify({"status": "received"}), 200
 
-    def start_server(self):
+        # Define a route to receive several records in a single request
+        @self.app.route('/send_batch', methods=['POST'])
+        def receive_batch():
+            try:
+                records = self._parse_batch()
+            except ValueError as e:
+                return jsonify({"error": f"Invalid batch format: {e}"}), 400
+
+            if not records:
+                return jsonify({"error": "Empty batch"}), 400
+            if len(records) > self.max_batch_records:
+                return jsonify({"error": f"Too many records, the maximum is {self.max_batch_records}"}), 413
+
+            # the whole batch is validated before enqueuing anything
+            record_schema = SchemaRegistry.get_instance().get_schema(RECORD_SCHEMA_FILE_PATH)
+            invalid = [index for index, record in enumerate(records) if not record_schema.is_valid(record)]
+            if invalid:
+                return jsonify({"error": "Invalid records", "invalid": invalid}), 400
+
+            # a single item of the queue: the records are not interleaved with other messages
+            self.message_queue.put({
+                'ip': request.remote_addr,
+                'port': request.headers.get(SENDER_PORT_HEADER),
+                'records': records
+            })
+
+            return jsonify({"status": "received", "records": len(records)}), 200
+
+    @staticmethod
+    def _parse_batch() -> list:
+        """
+        Read the records of a /send_batch request: a JSON array, or one JSON record per line
+        if the content type is RECORD_STREAM_CONTENT_TYPE.
+
+        :return: The list of records.
+        :raises ValueError: If the body is not a JSON array or a stream of JSON records.
+        """
+        if request.mimetype == RECORD_STREAM_CONTENT_TYPE:
+            return [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+
+        records = json.loads(request.get_data(as_text=True))
+        if not isinstance(records, list):
+            raise ValueError("expected a JSON array of records")
+        return records
+
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
-    def send_message(self, target_ip: str, target_port: int, message) -> Optional[Dict]:
+    def send_message(self, target_ip: str, target_port: int, message,
+                     headers: Optional[Dict] = None) -> Optional[Dict]:
         """
         Send a message to a target module.
 
         :param target_ip: The IP address of the target module.
         :param target_port: The port of the target module.
         :param message: The message to send (typically a JSON string).
+        :param headers: Additional HTTP headers (e.g. the trace context).
         :return: The response from the target, if any.
         """
         url = f"http://{target_ip}:{target_port}/send"
@@ -79,22 +142,64 @@ class SessionAndRecordExchanger:
             "message": message
         }
         try:
-            response = requests.post(url, json=payload, timeout=5)
+            response = self.http_client.post(url, json=payload, headers=headers)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
             print(f"Error sending message: {e}")
         return None
 
+    def send_raw_session(self, target_ip: str, target_port: int, raw_session: RawSession,
+                         binary: bool = True, headers: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Send a raw session to a target module, in binary format if the target supports it, in JSON otherwise.
+
+        :param target_ip: The IP address of the target module.
+        :param target_port: The port of the target module.
+        :param raw_session: The raw session to send.
+        :param binary: True to try the binary format first, False to send JSON.
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from the target, if any.
+        """
+        if binary and (target_ip, target_port) not in self.json_only_targets:
+            url = f"http://{target_ip}:{target_port}/send"
+            binary_headers = {
+                **(headers or {}),
+                "Content-Type": RAW_SESSION_CONTENT_TYPE,
+                SENDER_PORT_HEADER: str(self.port)
+            }
+            try:
+                response = self.http_client.post(url, data=raw_session.to_bytes(), headers=binary_headers)
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code != 415:
+                    return None
+                # 415 Unsupported Media Type: the target only accepts JSON
+                print(f"{target_ip}:{target_port} does not accept binary raw sessions, sending JSON")
+                self.json_only_targets.add((target_ip, target_port))
+            except requests.RequestException as e:
+                print(f"Error sending message: {e}")
+                return None
+
+        return self.send_message(target_ip, target_port, raw_session.to_json(), headers)
+
     def get_message(self, timeout: Optional[float] = None) :
         """
         Retrieve a message from the queue, blocking if necessary.
+        Records received in a batch are returned one at a time, they were already validated by /send_batch.
+        Only one thread (the orchestrator) is expected to call this method.
 
         :param timeout: Maximum time to wait for a message (in seconds). None means wait indefinitely.
-        :return: A dictionary containing the sender's IP, port, and the message content, or None if timed out.
+        :return: A tuple (is_invalid, record), or None if timed out.
         """
+        if self.batch_records:
+            return False, self.batch_records.popleft()
         try:
             message = self.message_queue.get(timeout=timeout, block=True)
+            if 'records' in message:
+                self.batch_records.extend(message['records'])
+                return False, self.batch_records.popleft()
+
             record_message = message['message']  # json
             handler = JsonHandler()
             new_record = json.loads(record_message)  # dictionary
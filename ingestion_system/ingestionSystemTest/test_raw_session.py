@@ -0,0 +1,72 @@
+"""
+Module: test_raw_session
+Test the raw session representation of the ingestion system.
+Author: Francesco Taverna
+
+"""
+
+import json
+import math
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+from ingestion_system.SessionAndRecordExchanger import SessionAndRecordExchanger
+from utility.http_client.headers import RAW_SESSION_CONTENT_TYPE
+from ingestion_system.raw_session import RawSession
+from ingestion_system.raw_session_preparation import RawSessionPreparation
+from utility.http_client.http_client import HttpClient
+
+
+def _records():
+    return ["a923-45b7-gh12-166", "slippery", "move", [1.5, float("nan"), -2.0, float("nan")], "shopping"]
+
+
+def test_mark_missing_samples():
+    preparation = RawSessionPreparation()
+    raw_session = preparation.create_raw_session(_records())
+
+    missing_samples, marked_raw_session = preparation.mark_missing_samples(raw_session, None)
+
+    assert missing_samples == 2
+    assert json.loads(marked_raw_session.to_json())["eeg_data"] == [1.5, None, -2.0, None]
+
+
+def test_binary_round_trip():
+    raw_session = RawSessionPreparation().create_raw_session(_records())
+
+    decoded = RawSession.from_bytes(raw_session.to_bytes())
+
+    assert decoded.uuid == raw_session.uuid
+    assert decoded.environment == raw_session.environment
+    assert decoded.label == raw_session.label
+    assert decoded.activity == raw_session.activity
+    assert decoded.eeg_data.dtype == np.float64
+    assert decoded.eeg_data[0] == 1.5 and math.isnan(decoded.eeg_data[1])
+
+
+def test_float32_buffer():
+    raw_session = RawSession("a923-45b7-gh12-166", "plain", [0.25, None], "sport", dtype=np.float32)
+
+    decoded = RawSession.from_bytes(raw_session.to_bytes())
+
+    assert decoded.eeg_data.dtype == np.float32
+    assert decoded.eeg_data_to_list() == [0.25, None]
+
+
+@patch.object(HttpClient, 'post')
+def test_send_raw_session_falls_back_to_json(mock_post):
+    unsupported = MagicMock(status_code=415)
+    received = MagicMock(status_code=200)
+    received.json.return_value = {"status": "received"}
+    mock_post.side_effect = [unsupported, received, received]
+    exchanger = SessionAndRecordExchanger(host='127.0.0.1', port=5001)
+    raw_session = RawSessionPreparation().create_raw_session(_records())
+
+    exchanger.send_raw_session('127.0.0.1', 5002, raw_session)
+    exchanger.send_raw_session('127.0.0.1', 5002, raw_session)
+
+    assert mock_post.call_args_list[0].kwargs["headers"]["Content-Type"] == RAW_SESSION_CONTENT_TYPE
+    # after the 415 response only JSON is sent to the same target
+    for call in mock_post.call_args_list[1:]:
+        assert json.loads(call.kwargs["json"]["message"])["uuid"] == raw_session.uuid
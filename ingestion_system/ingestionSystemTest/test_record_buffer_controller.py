@@ -0,0 +1,164 @@
+"""
+Module: test_record_buffer_controller
+Test the record buffer of the ingestion system.
+Author: Francesco Taverna
+
+"""
+
+import json
+import sqlite3
+import time
+
+import pytest
+
+from ingestion_system.Ingestion_Database_Manager import database_manager
+from ingestion_system.record_buffer_controller import RecordBufferController
+
+
+@pytest.fixture(autouse=True)
+def _database_path(tmp_path, monkeypatch):
+    # keep the test database out of IngestionDB
+    monkeypatch.setattr(database_manager, "DATABASE_FOLDER_PATH", str(tmp_path))
+    monkeypatch.setattr(database_manager, "DATABASE_FILE_PATH", str(tmp_path / "IngestionSystem.db"))
+    return tmp_path / "IngestionSystem.db"
+
+
+def _records(uuid):
+    return [
+        {"source": "calendar", "value": {"UUID": uuid, "VAR1": "shopping"}},
+        {"source": "environment", "value": {"UUID": uuid, "VAR1": "slippery"}},
+        {"source": "helmet", "value": {"UUID": uuid, "VarName5": -3.5, "VarName6": 1.25}},
+        {"source": "labels", "value": {"UUID": uuid, "LABEL": "move"}},
+    ]
+
+
+def test_records_are_joined_by_uuid():
+    buffer_controller = RecordBufferController()
+    first, second = _records("a923-45b7-gh12-166"), _records("b923-45b7-gh12-167")
+
+    for record in first[:2] + second + first[2:3]:
+        buffer_controller.store_record(record)
+
+    assert buffer_controller.get_records("a923-45b7-gh12-166") == \
+           ["a923-45b7-gh12-166", "slippery", None, [-3.5, 1.25], "shopping"]
+    assert buffer_controller.get_records("b923-45b7-gh12-167") == \
+           ["b923-45b7-gh12-167", "slippery", "move", [-3.5, 1.25], "shopping"]
+
+    buffer_controller.remove_records("b923-45b7-gh12-167")
+    with pytest.raises(KeyError):
+        buffer_controller.get_records("b923-45b7-gh12-167")
+
+
+def test_store_record_returns_the_session():
+    # with a single session in the buffer, storing a record evicts the other sessions
+    buffer_controller = RecordBufferController(max_sessions=1)
+    first, second = _records("uuid-1"), _records("uuid-2")
+
+    before = time.time()
+    row, first_arrival_time = buffer_controller.store_record(first[0])
+    assert row == ["uuid-1", None, None, None, "shopping"]
+    assert before <= first_arrival_time <= time.time()
+    assert buffer_controller.store_record(second[1])[0] == ["uuid-2", "slippery", None, None, None]
+
+    # uuid-1 was evicted: its session starts again with this record
+    row, arrival_time = buffer_controller.store_record(first[1])
+    assert row == ["uuid-1", "slippery", None, None, None]
+    assert arrival_time >= first_arrival_time
+    assert buffer_controller.get_stats()["evicted"] == 2
+
+    # the arrival time is the one of the first record of the session
+    assert buffer_controller.store_record(first[2])[1] == arrival_time
+
+
+def test_unknown_source_is_rejected():
+    buffer_controller = RecordBufferController()
+
+    with pytest.raises(ValueError):
+        buffer_controller.store_record({"source": "gps", "value": {"UUID": "a923-45b7-gh12-166", "VAR1": 1}})
+
+
+def test_write_behind_persists_the_buffer(_database_path):
+    buffer_controller = RecordBufferController(write_behind=True, flush_interval=10, batch_size=1000)
+    for record in _records("a923-45b7-gh12-166") + _records("b923-45b7-gh12-167")[:1]:
+        buffer_controller.store_record(record)
+    buffer_controller.remove_records("a923-45b7-gh12-166")
+    buffer_controller.close()
+
+    with sqlite3.connect(_database_path) as conn:
+        rows = conn.execute("SELECT uuid, environment, labels, helmet, calendar FROM records;").fetchall()
+
+    assert len(rows) == 1
+    assert rows[0][0] == "b923-45b7-gh12-167"
+    assert rows[0][1:4] == (None, None, None)
+    assert json.loads(rows[0][4]) == {"VAR1": "shopping"}
+
+
+def test_recovery_reloads_partial_sessions(_database_path):
+    buffer_controller = RecordBufferController(write_behind=True)
+    for record in _records("a923-45b7-gh12-166")[:3] + _records("b923-45b7-gh12-167")[:1]:
+        buffer_controller.store_record(record)
+    buffer_controller.close()
+
+    # a session older than the TTL
+    with sqlite3.connect(_database_path) as conn:
+        conn.execute("UPDATE records SET arrival_time = arrival_time - 3600 WHERE uuid = ?;", ("b923-45b7-gh12-167",))
+
+    recovered_buffer = RecordBufferController(write_behind=True, recovery=True, session_ttl=600)
+
+    assert recovered_buffer.recovered_sessions == 1
+    assert recovered_buffer.expired_sessions == 1
+    assert recovered_buffer.get_records("a923-45b7-gh12-166") == \
+           ["a923-45b7-gh12-166", "slippery", None, [-3.5, 1.25], "shopping"]
+    with pytest.raises(KeyError):
+        recovered_buffer.get_records("b923-45b7-gh12-167")
+
+    # the session is completed after the restart
+    recovered_buffer.store_record(_records("a923-45b7-gh12-166")[3])
+    assert None not in recovered_buffer.get_records("a923-45b7-gh12-166")
+    recovered_buffer.close()
+
+
+def test_recovery_requires_write_behind():
+    with pytest.raises(ValueError):
+        RecordBufferController(recovery=True)
+
+
+def test_least_recently_updated_sessions_are_evicted():
+    buffer_controller = RecordBufferController(max_sessions=2)
+    for uuid in ("uuid-1", "uuid-2"):
+        buffer_controller.store_record(_records(uuid)[0])
+    # uuid-1 is updated after uuid-2
+    buffer_controller.store_record(_records("uuid-1")[1])
+    buffer_controller.store_record(_records("uuid-3")[0])
+
+    assert buffer_controller.get_records("uuid-1")[1] == "slippery"
+    with pytest.raises(KeyError):
+        buffer_controller.get_records("uuid-2")
+    assert buffer_controller.get_stats() == {"sessions": 2, "recovered": 0, "expired": 0, "evicted": 1}
+
+
+def test_stale_sessions_are_expired(_database_path):
+    buffer_controller = RecordBufferController(write_behind=True, session_ttl=0.05)
+    buffer_controller.store_record(_records("uuid-1")[0])
+    time.sleep(0.1)
+    buffer_controller.store_record(_records("uuid-2")[0])
+
+    assert buffer_controller.expire_sessions() == 1
+    assert buffer_controller.get_stats()["expired"] == 1
+    buffer_controller.get_records("uuid-2")
+    buffer_controller.close()
+
+    with sqlite3.connect(_database_path) as conn:
+        assert conn.execute("SELECT uuid FROM records;").fetchall() == [("uuid-2",)]
+
+
+def test_expiration_timer():
+    buffer_controller = RecordBufferController(session_ttl=0.05, eviction_interval=0.05)
+    buffer_controller.store_record(_records("uuid-1")[0])
+
+    deadline = time.monotonic() + 2
+    while buffer_controller.get_stats()["sessions"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    buffer_controller.close()
+
+    assert buffer_controller.get_stats()["expired"] == 1
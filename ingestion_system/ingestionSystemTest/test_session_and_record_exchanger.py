@@ -0,0 +1,58 @@
+"""
+Module: test_session_and_record_exchanger
+Test the batch record endpoint of the ingestion system.
+Author: Francesco Taverna
+
+"""
+
+import json
+
+from ingestion_system.SessionAndRecordExchanger import SessionAndRecordExchanger
+from utility.http_client.headers import RECORD_STREAM_CONTENT_TYPE, SENDER_PORT_HEADER
+
+
+def _records(uuid):
+    return [
+        {"source": "calendar", "value": {"UUID": uuid, "VAR1": "shopping"}},
+        {"source": "environment", "value": {"UUID": uuid, "VAR2": "slippery"}},
+        {"source": "labels", "value": {"UUID": uuid, "LABEL": "move"}},
+    ]
+
+
+def test_batch_as_json_array():
+    exchanger = SessionAndRecordExchanger(host='127.0.0.1', port=5001)
+    records = _records("a923-45b7-gh12-166")
+
+    response = exchanger.app.test_client().post('/send_batch', json=records, headers={SENDER_PORT_HEADER: "5004"})
+
+    assert response.status_code == 200
+    assert response.get_json()["records"] == 3
+    assert [exchanger.get_message(timeout=1) for _ in records] == [(False, record) for record in records]
+
+
+def test_batch_as_record_stream():
+    exchanger = SessionAndRecordExchanger(host='127.0.0.1', port=5001)
+    records = _records("a923-45b7-gh12-166") + _records("b923-45b7-gh12-167")
+    body = "\n".join(json.dumps(record) for record in records) + "\n"
+
+    response = exchanger.app.test_client().post('/send_batch', data=body, content_type=RECORD_STREAM_CONTENT_TYPE)
+
+    assert response.status_code == 200
+    assert exchanger.message_queue.qsize() == 1
+    assert [exchanger.get_message(timeout=1)[1] for _ in records] == records
+
+
+def test_invalid_batch_is_not_enqueued():
+    exchanger = SessionAndRecordExchanger(host='127.0.0.1', port=5001, max_batch_records=4)
+    client = exchanger.app.test_client()
+    records = _records("a923-45b7-gh12-166")
+    records[1] = {"source": "environment", "value": {"VAR2": "slippery"}}
+
+    response = client.post('/send_batch', json=records)
+    assert response.status_code == 400
+    assert response.get_json()["invalid"] == [1]
+
+    assert client.post('/send_batch', data="{not json", content_type=RECORD_STREAM_CONTENT_TYPE).status_code == 400
+    assert client.post('/send_batch', json={"records": records}).status_code == 400
+    assert client.post('/send_batch', json=_records("a") + _records("b")).status_code == 413
+    assert exchanger.message_queue.empty()
@@ -11,6 +11,8 @@ from ingestion_system.record_buffer_controller import RecordBufferController
 from ingestion_system.raw_session_preparation import RawSessionPreparation
 from ingestion_system.ingestion_system_parameters import Parameters
 from ingestion_system.SessionAndRecordExchanger import SessionAndRecordExchanger
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import Tracer
 
 
 class IngestionSystemOrchestrator:
@@ -33,16 +35,30 @@ class IngestionSystemOrchestrator:
         # parameters class configuration
         self.parameters = Parameters()
 
-        # buffer class configuration
-        self.buffer_controller = RecordBufferController()
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(self.parameters.configuration.get("http_client") or {}))
+
+        # buffer class configuration (records joined in memory, optionally persisted in background)
+        self.buffer_controller = RecordBufferController(write_behind=self.parameters.configuration["write_behind"],
+                                                        flush_interval=self.parameters.configuration["write_behind_interval"],
+                                                        batch_size=self.parameters.configuration["write_behind_batch_size"],
+                                                        database=self.parameters.configuration["database"],
+                                                        recovery=self.parameters.configuration["recovery"],
+                                                        session_ttl=self.parameters.configuration["session_ttl"],
+                                                        max_sessions=self.parameters.configuration["max_buffered_sessions"],
+                                                        eviction_interval=self.parameters.configuration["eviction_interval"])
+
+        # spans of the sessions, reported to the Service Class if tracing is enabled
+        self.tracer = Tracer.configure("Ingestion System", self.parameters.configuration.get("tracing"))
 
         # raw session configuration
         self.session_preparation = RawSessionPreparation()
 
         # IO configuration
         self.json_io = SessionAndRecordExchanger(host= self.parameters.configuration["ip_ingestion"]
-                                                 , port=self.parameters.configuration["port_ingestion"])  # parameters of Ingestion server
-        self.json_io.start_server()
+                                                 , port=self.parameters.configuration["port_ingestion"]
+                                                 , max_batch_records=self.parameters.configuration["max_batch_records"])  # parameters of Ingestion server
+        self.json_io.start_server(self.parameters.configuration.get("serving"))
         self.number_of_missing_samples = 0
         self.current_phase = self.parameters.configuration["current_phase"]
 
@@ -81,13 +97,10 @@ class IngestionSystemOrchestrator:
                 if boo:
                     continue
 
-                # stores record
-                self.buffer_controller.store_record(new_record)
+                # stores record and retrieves the records of its session
+                stored_records, arrival_time = self.buffer_controller.store_record(new_record)
                 print(new_record)
 
-                # retrieve records
-                stored_records = self.buffer_controller.get_records(new_record["value"]["UUID"])
-
                 # if there is at least one None: not enough records
                 if None in stored_records:
                     #if it is not production, so it is development or evaluation, wait for label and others
@@ -100,19 +113,27 @@ class IngestionSystemOrchestrator:
 
                 # creates raw session
                 raw_session = self.session_preparation.create_raw_session(stored_records)
-                print("sto mandando la raw session: ", raw_session.to_json())
+                print("sto mandando la raw session: ", raw_session.uuid)
                 print("numero di raw session inviata: ", j)
                 j = j + 1
 
+                # the ingestion system is the first hop: the session is received with its first record
+                self.tracer.receive(raw_session.uuid, timestamp=arrival_time)
+
                 # removes records
                 self.buffer_controller.remove_records(new_record["value"]["UUID"])
 
                 # marks missing samples with "None" and checks the number
                 self.number_of_missing_samples, marked_raw_session = self.session_preparation.mark_missing_samples(
                     raw_session, None)
+                self.tracer.process(marked_raw_session.uuid)
                 if self.number_of_missing_samples >= self.parameters.configuration["missing_samples_threshold_interval"] :
+                    self.tracer.end(marked_raw_session.uuid)
                     continue  # do not send anything
 
+                # trace context sent with the messages of the session
+                trace_headers = self.tracer.context(marked_raw_session.uuid)
+
                 # if in evaluation phase, sends labels to evaluation system
                 if self.current_phase == "evaluation":
                     label = {
@@ -123,12 +144,16 @@ class IngestionSystemOrchestrator:
                     print("invio label a gio: ", json_label)
 
                     self.json_io.send_message(target_ip=self.parameters.configuration["ip_evaluation"],
-                                              target_port=self.parameters.configuration["port_evaluation"], message=json_label)
-
-                # sends raw sessions
-                json_raw_session = marked_raw_session.to_json()
-                self.json_io.send_message(target_ip=self.parameters.configuration["ip_preparation"],
-                                          target_port=self.parameters.configuration["port_preparation"], message=json_raw_session)
+                                              target_port=self.parameters.configuration["port_evaluation"], message=json_label,
+                                              headers=trace_headers)
+
+                # sends raw sessions (binary format falls back to JSON if not supported by preparation)
+                self.json_io.send_raw_session(target_ip=self.parameters.configuration["ip_preparation"],
+                                              target_port=self.parameters.configuration["port_preparation"],
+                                              raw_session=marked_raw_session,
+                                              binary=self.parameters.configuration["raw_session_format"] == "binary",
+                                              headers=trace_headers)
+                self.tracer.send(marked_raw_session.uuid)
 
                 #update the session sent counter only it is production/evaluation
                 #because development is changed by the human
@@ -6,6 +6,12 @@ Author: Francesco Taverna
 
 """
 import json
+import struct
+
+import numpy as np
+
+# binary layout: 4 bytes header length (big endian) + JSON header + EEG samples buffer
+_HEADER_LENGTH = struct.Struct("!I")
 
 
 class RawSession:
@@ -16,11 +22,14 @@ class RawSession:
         uuid (str): Unique identifier for the session.
         environment (str): The environment where the session occurred (e.g, slippery).
         label (str): Label for evaluation purposes.
-        eeg_data (list): List of EEG data points.
+        eeg_data (np.ndarray): EEG data points, missing samples are NaN.
         activity (str): The activity being recorded (e.g., shopping).
+        placeholder: Value written in place of the missing samples when converted to JSON.
     """
 
-    def __init__(self, uuid, environment, eeg_data, activity, label=None):
+    __slots__ = ("uuid", "environment", "label", "eeg_data", "activity", "placeholder")
+
+    def __init__(self, uuid, environment, eeg_data, activity, label=None, dtype=np.float64):
         """
         Initialize a raw session instance.
 
@@ -28,14 +37,38 @@ class RawSession:
             uuid (str): Unique session identifier.
             environment (str): Session environment.
             label (str, optional): Label for evaluation. Defaults to None.
-            eeg_data (list): EEG data samples.
+            eeg_data (list or np.ndarray): EEG data samples, None or NaN for missing samples.
             activity(str): Recorded activity.
+            dtype: float type of the EEG samples buffer (np.float64 or np.float32).
         """
         self.uuid = uuid
         self.environment = environment
         self.label = label
-        self.eeg_data = eeg_data
+        # None values become NaN, an array of the same dtype is not copied
+        self.eeg_data = np.asarray(eeg_data, dtype=dtype)
         self.activity = activity
+        self.placeholder = None
+
+    def missing_samples_mask(self):
+        """
+        Compute the mask of the missing samples.
+
+        Returns:
+            np.ndarray: boolean array, True where the sample is missing.
+        """
+        return np.isnan(self.eeg_data)
+
+    def eeg_data_to_list(self):
+        """
+        Convert the EEG samples to a list, with the placeholder in place of the missing samples.
+
+        Returns:
+            list: EEG data samples.
+        """
+        eeg_data = self.eeg_data.tolist()
+        for index in np.flatnonzero(self.missing_samples_mask()):
+            eeg_data[index] = self.placeholder
+        return eeg_data
 
     def to_json(self):
         """
@@ -48,7 +81,45 @@ class RawSession:
             "uuid": self.uuid,
             "environment": self.environment,
             "label": self.label,
-            "eeg_data": self.eeg_data,
+            "eeg_data": self.eeg_data_to_list(),
             "activity": self.activity
         })
 
+    def to_bytes(self):
+        """
+        Convert the instance attributes to a binary message: a length-prefixed JSON header
+        followed by the raw EEG samples buffer (missing samples are NaN).
+
+        Returns:
+            bytes: binary message representing the instance attributes.
+        """
+        header = json.dumps({
+            "uuid": self.uuid,
+            "environment": self.environment,
+            "label": self.label,
+            "activity": self.activity,
+            "dtype": self.eeg_data.dtype.str
+        }).encode("utf-8")
+        return _HEADER_LENGTH.pack(len(header)) + header + self.eeg_data.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Create a raw session from a binary message created by to_bytes.
+        The EEG samples are a read-only view of data, they are not copied.
+
+        Args:
+            data (bytes): binary message.
+
+        Returns:
+            RawSession: the raw session.
+        """
+        buffer = memoryview(data)
+        (header_length,) = _HEADER_LENGTH.unpack_from(buffer)
+        header_end = _HEADER_LENGTH.size + header_length
+        header = json.loads(bytes(buffer[_HEADER_LENGTH.size:header_end]).decode("utf-8"))
+
+        dtype = np.dtype(header["dtype"])
+        eeg_data = np.frombuffer(buffer[header_end:], dtype=dtype)
+
+        return cls(header["uuid"], header["environment"], eeg_data, header["activity"], header["label"], dtype=dtype)
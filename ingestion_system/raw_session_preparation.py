@@ -5,8 +5,6 @@ Handles the preparation of raw sessions from records.
 Author: Francesco Taverna
 
 """
-import math
-
 from .raw_session import RawSession
 
 class RawSessionPreparation:
@@ -38,19 +36,16 @@ class RawSessionPreparation:
 
         Args:
             raw_session (RawSession): The raw session to process.
-            placeholder : Placeholder to set in NaN place
+            placeholder : Placeholder to set in NaN place (the samples stay NaN in the
+                          EEG buffer, the placeholder is written when converted to JSON)
         Returns:
             number of missing samples
             rawsession updated (RawSession)
         """
-        missing_samples = 0
-        for index, value in enumerate(raw_session.eeg_data):
-            #check if the value is a float and a NaN
-            if isinstance(value, float) and math.isnan(value):
-                #set placeholder in NaN place
-                raw_session.eeg_data[index] = placeholder
-                #increase the number of missing samples
-                missing_samples+= 1
+        #set placeholder in NaN place
+        raw_session.placeholder = placeholder
 
-        return missing_samples, raw_session
+        #count the NaN samples with a vectorized mask
+        missing_samples = int(raw_session.missing_samples_mask().sum())
 
+        return missing_samples, raw_session
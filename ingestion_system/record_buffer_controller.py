@@ -7,19 +7,44 @@ Author: Francesco Taverna
 
 """
 import json
+import threading
+import time
+from collections import OrderedDict
 
 from .Ingestion_Database_Manager.database_manager import DatabaseManager
+from .record_write_behind import RecordWriteBehind
+
+# columns of a session, in the order returned by get_records (after the uuid)
+RECORD_COLUMNS = ("environment", "labels", "helmet", "calendar")
 
 
 class RecordBufferController:
     """
     Controller for managing the record buffer.
     Provides methods to store, retrieve, and remove records from the buffer.
+
+    The records of each session are joined in memory by uuid; the buffer can also be persisted to the
+    records table of IngestionSystem.db asynchronously (write-behind), in batched transactions.
+    In recovery mode the persisted buffer is reloaded at startup instead of being dropped.
+
+    Partial sessions older than session_ttl are expired by a background timer, and when the buffer
+    holds max_sessions sessions the least recently updated one is evicted.
     """
 
-    def __init__(self):
+    def __init__(self, write_behind: bool = False, flush_interval: float = 0.5, batch_size: int = 500,
+                 database: dict = None, recovery: bool = False, session_ttl: float = 600,
+                 max_sessions: int = None, eviction_interval: float = None):
         """
         Initialize the buffer.
+
+        :param write_behind: True to persist the buffer to the database from a background thread.
+        :param flush_interval: maximum time (in seconds) a change waits before being persisted.
+        :param batch_size: number of changes that triggers a write to the database.
+        :param database: SQLite pragmas of the database (journal_mode, synchronous, cache_size).
+        :param recovery: True to reload the partial sessions persisted before a restart (requires write_behind).
+        :param session_ttl: age (in seconds) after which a partial session is expired.
+        :param max_sessions: maximum number of sessions in the buffer, None for no limit.
+        :param eviction_interval: period (in seconds) of the expiration of the partial sessions, None to disable it.
         """
         """
         Structure of data:
@@ -38,23 +63,56 @@ class RecordBufferController:
             (f) environment + small scatter
         """
 
+        if recovery and not write_behind:
+            raise ValueError("The recovery mode requires the write-behind of the buffer")
+
         #create Database class instance
-        self.db = DatabaseManager()
-        self.db.drop_database()
+        self.db = DatabaseManager(**(database or {}))
+        if not recovery:
+            self.db.drop_database()
         #prepare query to create records table if it doesn't exist
+        #arrival_time: time of the first record of the session (seconds since the epoch)
         query = ("CREATE TABLE IF NOT EXISTS records \
                     (uuid TEXT PRIMARY KEY, \
                      environment TEXT, \
                      labels TEXT, \
                      helmet TEXT, \
-                     calendar TEXT);")
+                     calendar TEXT, \
+                     arrival_time REAL);")
         #perform query
         self.db.create_table(query)
 
+        # uuid -> {column name: values of the record}, least recently updated first
+        self._sessions = OrderedDict()
+        # uuid -> arrival time of the first record, in arrival order
+        self._arrival_times = {}
+        # the buffer is shared with the expiration thread
+        self._lock = threading.Lock()
+
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+
+        # counters
+        self.recovered_sessions = 0
+        self.expired_sessions = 0
+        self.evicted_sessions = 0
+
+        if recovery:
+            self._recover()
+
+        self._write_behind = RecordWriteBehind(self.db, flush_interval, batch_size) if write_behind else None
+
+        self._stop_expiration = threading.Event()
+        if eviction_interval is not None:
+            thread = threading.Thread(target=self._expiration_loop, args=(eviction_interval,), daemon=True)
+            thread.start()
+
     def store_record(self, record):
         """
-              stores a record in the IngestionSystem.db.
+              stores a record in the buffer.
               :param record: record to store
+              :return: the records of its session, as returned by get_records, and the arrival time
+                       of the first record of the session (seconds since the epoch)
         """
 
         # each record has uuid
@@ -69,63 +127,143 @@ class RecordBufferController:
             "source": "environment"
          }
         """
-        # adds a new row in records table if uuid PK does not exist
-        query = ("INSERT OR IGNORE INTO records (uuid, environment, labels, helmet, calendar) "
-                "VALUES (?, NULL, NULL, NULL, NULL);")
-        values = (uuid,)
-        self.db.perform_query('insert', query, values)
+        #get column name from record
+        column_name = record["source"]
+        if column_name not in RECORD_COLUMNS:
+            raise ValueError(f"Unknown record source: {column_name}")
 
-        # gets values for query --> get a dictionary without UUID (just the value of the column indicated in "source")
+        # gets values of the record --> a dictionary without UUID (just the value of the column indicated in "source")
         record_filtered = {key: value for key, value in record["value"].items() if key != "UUID"}
-        #convert python dictionary to json
-        json_value = json.dumps(record_filtered)
 
-        #get column name from record
-        column_name = record["source"]
-        #prepare update query with the new value of the column received in the record
-        query = f"UPDATE records SET {column_name} = ? WHERE uuid = ?;"
-        values = (json_value, uuid)
+        #if there is a list of 1 element, it is extracted
+        values = list(record_filtered.values())
+
+        with self._lock:
+            session = self._sessions.setdefault(uuid, {})
+            session[column_name] = values[0] if len(values) == 1 else values
+            self._sessions.move_to_end(uuid)
+            arrival_time = self._arrival_times.setdefault(uuid, time.time())
 
-        #execute update
-        self.db.perform_query('update', query, values)
-        return
+            if self._write_behind is not None:
+                #convert python dictionary to json
+                self._write_behind.upsert(uuid, column_name, json.dumps(record_filtered), arrival_time)
+
+            # evict the least recently updated sessions
+            while self.max_sessions is not None and len(self._sessions) > self.max_sessions:
+                evicted_uuid = next(iter(self._sessions))
+                self._remove(evicted_uuid)
+                self.evicted_sessions += 1
+
+            # read under the same lock: the session cannot be expired or evicted in between
+            return self._row(uuid, session), arrival_time
 
     def get_records(self, uuid: str) :
         """
-              retrieves a record with an uuid from the db.
+              retrieves the records of a session with an uuid from the buffer.
               :param uuid: uuid of record
               :return: Record
         """
-        #prepare query
-        query = ("SELECT * "
-                 "FROM records "
-                 "WHERE uuid = ? ;")
-        values = (uuid,)
-        rows = self.db.perform_query('select', query, values)
-
-        # converts result to list
-        row = list(rows[0]) #there will be only one row, thus take the first element
-
-        # converts string to json
-        #uuid is the same, then for each value of the first, second .. columns if it is not null
-        #it is read as json and converted in python dictionary, then converted in list
-        result = [row[0]] + [value if value is None else list(json.loads(value).values()) for value in row[1:]]
-
-        #if there is a list of 1 element as element of the list, it is extracted
-        result = [item[0] if isinstance(item, list) and len(item) == 1 else item for item in result]
+        with self._lock:
+            return self._row(uuid, self._sessions[uuid])
 
-        return result #row made of 3/4 records + uuid
+    @staticmethod
+    def _row(uuid: str, session: dict) -> list:
+        #uuid followed by the values of each record, None if the record is not received yet
+        return [uuid] + [session.get(column_name) for column_name in RECORD_COLUMNS] #row made of 3/4 records + uuid
 
 
     def remove_records(self, uuid: str) -> None:
          """
-         deletes a record from the db.
+         deletes the records of a session from the buffer.
          :param uuid: uuid of record
          """
-
-         query = ("DELETE FROM records "
-                  "WHERE uuid = ?;")
-         values = (uuid,)
-         #perform delete query
-         self.db.perform_query('delete', query, values)
+         with self._lock:
+             self._remove(uuid)
          return
+
+    def _remove(self, uuid: str) -> None:
+        # to be called holding the lock
+        self._sessions.pop(uuid, None)
+        self._arrival_times.pop(uuid, None)
+
+        if self._write_behind is not None:
+            self._write_behind.delete(uuid)
+
+    def expire_sessions(self) -> int:
+        """
+        Remove the partial sessions whose first record arrived more than session_ttl seconds ago.
+
+        :return: number of expired sessions.
+        """
+        oldest_arrival_time = time.time() - self.session_ttl
+        expired = 0
+        with self._lock:
+            # arrival times are in arrival order, the oldest sessions come first
+            for uuid, arrival_time in list(self._arrival_times.items()):
+                if arrival_time >= oldest_arrival_time:
+                    break
+                self._remove(uuid)
+                expired += 1
+            self.expired_sessions += expired
+        return expired
+
+    def _expiration_loop(self, eviction_interval: float) -> None:
+        while not self._stop_expiration.wait(eviction_interval):
+            expired = self.expire_sessions()
+            if expired:
+                print(f"Record buffer: {expired} partial sessions expired")
+
+    def get_stats(self) -> dict:
+        """
+        :return: number of buffered sessions and counters of recovered, expired and evicted sessions.
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "recovered": self.recovered_sessions,
+                "expired": self.expired_sessions,
+                "evicted": self.evicted_sessions
+            }
+
+    def _recover(self) -> None:
+        """
+        Reload the partial sessions persisted before a restart, deleting the ones older than session_ttl.
+        """
+        # tables created before the arrival time was tracked
+        columns = [row[1] for row in self.db.perform_query('select', "PRAGMA table_info(records);")]
+        if "arrival_time" not in columns:
+            self.db.create_table("ALTER TABLE records ADD COLUMN arrival_time REAL;")
+
+        now = time.time()
+        oldest_arrival_time = now - self.session_ttl
+        #sessions without arrival time are considered expired
+        self.expired_sessions = self.db.perform_query(
+            'select', "SELECT COUNT(*) FROM records WHERE arrival_time IS NULL OR arrival_time < ?;",
+            (oldest_arrival_time,))[0][0]
+        self.db.perform_query('delete', "DELETE FROM records WHERE arrival_time IS NULL OR arrival_time < ?;",
+                              (oldest_arrival_time,))
+
+        rows = self.db.perform_query('select', f"SELECT uuid, {', '.join(RECORD_COLUMNS)}, arrival_time "
+                                               f"FROM records ORDER BY arrival_time;")
+        for row in rows:
+            uuid, arrival_time = row[0], row[-1]
+            session = {}
+            for column_name, value in zip(RECORD_COLUMNS, row[1:-1]):
+                if value is not None:
+                    #stored as json, converted in list (a list of 1 element is extracted)
+                    values = list(json.loads(value).values())
+                    session[column_name] = values[0] if len(values) == 1 else values
+            self._sessions[uuid] = session
+            self._arrival_times[uuid] = arrival_time
+
+        self.recovered_sessions = len(rows)
+        print(f"Record buffer recovered: {self.recovered_sessions} partial sessions, "
+              f"{self.expired_sessions} expired")
+
+    def close(self) -> None:
+        """
+        Persist the pending changes and stop the write-behind and expiration threads.
+        """
+        self._stop_expiration.set()
+        if self._write_behind is not None:
+            self._write_behind.close()
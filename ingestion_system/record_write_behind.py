@@ -0,0 +1,98 @@
+"""
+Module: record_write_behind
+This module persists the changes of the record buffer to the database asynchronously.
+
+Author: Francesco Taverna
+
+"""
+import threading
+
+from .Ingestion_Database_Manager.database_manager import DatabaseManager
+
+
+class RecordWriteBehind:
+    """
+    Queues the changes of the record buffer and writes them to the records table from a background
+    thread, in batched transactions: one commit every flush_interval seconds or batch_size changes.
+    """
+
+    def __init__(self, db: DatabaseManager, flush_interval: float, batch_size: int):
+        """
+        Start the background writer.
+
+        :param db: database manager of the records table.
+        :param flush_interval: maximum time (in seconds) a change waits before being written.
+        :param batch_size: number of queued changes that triggers a write.
+        """
+        self.db = db
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        # (query, values) not written yet, in order
+        self._pending = []
+        self._condition = threading.Condition()
+        # one transaction at a time, so the changes are written in order
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def upsert(self, uuid: str, column_name: str, json_value: str, arrival_time: float) -> None:
+        """
+        Queue the update of a column of a session, creating the session row if needed.
+
+        :param uuid: uuid of the session.
+        :param column_name: column of the record (environment, labels, helmet, calendar).
+        :param json_value: value of the record as JSON.
+        :param arrival_time: arrival time of the first record of the session, stored when the row is created.
+        """
+        query = (f"INSERT INTO records (uuid, {column_name}, arrival_time) VALUES (?, ?, ?) "
+                 f"ON CONFLICT(uuid) DO UPDATE SET {column_name} = excluded.{column_name};")
+        self._enqueue(query, (uuid, json_value, arrival_time))
+
+    def delete(self, uuid: str) -> None:
+        """
+        Queue the deletion of a session.
+
+        :param uuid: uuid of the session.
+        """
+        self._enqueue("DELETE FROM records WHERE uuid = ?;", (uuid,))
+
+    def _enqueue(self, query: str, values: tuple) -> None:
+        with self._condition:
+            self._pending.append((query, values))
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> None:
+        """
+        Write all the queued changes in a single transaction.
+        """
+        with self._write_lock:
+            with self._condition:
+                pending, self._pending = self._pending, []
+            if pending:
+                try:
+                    self.db.perform_transaction(pending)
+                except Exception as e:
+                    print(f"Error writing records to the database: {e}")
+
+    def close(self) -> None:
+        """
+        Write the queued changes and stop the background writer.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or len(self._pending) >= self.batch_size,
+                                         self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
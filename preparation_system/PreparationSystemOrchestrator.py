@@ -11,6 +11,9 @@ from asyncio.subprocess import Process
 from preparation_system.PreparationSystemParameters import PreparationSystemParameters
 from preparation_system.RawSessionReceiver_and_PreparedSessionSender import RawSessionReceiver_and_PrepareSessionSender
 from preparation_system.SessionPreparation import SessionPreparation
+from preparation_system.PreparationWorkerPool import PreparationWorkerPool
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import Tracer
 
 
 class PreparationSystemOrchestrator:
@@ -20,48 +23,91 @@ class PreparationSystemOrchestrator:
 
         self.parameters = PreparationSystemParameters()
 
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(self.parameters.configuration.get("http_client") or {}))
+
+        # spans of the sessions, reported to the Service Class if tracing is enabled
+        self.tracer = Tracer.configure("Preparation System", self.parameters.configuration.get("tracing"))
+
         #instantiate message exchanger
         self.communication = RawSessionReceiver_and_PrepareSessionSender(host=self.parameters.configuration["ip_preparation"],
                                                                          port=self.parameters.configuration["port_preparation"])
-        self.communication.start_server()
+        self.communication.start_server(self.parameters.configuration.get("serving"))
         #prepare SessionPreparation istance with all configuration parameters
-        self.session_preparation = SessionPreparation()
+        self.session_preparation = SessionPreparation(bands=self.parameters.configuration["bands"],
+                                                      sampling_frequency=self.parameters.configuration["sampling_frequency"],
+                                                      interpolation=self.parameters.configuration["interpolation"])
+
+        #with workers > 0 the raw sessions are prepared on a pool of processes, otherwise on the main thread
+        self.worker_pool = None
+        if self.parameters.configuration["workers"] > 0:
+            self.worker_pool = PreparationWorkerPool(self.session_preparation, self._send_prepared_session,
+                                                     workers=self.parameters.configuration["workers"],
+                                                     max_pending_batches=self.parameters.configuration["max_pending_batches"],
+                                                     ordered_delivery=self.parameters.configuration["ordered_delivery"],
+                                                     fail=self._drop_raw_session)
 
         print("-- PREPARATION SYSTEM INITIALIZED --")
 
     def run(self) -> None:
         while True:
-            # receive message
-            boo, new_raw_session = self.communication.get_message()
-            print("preparation ricevuta raw session: ", new_raw_session)
-            if boo:
+            # receive a batch of raw sessions: the queue is drained up to batch_size messages or batch_timeout seconds
+            new_raw_sessions = self.communication.get_messages(self.parameters.configuration["batch_size"],
+                                                               self.parameters.configuration["batch_timeout"])
+            print("preparation ricevute raw session: ", len(new_raw_sessions))
+            if not new_raw_sessions:
                 continue
-            # correct raw session
-            raw_session_corrected = self.session_preparation.correct_missing_samples(new_raw_session, None)
-            raw_session_corrected = self.session_preparation.correct_outliers(raw_session_corrected)
-
-            # create prepared session
-            prepared_session = self.session_preparation.create_prepared_session(raw_session_corrected)
-            json_prepared_session = json.dumps(prepared_session)
-
-            # send prepared session
-            if self.parameters.configuration["development"]:
-                print("INVIO A SAVE")
-                #send to segregation system
-                self.communication.send_message(self.parameters.configuration["ip_segregation"],
-                                                self.parameters.configuration["port_segregation"], json_prepared_session)
-            else:
-                """
-                data = json.loads(json_prepared_session)
-                
-                data.pop("label", None)  
-                
-                json_prepared_session = json.dumps(data)
-                """
-
-                print("INVIO A ALE")
-                self.communication.send_message(self.parameters.configuration["ip_production"],
-                                                self.parameters.configuration["port_production"], json_prepared_session)
+
+            if self.worker_pool is not None:
+                # blocks while the pool is full, the prepared sessions are sent by the pool delivery thread
+                self.worker_pool.submit(new_raw_sessions)
+                continue
+
+            # correct raw sessions and create prepared sessions
+            prepared_sessions = self.session_preparation.prepare_raw_sessions(new_raw_sessions)
+
+            for prepared_session in prepared_sessions:
+                self._send_prepared_session(prepared_session)
+
+    def _send_prepared_session(self, prepared_session: dict) -> None:
+        """
+        Sends a prepared session to segregation system (development) or production system.
+        :param prepared_session: prepared session (as dict)
+        """
+        self.tracer.process(prepared_session["uuid"])
+        # trace context sent with the prepared session
+        trace_headers = self.tracer.context(prepared_session["uuid"])
+        json_prepared_session = json.dumps(prepared_session)
+
+        # send prepared session
+        if self.parameters.configuration["development"]:
+            print("INVIO A SAVE")
+            #send to segregation system
+            self.communication.send_message(self.parameters.configuration["ip_segregation"],
+                                            self.parameters.configuration["port_segregation"], json_prepared_session,
+                                            trace_headers)
+        else:
+            """
+            data = json.loads(json_prepared_session)
+            
+            data.pop("label", None)  
+            
+            json_prepared_session = json.dumps(data)
+            """
+
+            print("INVIO A ALE")
+            self.communication.send_message(self.parameters.configuration["ip_production"],
+                                            self.parameters.configuration["port_production"], json_prepared_session,
+                                            trace_headers)
+
+        self.tracer.send(prepared_session["uuid"])
+
+    def _drop_raw_session(self, raw_session: dict) -> None:
+        """
+        Ends the span of a raw session that could not be prepared.
+        :param raw_session: raw session (as dict)
+        """
+        self.tracer.end(raw_session.get("uuid"))
 
 
 
@@ -0,0 +1,148 @@
+"""
+Module: test_session_preparation
+Test the feature extraction of the preparation system.
+Author: Francesco Taverna
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from preparation_system.PreparationWorkerPool import PreparationWorkerPool
+from preparation_system.RawSessionReceiver_and_PreparedSessionSender import RawSessionReceiver_and_PrepareSessionSender
+from preparation_system.SessionPreparation import SessionPreparation, DEFAULT_BANDS
+from utility.http_client.headers import RAW_SESSION_CONTENT_TYPE, SENDER_PORT_HEADER
+
+
+def _raw_session(eeg_data):
+    return {
+        "uuid": "a923-45b7-gh12-166",
+        "label": "move",
+        "eeg_data": eeg_data,
+        "activity": "shopping",
+        "environment": "slippery"
+    }
+
+
+def test_extract_features_matches_single_band_extraction():
+    session_preparation = SessionPreparation()
+    time_series = np.random.default_rng(0).normal(size=1375)
+
+    features = session_preparation.extract_features(time_series, 100.0, DEFAULT_BANDS)
+
+    assert list(features.keys()) == list(DEFAULT_BANDS.keys())
+    for band, range_values in DEFAULT_BANDS.items():
+        assert np.isclose(features[band], session_preparation.extract_feature(time_series, 100.0, range_values))
+
+
+def test_create_prepared_session_uses_configured_bands():
+    bands = {"psd_low_band": [1, 8], "psd_high_band": [8, 30]}
+    session_preparation = SessionPreparation(bands=bands, sampling_frequency=100.0)
+    eeg_data = list(np.random.default_rng(1).normal(size=1375))
+
+    prepared_session = session_preparation.create_prepared_session(_raw_session(eeg_data))
+
+    assert prepared_session["uuid"] == "a923-45b7-gh12-166"
+    assert prepared_session["activity"] == "shopping"
+    assert prepared_session["environment"] == "slippery"
+    assert "psd_low_band" in prepared_session and "psd_high_band" in prepared_session
+    assert "psd_alpha_band" not in prepared_session
+
+
+def test_create_prepared_sessions_matches_single_session_preparation():
+    session_preparation = SessionPreparation()
+    rng = np.random.default_rng(2)
+    # sessions with a different number of samples are prepared in separate groups
+    raw_sessions = [_raw_session(list(rng.normal(size=size))) for size in (1375, 1375, 1000, 1375)]
+
+    prepared_sessions = session_preparation.create_prepared_sessions(raw_sessions)
+
+    assert len(prepared_sessions) == len(raw_sessions)
+    for raw_session, prepared_session in zip(raw_sessions, prepared_sessions):
+        expected = session_preparation.extract_features(np.array(raw_session["eeg_data"]), 100.0, DEFAULT_BANDS)
+        for band in DEFAULT_BANDS:
+            assert np.isclose(prepared_session[band], expected[band])
+
+
+def test_worker_pool_delivers_batches_in_submission_order():
+    rng = np.random.default_rng(3)
+    batches = [[_raw_session(list(rng.normal(size=1375))) for _ in range(3)] for _ in range(4)]
+    for number, batch in enumerate(batches):
+        for position, raw_session in enumerate(batch):
+            raw_session["uuid"] = f"{number}-{position}"
+
+    delivered = []
+    worker_pool = PreparationWorkerPool(SessionPreparation(), delivered.append,
+                                        workers=2, max_pending_batches=2, ordered_delivery=True)
+    for batch in batches:
+        worker_pool.submit(batch)
+    worker_pool.shutdown()
+
+    assert [prepared_session["uuid"] for prepared_session in delivered] == \
+           [raw_session["uuid"] for batch in batches for raw_session in batch]
+
+
+def test_worker_pool_prepares_failed_batches_in_process():
+    rng = np.random.default_rng(4)
+    batch = [_raw_session(list(rng.normal(size=1375))) for _ in range(3)]
+    for position, raw_session in enumerate(batch):
+        raw_session["uuid"] = f"0-{position}"
+    # the whole batch fails on the worker because of a single session without eeg data
+    del batch[1]["eeg_data"]
+
+    delivered = []
+    failed = []
+    worker_pool = PreparationWorkerPool(SessionPreparation(), delivered.append,
+                                        workers=1, max_pending_batches=2, fail=failed.append)
+    worker_pool.submit(batch)
+    worker_pool.shutdown()
+
+    assert [prepared_session["uuid"] for prepared_session in delivered] == ["0-0", "0-2"]
+    assert [raw_session["uuid"] for raw_session in failed] == ["0-1"]
+    assert (worker_pool.failed_batches, worker_pool.failed_sessions) == (1, 1)
+
+
+def test_correct_missing_samples_strategies():
+    eeg_data = [None, 1.0, None, None, 4.0, None]
+    expected = {
+        "linear": [1.0, 1.0, 2.0, 3.0, 4.0, 4.0],
+        "nearest": [1.0, 1.0, 1.0, 4.0, 4.0, 4.0],
+        "zero_order_hold": [1.0, 1.0, 1.0, 1.0, 4.0, 4.0]
+    }
+
+    for interpolation, corrected in expected.items():
+        session_preparation = SessionPreparation(interpolation=interpolation)
+        raw_session = session_preparation.correct_missing_samples(_raw_session(list(eeg_data)), None)
+        assert np.allclose(raw_session["eeg_data"], corrected), interpolation
+
+
+def test_correct_missing_samples_spline():
+    # samples of x^2: the not-a-knot cubic spline reproduces it, the linear interpolation does not
+    eeg_data = [None, 1.0, 4.0, None, 16.0, None, 36.0, 49.0, None]
+
+    spline = SessionPreparation(interpolation="spline").correct_missing_samples(_raw_session(list(eeg_data)), None)
+    linear = SessionPreparation(interpolation="linear").correct_missing_samples(_raw_session(list(eeg_data)), None)
+
+    # the first/last valid value is used outside the valid range, as with the linear interpolation
+    assert np.allclose(spline["eeg_data"], [1.0, 1.0, 4.0, 9.0, 16.0, 25.0, 36.0, 49.0, 49.0])
+    assert np.allclose(linear["eeg_data"], [1.0, 1.0, 4.0, 10.0, 16.0, 26.0, 36.0, 49.0, 49.0])
+
+
+def test_receiver_accepts_binary_raw_sessions():
+    receiver = RawSessionReceiver_and_PrepareSessionSender(host='127.0.0.1', port=5042)
+    samples = np.random.default_rng(4).normal(size=1375)
+    samples[10] = np.nan
+    header = json.dumps({"uuid": "a923-45b7-gh12-166", "environment": "slippery", "label": "move",
+                         "activity": "shopping", "dtype": samples.dtype.str}).encode("utf-8")
+    body = struct.pack("!I", len(header)) + header + samples.tobytes()
+
+    response = receiver.app.test_client().post('/send', data=body, headers={
+        "Content-Type": RAW_SESSION_CONTENT_TYPE, SENDER_PORT_HEADER: "5001"})
+    raw_sessions = receiver.get_messages(1, 0)
+
+    assert response.status_code == 200
+    assert len(raw_sessions) == 1
+    assert raw_sessions[0]["uuid"] == "a923-45b7-gh12-166"
+    assert raw_sessions[0]["eeg_data"][10] is None
+    assert raw_sessions[0]["eeg_data"][0] == samples[0]
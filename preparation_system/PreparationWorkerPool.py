@@ -0,0 +1,131 @@
+"""
+Module: PreparationWorkerPool
+Prepares raw sessions on a pool of worker processes.
+
+Author: Francesco Taverna
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Queue
+from typing import Callable, List, Optional
+
+from preparation_system.SessionPreparation import SessionPreparation
+
+
+class PreparationWorkerPool:
+    """
+    Runs the correction and feature extraction of raw session batches on a pool of worker processes.
+
+    Prepared sessions are handed to a delivery callback from a dedicated thread, either in the same order
+    the batches were submitted or as soon as each batch is ready (prepared sessions are tagged by uuid).
+    A batch that fails on the workers is prepared again in-process one session at a time, the raw sessions
+    that cannot be prepared are handed to a failure callback and counted.
+    """
+
+    def __init__(self, session_preparation: SessionPreparation, deliver: Callable[[dict], None],
+                 workers: int, max_pending_batches: int, ordered_delivery: bool = True,
+                 fail: Optional[Callable[[dict], None]] = None):
+        """
+        Start the worker processes and the delivery thread.
+
+        :param session_preparation: SessionPreparation instance, copied in every worker.
+        :param deliver: function called with each prepared session (e.g. to send it).
+        :param workers: number of worker processes.
+        :param max_pending_batches: maximum number of batches being prepared or delivered, submit blocks beyond it.
+        :param ordered_delivery: True to deliver batches in submission order, False to deliver them as they complete.
+        :param fail: function called with each raw session that could not be prepared (e.g. to end its span).
+        """
+        self._session_preparation = session_preparation
+        self._deliver = deliver
+        self._fail = fail
+        self._ordered_delivery = ordered_delivery
+        self._workers = workers
+
+        # batches that failed on the workers, and the raw sessions that could not be prepared in-process either
+        self.failed_batches = 0
+        self.failed_sessions = 0
+
+        # spawn instead of fork: the orchestrator process already runs the Flask server thread
+        self._executor = self._new_executor()
+
+        # back-pressure: one slot for each batch that is not delivered yet
+        self._slots = threading.BoundedSemaphore(max_pending_batches)
+
+        # futures to deliver, in submission order or in completion order
+        self._deliveries = Queue()
+
+        thread = threading.Thread(target=self._deliver_loop, daemon=True)
+        thread.start()
+
+    def submit(self, raw_sessions: List[dict]) -> None:
+        """
+        Submit a batch of raw sessions to the workers, blocking while the pool is full.
+
+        :param raw_sessions: list of raw sessions (as dict).
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._session_preparation.prepare_raw_sessions, raw_sessions)
+        except BrokenProcessPool:
+            # a worker died: its pending batches fail and are prepared in-process, new batches go to a new pool
+            print("Preparation workers terminated abruptly, restarting them")
+            self._executor = self._new_executor()
+            future = self._executor.submit(self._session_preparation.prepare_raw_sessions, raw_sessions)
+
+        if self._ordered_delivery:
+            self._deliveries.put((future, raw_sessions))
+        else:
+            future.add_done_callback(lambda done: self._deliveries.put((done, raw_sessions)))
+
+    def shutdown(self) -> None:
+        """
+        Wait for all submitted batches to be prepared and delivered, then stop the workers.
+        """
+        self._deliveries.join()
+        self._executor.shutdown(wait=True)
+
+    def _deliver_loop(self) -> None:
+        """
+        Wait for the prepared batches and deliver their prepared sessions.
+        """
+        while True:
+            future, raw_sessions = self._deliveries.get()
+            try:
+                try:
+                    prepared_sessions = future.result()
+                except Exception as e:
+                    print(f"Error preparing a batch of {len(raw_sessions)} raw sessions: {e}")
+                    self.failed_batches += 1
+                    prepared_sessions = self._prepare_in_process(raw_sessions)
+
+                for prepared_session in prepared_sessions:
+                    try:
+                        self._deliver(prepared_session)
+                    except Exception as e:
+                        print(f"Error delivering prepared session {prepared_session.get('uuid')}: {e}")
+            finally:
+                self._slots.release()
+                self._deliveries.task_done()
+
+    def _prepare_in_process(self, raw_sessions: List[dict]) -> List[dict]:
+        """
+        Prepare the raw sessions of a failed batch one at a time, so that an invalid session does not lose the others.
+
+        :param raw_sessions: list of raw sessions (as dict).
+        :return: the prepared sessions of the raw sessions that could be prepared, in the same order.
+        """
+        prepared_sessions = []
+        for raw_session in raw_sessions:
+            try:
+                prepared_sessions.extend(self._session_preparation.prepare_raw_sessions([raw_session]))
+            except Exception as e:
+                print(f"Error preparing raw session {raw_session.get('uuid')}: {e}")
+                self.failed_sessions += 1
+                if self._fail is not None:
+                    self._fail(raw_session)
+        return prepared_sessions
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self._workers, mp_context=multiprocessing.get_context("spawn"))
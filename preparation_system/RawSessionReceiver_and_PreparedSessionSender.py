@@ -6,15 +6,21 @@ Author: Francesco Taverna
 
 """
 import json
+import struct
+import time
 
 from flask import Flask, request, jsonify
-import threading
 import requests
 from queue import Queue, Empty
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 from preparation_system.preparation_json_handler.json_handler import JsonHandler
 from preparation_system import RAW_SESS_SCHEMA_FILE_PATH
+from ingestion_system.raw_session import RawSession
+from utility.http_client.headers import SENDER_PORT_HEADER, RAW_SESSION_CONTENT_TYPE
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import Tracer, TRACE_HEADER
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class RawSessionReceiver_and_PrepareSessionSender:
@@ -33,6 +39,8 @@ class RawSessionReceiver_and_PrepareSessionSender:
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
 
         # Thread-safe queue for received messages
         self.message_queue = Queue()
@@ -40,37 +48,49 @@ class RawSessionReceiver_and_PrepareSessionSender:
         # Define a route to receive messages
         @self.app.route('/send', methods=['POST'])
         def receive_message():
-            data = request.json
+            received = time.time()
             sender_ip = request.remote_addr
-            sender_port = data.get('port')
-            message = data.get('message')
+            if request.mimetype == RAW_SESSION_CONTENT_TYPE:
+                # binary raw session, decoded when it is taken from the queue
+                sender_port = request.headers.get(SENDER_PORT_HEADER, type=int)
+                message = request.get_data()
+            else:
+                data = request.json
+                sender_port = data.get('port')
+                message = data.get('message')
 
             if not message:
                 return jsonify({"error": "Invalid message format"}), 400
 
-            # Add the message to the queue
+            # Add the message to the queue, with its trace context
             self.message_queue.put({
                 'ip': sender_ip,
                 'port': sender_port,
-                'message': message
+                'message': message,
+                'trace': request.headers.get(TRACE_HEADER),
+                'received': received
             })
 
             return jsonify({"status": "received"}), 200
 
-    def start_server(self):
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
-    def send_message(self, target_ip: str, target_port: int, message) -> Optional[Dict]:
+    def send_message(self, target_ip: str, target_port: int, message,
+                     headers: Optional[Dict] = None) -> Optional[Dict]:
         """
         Send a message to a target module.
 
         :param target_ip: The IP address of the target module.
         :param target_port: The port of the target module.
         :param message: The message to send (typically a JSON string).
+        :param headers: Additional HTTP headers (e.g. the trace context).
         :return: The response from the target, if any.
         """
         url = f"http://{target_ip}:{target_port}/send"
@@ -79,7 +99,7 @@ class RawSessionReceiver_and_PrepareSessionSender:
             "message": message
         }
         try:
-            response = requests.post(url, json=payload, timeout=5)
+            response = self.http_client.post(url, json=payload, headers=headers)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
@@ -95,15 +115,79 @@ class RawSessionReceiver_and_PrepareSessionSender:
         """
         try:
             message = self.message_queue.get(timeout=timeout, block=True)
-            new_raw_session = json.loads(message["message"])
-
-            # validate json
-            handler = JsonHandler()
-            is_valid = handler.validate_json(new_raw_session, RAW_SESS_SCHEMA_FILE_PATH)
-            if is_valid is False:
-                return True, new_raw_session
-            return False, new_raw_session
+            return self._parse_raw_session(message)
 
         except Empty:
             print("No messages received within the timeout period.")
             return None
+
+    def get_messages(self, max_messages: int, timeout: float) -> List[Dict]:
+        """
+        Retrieve a batch of raw sessions from the queue. Blocks until the first message is received,
+        then keeps draining the queue until max_messages are collected or timeout seconds are elapsed.
+
+        :param max_messages: Maximum number of messages in the batch.
+        :param timeout: Maximum time to wait for the batch to be filled after the first message (in seconds).
+        :return: The list of valid raw sessions received (invalid ones are discarded).
+        """
+        raw_sessions = []
+        deadline = None
+        for _ in range(max_messages):
+            try:
+                if deadline is None:
+                    message = self.message_queue.get(block=True)
+                    deadline = time.monotonic() + timeout
+                else:
+                    message = self.message_queue.get(block=True, timeout=max(deadline - time.monotonic(), 0))
+            except Empty:
+                break
+
+            is_invalid, new_raw_session = self._parse_raw_session(message)
+            if not is_invalid:
+                raw_sessions.append(new_raw_session)
+
+        return raw_sessions
+
+    @staticmethod
+    def _parse_raw_session(message: Dict):
+        """
+        Convert a received message in a raw session and validate it.
+
+        :param message: message taken from the queue.
+        :return: True if the raw session is not valid, False otherwise, and the raw session (as dict).
+        """
+        if isinstance(message["message"], bytes):
+            try:
+                new_raw_session = RawSessionReceiver_and_PrepareSessionSender._decode_raw_session(message["message"])
+            except (struct.error, ValueError, TypeError, KeyError) as e:
+                print(f"Invalid binary raw session: {e}")
+                return True, None
+        else:
+            new_raw_session = json.loads(message["message"])
+
+        # validate json
+        handler = JsonHandler()
+        is_valid = handler.validate_json(new_raw_session, RAW_SESS_SCHEMA_FILE_PATH)
+        if is_valid is False:
+            return True, new_raw_session
+
+        # the span of the session starts when the message is received, before waiting in the queue
+        Tracer.get_instance().receive(new_raw_session["uuid"], message.get("trace"), message.get("received"))
+        return False, new_raw_session
+
+    @staticmethod
+    def _decode_raw_session(data: bytes) -> Dict:
+        """
+        Convert a binary raw session in a raw session dictionary, missing samples (NaN) become None.
+
+        :param data: length-prefixed JSON header followed by the EEG samples buffer.
+        :return: the raw session (as dict).
+        """
+        raw_session = RawSession.from_bytes(data)
+        return {
+            "uuid": raw_session.uuid,
+            "environment": raw_session.environment,
+            "label": raw_session.label,
+            "eeg_data": raw_session.eeg_data_to_list(),
+            "activity": raw_session.activity
+        }
@@ -9,11 +9,37 @@ from typing import Union
 import numpy as np
 from mne.time_frequency.multitaper import psd_array_multitaper
 from scipy.integrate import simps
+from scipy.interpolate import CubicSpline
 
+#bandwidths extracted from eeg_data when the configuration does not provide them
+DEFAULT_BANDS = {
+    "psd_alpha_band": [8, 12],
+    "psd_beta_band": [12, 30],
+    "psd_theta_band": [1, 4],
+    "psd_delta_band": [4, 8]
+}
+DEFAULT_SAMPLING_FREQUENCY = 100.0 #taken from EEG website
+
+#strategies available to fill the missing samples
+INTERPOLATION_STRATEGIES = ["linear", "nearest", "spline", "zero_order_hold"]
 
 
 class SessionPreparation:
 
+    def __init__(self, bands: dict = None, sampling_frequency: float = DEFAULT_SAMPLING_FREQUENCY,
+                 interpolation: str = "linear"):
+        """
+        :param bands: bandwidths to extract from eeg_data, as {feature name: [low, high]}
+        :param sampling_frequency: sample frequency of eeg_data
+        :param interpolation: strategy used to fill the missing samples, one of INTERPOLATION_STRATEGIES
+        """
+        if interpolation not in INTERPOLATION_STRATEGIES:
+            raise ValueError(f"Invalid interpolation strategy. Supported strategies: {INTERPOLATION_STRATEGIES}.")
+
+        self.bands = bands if bands is not None else DEFAULT_BANDS
+        self.sampling_frequency = sampling_frequency
+        self.interpolation = interpolation
+
     def correct_missing_samples(self, raw_session: dict, placeholder: Union[int, str, None]) -> dict:
         """
         corrects the missing samples with an interpolation function
@@ -21,26 +47,64 @@ class SessionPreparation:
         :param placeholder: missing value to replace
         :return: False if records are missing, the raw session otherwise (as dict)
         """
+        eeg_data = raw_session['eeg_data']
+
+        # Mask of the missing samples (None is converted to NaN by numpy)
+        if placeholder is None:
+            samples = np.array(eeg_data, dtype=float)
+            missing = np.isnan(samples)
+        else:
+            missing = np.array([value is placeholder for value in eeg_data], dtype=bool)
+            samples = np.array([np.nan if is_missing else value for value, is_missing in zip(eeg_data, missing)],
+                               dtype=float)
+
+        # nothing to fill, or no valid sample to interpolate from
+        if not missing.any() or missing.all():
+            return raw_session
+
+        # for interpolating it is necessary to use two sets of points:
+        # x is the set of points indexes with valid value
+        # y is the sets of corresponding values of indexes in x
+        # then all the missing indexes are computed in a single pass
+        indices = np.arange(len(samples))
+        valid_indices = indices[~missing]
+        missing_indices = indices[missing]
+        valid_values = samples[~missing]
+
+        samples[missing] = self._interpolate(missing_indices, valid_indices, valid_values)
+
+        raw_session['eeg_data'] = samples.tolist()
+        return raw_session
 
-        # Find indices of null values in the list
-        null_indices = [i for i, value in enumerate(raw_session['eeg_data']) if value is placeholder]
+    def _interpolate(self, x: np.ndarray, xp: np.ndarray, fp: np.ndarray) -> np.ndarray:
+        """
+        computes the values of the missing samples with the configured interpolation strategy
+        :param x: indexes of the missing samples
+        :param xp: indexes of the valid samples (increasing)
+        :param fp: values of the valid samples
+        :return: values of the missing samples
+        """
+        if self.interpolation == "nearest":
+            # closest valid sample, the previous one in case of tie
+            right = np.clip(np.searchsorted(xp, x), 0, len(xp) - 1)
+            left = np.clip(right - 1, 0, len(xp) - 1)
+            use_left = np.abs(x - xp[left]) <= np.abs(xp[right] - x)
+            return np.where(use_left, fp[left], fp[right])
 
-        # Create an array of indices for the non-null values
-        other_indices = [i for i in range(len(raw_session['eeg_data'])) if i not in null_indices]
+        if self.interpolation == "zero_order_hold":
+            # last valid sample before the missing one, the first valid sample for leading missing samples
+            previous = np.clip(np.searchsorted(xp, x) - 1, 0, len(xp) - 1)
+            return fp[previous]
 
-        # Perform linear interpolation for each null value and update the list in place
-        for null_index in null_indices:
-            # Use numpy.interp for linear interpolation
-            # for interpolating it is necessary to use two sets of points:
-            # x is the set of points indexes with valid value
-            # y is the sets of corresponding values of indexes in x
-            # then the function computes the mid point null_index
-            interpolated_value = np.interp(null_index, other_indices, [raw_session['eeg_data'][i] for i in other_indices])
+        # linear interpolation, the first/last valid value is used outside the valid range
+        values = np.interp(x, xp, fp)
 
-            # Update the value in the original data list
-            raw_session['eeg_data'][null_index] = interpolated_value
+        if self.interpolation == "spline" and len(xp) > 1:
+            # cubic spline only between the first and the last valid sample, to avoid extrapolation
+            inner = np.logical_and(x > xp[0], x < xp[-1])
+            values[inner] = CubicSpline(xp, fp)(x[inner])
 
-        return raw_session
+        return values
 
     def correct_outliers(self, raw_session: dict) -> dict:
         """
@@ -72,6 +136,44 @@ class SessionPreparation:
 
         return raw_session
 
+    def extract_features(self, time_series: np.array, sf: float, bands: dict, relative=False) -> dict:
+        """Compute the average power of the signal x in every frequency band, estimating the spectrum only once.
+            Parameters:
+                time_series: 1-d or 2-d array
+                    Input signal in time-domain, or one signal per row
+                    (the spectra of all rows are computed together)
+                sf : float
+                    sample frequency of the data
+                bands: dict
+                    lower and upper frequencies of each band of interest, indexed by feature name.
+                relative: boolean
+                    If True, return the relative power ( = divided by the total power of the signal).
+                    If False (default), return the absolute power
+            Return:
+                features: dict
+                    Absolute or relative band power of each band (one value per row for a 2-d input),
+                    indexed by feature name
+        """
+        psd, frequencies = psd_array_multitaper(time_series, sf, adaptive=True, normalization='full', verbose=0)
+
+        # Frequency resolution
+        freq_res = frequencies[1] - frequencies[0]
+
+        total_power = simps(psd, dx=freq_res, axis=-1) if relative else None
+
+        features = {}
+        for name, (low, high) in bands.items():
+            # Find index of band in frequency vector
+            idx_band = np.logical_and(frequencies >= low, frequencies <= high)
+
+            # Integral approximation of the spectrum using parabola (Simpson's rule)
+            bp = simps(psd[..., idx_band], dx=freq_res, axis=-1)
+            if relative:
+                bp /= total_power
+            features[name] = bp
+
+        return features
+
     def extract_feature(self, time_series: np.array, sf: float, band: list, relative=False) -> float:
         """Compute the average power of the signal x in a specific frequency band.
             Parameters:
@@ -88,49 +190,64 @@ class SessionPreparation:
                 bp: float
                     Absolute or relative band power
         """
-        band = np.asarray(band)
-        low, high = band
-        psd, frequencies = psd_array_multitaper(time_series, sf, adaptive=True, normalization='full', verbose=0)
+        return self.extract_features(time_series, sf, {"band": band}, relative)["band"]
 
-        # Frequency resolution
-        freq_res = frequencies[1] - frequencies[0]
+    def prepare_raw_sessions(self, raw_sessions: list) -> list:
+        """
+        corrects a batch of raw sessions and creates their prepared sessions
+        :param raw_sessions: list of raw sessions
+        :return: list of prepared sessions (as dict), in the same order of raw_sessions
+        """
+        raw_sessions_corrected = []
+        for raw_session in raw_sessions:
+            raw_session_corrected = self.correct_missing_samples(raw_session, None)
+            raw_session_corrected = self.correct_outliers(raw_session_corrected)
+            raw_sessions_corrected.append(raw_session_corrected)
 
-        # Find index of band in frequency vector
-        idx_band = np.logical_and(frequencies >= low, frequencies <= high)
+        # extract the features of the whole batch together
+        return self.create_prepared_sessions(raw_sessions_corrected)
 
-        # Integral approximation of the spectrum using parabola (Simpson's rule)
-        bp = simps(psd[idx_band], dx=freq_res)
-        if relative:
-            bp /= simps(psd, dx=freq_res)
+    def create_prepared_session(self, raw_session: dict) -> dict:
+        """
+        creates the prepared session extracting the features from a raw session
+        :param raw_session: corrected raw session
+        :return: the prepared session (as dict)
+        """
+        return self.create_prepared_sessions([raw_session])[0]
 
-        return bp
+    def create_prepared_sessions(self, raw_sessions: list) -> list:
+        """
+        creates the prepared sessions of many raw sessions at once, extracting the features
+        of all sessions with the same number of samples from a single 2-d array
+        :param raw_sessions: list of corrected raw sessions
+        :return: list of prepared sessions (as dict), in the same order of raw_sessions
+        """
+        prepared_sessions = [None] * len(raw_sessions)
 
-    def create_prepared_session(self, raw_session: dict) -> dict:
-            prepared_session = {
-                "uuid": raw_session["uuid"],
-                "label": raw_session["label"],
-            }
-
-            #create a numpy array
-            time_series = np.array(raw_session['eeg_data'])
-
-            #four main bandwidths to extract from eeg_data (hardcoded)
-            bandwidths = {
-                "psd_alpha_band": [8, 12],
-                "psd_beta_band": [12, 30],
-                "psd_theta_band": [1, 4],
-                "psd_delta_band": [4, 8]
-            }
-            sampling_frequency = 100.0 #taken from EEG website
-
-            for band, range_values in bandwidths.items():
-                prepared_session[band] = self.extract_feature(
-                    time_series,
-                    sampling_frequency,
-                    range_values
-                )
-
-            prepared_session["activity"] = raw_session["activity"]
-            prepared_session["environment"] = raw_session["environment"]
-
-            return prepared_session
+        #the multitaper PSD needs a rectangular matrix, so the sessions are grouped by length
+        groups = {}
+        for index, raw_session in enumerate(raw_sessions):
+            groups.setdefault(len(raw_session['eeg_data']), []).append(index)
+
+        for indices in groups.values():
+            #create a numpy array with one session per row
+            time_series = np.array([raw_sessions[index]['eeg_data'] for index in indices], dtype=float)
+
+            #the spectrum is computed once and every configured bandwidth is integrated from it
+            features = self.extract_features(time_series, self.sampling_frequency, self.bands)
+
+            for row, index in enumerate(indices):
+                raw_session = raw_sessions[index]
+                prepared_session = {
+                    "uuid": raw_session["uuid"],
+                    "label": raw_session["label"],
+                }
+                for band, band_powers in features.items():
+                    prepared_session[band] = band_powers[row]
+
+                prepared_session["activity"] = raw_session["activity"]
+                prepared_session["environment"] = raw_session["environment"]
+
+                prepared_sessions[index] = prepared_session
+
+        return prepared_sessions
@@ -6,6 +6,8 @@ import logging
 
 import jsonschema
 
+from utility.json_handler.schema_registry import SchemaRegistry
+
 class JsonHandler:
     """
         A class to read and save file json
@@ -40,10 +42,9 @@ class JsonHandler:
             :param schema_path: path to the json schema relative to the data folder
             :return: True if json object is valid, False otherwise
             """
-        with open(schema_path, "r", encoding="UTF-8") as file:
-            json_schema = json.load(file)
         try:
-            jsonschema.validate(instance=json_data, schema=json_schema)
+            # the schema is read and compiled once, not on every message
+            SchemaRegistry.get_instance().validate(json_data, schema_path)
         except jsonschema.exceptions.ValidationError as ex:
             logging.error(ex)
             return False
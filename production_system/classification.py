@@ -1,23 +1,115 @@
 """
 Author: Alessandro Ascani
 """
+import threading
 import joblib
-import pandas as pd
-from sklearn.neural_network import MLPClassifier
+import numpy as np
+from production_system.deployment import Deployment
 from production_system.label import Label
+from production_system.numpy_mlp import NumpyMLP
 
 
+# features of a prepared session, in the order used to train the classifier
+FEATURE_NAMES = ('psd_alpha_band', 'psd_beta_band', 'psd_theta_band', 'psd_delta_band', 'activity', 'environment')
+
+ENVIRONMENT_MAPPING = {"slippery": 0, "plain": 1, "slope": 2, "house": 3, "track": 4}
+ACTIVITY_MAPPING = {"shopping": 0, "sport": 1, "cooking": 2, "relax": 3, "gaming": 4}
+LABEL_MAPPING = {0: "turnRight", 1: "turnLeft", 2: "move"}
 
 
 class Classification:
     """
      Class that managing the classifier executing the deployment and classification operation
 
+     A single instance is kept by the orchestrator: the classifier is loaded once per deployment
+     and the features are written in a preallocated row. After a new Deployment.deploy the new
+     classifier is loaded and warmed in the background, the previous one classifies the sessions
+     until it is replaced.
     """
-    def __init__(self):
-        self._classifier: MLPClassifier or None = None
-
+    def __init__(self, model_path: str = None):
+        """
+        Args:
+            model_path: path of the classifier, None for the one saved by the last Deployment.deploy
+        """
+        self._model_path = model_path
+        # classifier in use: (NumpyMLP or scikit-learn classifier, Deployment.model_version, Deployment.model_id),
+        # replaced with a single assignment when a new classifier is ready
+        self._active = None
+        # background loading of a new classifier
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+        # Deployment.model_version that could not be loaded, it is not retried
+        self._failed_version = None
+        # features of the sessions being classified, it grows with the largest batch
+        self._features = np.empty((1, len(FEATURE_NAMES)))
+
+    @property
+    def model_version(self):
+        """
+        Returns:
+            the Deployment.model_id of the classifier in use, None if no classifier is loaded
+        """
+        active = self._active
+        return None if active is None else active[2]
 
+    def load(self):
+        """
+        Load and warm the deployed classifier, then use it for the next classifications.
+        """
+        model_version = Deployment.model_version
+        model_id = Deployment.model_id
+        model_path = self._model_path or Deployment.model_path
+
+        if model_path.endswith(".npz"):
+            # forward pass in NumPy, scikit-learn is not needed
+            classifier = NumpyMLP.load(model_path)
+            feature_names = classifier.feature_names or None
+        else:
+            classifier = joblib.load(model_path)
+            feature_names = getattr(classifier, 'feature_names_in_', None)
+            if feature_names is not None:
+                # drop the names of the DataFrame columns used in training,
+                # so that predict accepts the NumPy row without a warning on every call
+                del classifier.feature_names_in_
+
+        # check the order of the features once
+        if feature_names is not None and tuple(feature_names) != FEATURE_NAMES:
+            raise ValueError(f"unexpected classifier features: {list(feature_names)}")
+
+        # a first prediction, so that the first session does not pay for the lazy initializations
+        classifier.predict(np.zeros((1, len(FEATURE_NAMES))))
+
+        self._active = (classifier, model_version, model_id)
+
+    def reload(self):
+        """
+        Load the last deployed classifier in the background, the current one is used until the new one is ready.
+        """
+        with self._reload_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                # the classifier loaded by the running thread is checked again at the next classification
+                return
+            self._reload_thread = threading.Thread(target=self._reload, daemon=True)
+            self._reload_thread.start()
+
+    def wait_reload(self, timeout: float = None):
+        """
+        Wait for the background loading of the classifier to end.
+        Args:
+            timeout: maximum time to wait (in seconds), None to wait indefinitely
+        """
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _reload(self):
+        model_version = Deployment.model_version
+        try:
+            self.load()
+        except Exception as e:
+            # the previous classifier, if any, is kept
+            print(f"error loading classifier version {Deployment.model_id}: {e}")
+            self._failed_version = model_version
 
     def classify(self, prepared_session, classifier_deployed):
         """
@@ -31,42 +123,57 @@ class Classification:
 
         """
 
-        if classifier_deployed is False:
+        labels = self.classify_batch([prepared_session], classifier_deployed)
+        if labels is None:
             return None
+        return labels[0]
 
-        # convert prepared session json in python object
-        if self._classifier is None:
-            self._classifier = joblib.load("model/classifier.sav")
-
-
-        environment_mapping = {"slippery":0, "plain":1, "slope":2, "house":3, "track":4}
-        activity_mapping = {"shopping":0, "sport":1, "cooking":2, "relax":3, "gaming":4}
-
-        # convert features in Data Frame
-        features_struct = {
-            'psd_alpha_band': prepared_session['psd_alpha_band'],
-            'psd_beta_band': prepared_session['psd_beta_band'],
-            'psd_theta_band': prepared_session['psd_theta_band'],
-            'psd_delta_band': prepared_session['psd_delta_band'],
-            'activity': activity_mapping.get(prepared_session['activity']),
-            'environment': environment_mapping.get(prepared_session['environment'])
-        }
-
-        features_DF = pd.DataFrame([features_struct])
-
-        label_identified = self._classifier.predict(features_DF)
-        print(label_identified)
-        label_mapping = {
-            0: "turnRight",
-            1: "turnLeft",
-            2: "move"
-        }
-
-        # Set values for the label json
-        movement = label_mapping.get(int(round(float(label_identified.flatten()[0]))), None)
-        label = Label(prepared_session['uuid'], movement)
+    def classify_batch(self, prepared_sessions, classifier_deployed):
+        """
+        Method that classify several prepared sessions with a single prediction of the classifier
+        Args:
+            prepared_sessions: list of prepared sessions that must be classified
+            classifier_deployed: flag that say if a classifier was deployed in a previous deployment session
 
+        Returns:
+            labels: list of label objects, in the same order of prepared_sessions
 
-        return label
+        """
 
+        if classifier_deployed is False:
+            return None
 
+        active = self._active
+        if active is None:
+            # nothing to classify with yet: wait for the classifier being loaded, or load it now
+            self.wait_reload()
+            if self._active is None:
+                self.load()
+            active = self._active
+        elif active[1] != Deployment.model_version and self._failed_version != Deployment.model_version:
+            # a new deployment: it is loaded in the background, meanwhile the current classifier is used
+            self.reload()
+        classifier, _, model_id = active
+
+        if len(prepared_sessions) > len(self._features):
+            self._features = np.empty((len(prepared_sessions), len(FEATURE_NAMES)))
+        features = self._features[:len(prepared_sessions)]
+
+        # encode the features in the preallocated rows (an unknown category becomes NaN)
+        for row, prepared_session in zip(features, prepared_sessions):
+            row[0] = prepared_session['psd_alpha_band']
+            row[1] = prepared_session['psd_beta_band']
+            row[2] = prepared_session['psd_theta_band']
+            row[3] = prepared_session['psd_delta_band']
+            row[4] = ACTIVITY_MAPPING.get(prepared_session['activity'], np.nan)
+            row[5] = ENVIRONMENT_MAPPING.get(prepared_session['environment'], np.nan)
+
+        labels_identified = np.asarray(classifier.predict(features)).reshape(len(prepared_sessions), -1)
+
+        # Set values for the label json, from the first output of each session
+        labels = []
+        for prepared_session, label_identified in zip(prepared_sessions, labels_identified):
+            movement = LABEL_MAPPING.get(int(round(float(label_identified[0]))), None)
+            labels.append(Label(prepared_session['uuid'], movement, model_id))
+
+        return labels
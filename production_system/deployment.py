@@ -1,25 +1,138 @@
 """
 Author: Alessandro Ascani
 """
+import hashlib
+import json
+import os
+
+# an .npz file is a zip archive
+NPZ_MAGIC = b"PK\x03\x04"
+# path and identifier of the deployed classifier, read again when the production system restarts
+DEPLOYMENT_PATH = "model/deployment.json"
+# deployed classifiers, the most recent one is used when the deployment file is missing
+MODEL_PATHS = ("model/classifier.npz", "model/classifier.sav")
 
 class Deployment:
     """
      Class that execute deployment operation
     """
 
+    # incremented by every deployment, a classifier loaded before a deployment is outdated
+    model_version = 0
+    # identifier of the deployed classifier (prefix of the SHA-256 of its content), sent with each label
+    model_id = None
+    # path of the deployed classifier: the weights exported by the development system (.npz)
+    # or the whole pickled classifier (.sav)
+    model_path = "model/classifier.sav"
+
     @staticmethod
     def deploy(classifier):
         """
-        Saves the provided classifier in a .sav file
+        Saves the provided classifier in a .npz file (exported weights) or in a .sav file (pickled classifier).
+        The file is replaced atomically: a classifier being loaded never reads a partially written file.
         Args:
             classifier: file with classifier in binary format to save
         """
         try:
             binary_content = classifier.encode('latin1')
-            with  open("model/classifier.sav", "wb") as f:
+            model_path = Deployment._model_path(binary_content)
+
+            # write a temporary file, flush it to disk, then rename it over the deployed one
+            temporary_path = model_path + ".tmp"
+            with  open(temporary_path, "wb") as f:
                 f.write(binary_content)
+                f.flush()
+                os.fsync(f.fileno())
 
+            Deployment._install(temporary_path, model_path, hashlib.sha256(binary_content).hexdigest())
             return True
 
-        except (UnicodeEncodeError, IOError) as e:
+        except (UnicodeEncodeError, IOError):
             return False
+
+    @staticmethod
+    def deploy_file(classifier_path, sha256):
+        """
+        Deploys a classifier received in binary format, already written and flushed to disk
+        Args:
+            classifier_path: path of the received classifier, on the same file system of the model directory
+            sha256: SHA-256 of the classifier, checked on reception
+        """
+        try:
+            with open(classifier_path, "rb") as f:
+                model_path = Deployment._model_path(f.read(len(NPZ_MAGIC)))
+
+            Deployment._install(classifier_path, model_path, sha256)
+            return True
+
+        except IOError as e:
+            print(f"error deploying {classifier_path}: {e}")
+            return False
+
+    @staticmethod
+    def restore():
+        """
+        Restores the path and the identifier of the classifier deployed before a restart.
+        They are read from the deployment file, or worked out from the most recent classifier on disk
+        when the deployment file is missing.
+        """
+        try:
+            with open(DEPLOYMENT_PATH, "r") as f:
+                deployment = json.load(f)
+            if os.path.exists(deployment["model_path"]):
+                Deployment.model_path = deployment["model_path"]
+                Deployment.model_id = deployment["model_id"]
+                return
+        except (IOError, ValueError, KeyError, TypeError):
+            pass
+
+        model_paths = [model_path for model_path in MODEL_PATHS if os.path.exists(model_path)]
+        if not model_paths:
+            return
+        model_path = max(model_paths, key=os.path.getmtime)
+        sha256 = hashlib.sha256()
+        try:
+            with open(model_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(chunk)
+        except IOError as e:
+            print(f"error reading {model_path}: {e}")
+            return
+        Deployment.model_path = model_path
+        Deployment.model_id = sha256.hexdigest()[:12]
+
+    @staticmethod
+    def _model_path(header):
+        """
+        Args:
+            header: first bytes of the classifier
+
+        Returns:
+            the path of the deployed classifier: .npz for the exported weights, .sav for a pickled classifier
+        """
+        if isinstance(header, bytes) and header.startswith(NPZ_MAGIC):
+            return "model/classifier.npz"
+        return "model/classifier.sav"
+
+    @staticmethod
+    def _install(source_path, model_path, sha256):
+        """
+        Replaces the deployed classifier with a file in a single rename, then publishes the new version
+        Args:
+            source_path: path of the new classifier
+            model_path: path of the deployed classifier
+            sha256: SHA-256 of the new classifier
+        """
+        os.replace(source_path, model_path)
+
+        # the deployment file is replaced in the same way, it always names a complete classifier
+        temporary_path = DEPLOYMENT_PATH + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"model_path": model_path, "model_id": sha256[:12]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, DEPLOYMENT_PATH)
+
+        Deployment.model_id = sha256[:12]
+        Deployment.model_path = model_path
+        Deployment.model_version += 1
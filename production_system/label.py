@@ -7,13 +7,14 @@ class Label:
     Data Object class to represent a Label created in Production System.
     """
 
-    def __init__(self, uuid: str, movements: str):
+    def __init__(self, uuid: str, movements: str, model_version: str = None):
         """
-        Initialize the Label with uuid and movements fields.
+        Initialize the Label with uuid and movements fields, and the version of the classifier that produced it.
 
         """
         self._uuid = uuid
         self._movements = movements
+        self._model_version = model_version
 
     @property
     def uuid(self) -> str:
@@ -55,6 +56,16 @@ class Label:
         """
         self._movements = value
 
+    @property
+    def model_version(self) -> str:
+        """
+        Get the version of the classifier that produced the label.
+
+        Returns:
+            str: The version of the classifier, None if unknown.
+        """
+        return self._model_version
+
     def convert_movement(self):
         """
         Mapping int value of movement in string
@@ -83,5 +94,7 @@ class Label:
             "uuid": self._uuid,
             "movements": self._movements
         }
+        if self._model_version is not None:
+            result["model_version"] = self._model_version
 
         return result
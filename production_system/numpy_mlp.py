@@ -0,0 +1,105 @@
+"""
+Author: Alessandro Ascani
+"""
+import numpy as np
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _tanh(x):
+    return np.tanh(x, out=x)
+
+
+def _logistic(x):
+    # 1 / (1 + exp(-x)), computed in place
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1
+    return np.reciprocal(x, out=x)
+
+
+def _identity(x):
+    return x
+
+
+def _softmax(x):
+    x -= x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+ACTIVATIONS = {"relu": _relu, "tanh": _tanh, "logistic": _logistic, "identity": _identity, "softmax": _softmax}
+
+
+class NumpyMLP:
+    """
+     Forward pass of the MLP classifier exported by the development system (Classifier.export_weights),
+     it gives the same predictions of MLPClassifier.predict using only NumPy.
+    """
+
+    def __init__(self, coefs, intercepts, activation, out_activation, label_type, classes, feature_names=()):
+        """
+        Args:
+            coefs: weight matrix of each layer
+            intercepts: bias vector of each layer
+            activation: activation function of the hidden layers
+            out_activation: activation function of the output layer
+            label_type: type of the labels used in training ("multilabel-indicator", "multiclass" or "binary")
+            classes: labels of the classes
+            feature_names: names of the features used in training, empty if unknown
+        """
+        if activation not in ACTIVATIONS or out_activation not in ACTIVATIONS:
+            raise ValueError(f"unsupported activation: {activation}, {out_activation}")
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.activation = activation
+        self.out_activation = out_activation
+        self.label_type = label_type
+        self.classes = classes
+        self.feature_names = tuple(feature_names)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a classifier exported by the development system
+        Args:
+            path: path of the .npz file
+
+        Returns:
+            the NumpyMLP of the exported classifier
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            n_layers = sum(1 for name in arrays.files if name.startswith("coefs_"))
+            return cls([arrays[f"coefs_{i}"] for i in range(n_layers)],
+                       [arrays[f"intercepts_{i}"] for i in range(n_layers)],
+                       str(arrays["activation"]), str(arrays["out_activation"]), str(arrays["label_type"]),
+                       arrays["classes"], [str(name) for name in arrays["feature_names"]])
+
+    def predict(self, features):
+        """
+        Classify the sessions
+        Args:
+            features: matrix with the features of a session in each row
+
+        Returns:
+            the predicted labels, in the format of MLPClassifier.predict
+        """
+        activation = np.asarray(features, dtype=np.float64)
+        hidden_activation = ACTIVATIONS[self.activation]
+        last = len(self.coefs) - 1
+        for i, (coefs, intercepts) in enumerate(zip(self.coefs, self.intercepts)):
+            activation = activation @ coefs
+            activation += intercepts
+            if i != last:
+                hidden_activation(activation)
+        ACTIVATIONS[self.out_activation](activation)
+
+        # same decoding of the output of the LabelBinarizer used by MLPClassifier
+        if self.label_type == "multilabel-indicator":
+            return (activation > 0.5).astype(int)
+        if self.label_type == "binary":
+            return self.classes[(activation.ravel() > 0.5).astype(int)]
+        return self.classes[activation.argmax(axis=1)]
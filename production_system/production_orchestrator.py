@@ -10,6 +10,15 @@ from production_system.production_system_communication import ProductionSystemIO
 from production_system.classification import Classification
 from production_system.deployment import Deployment
 from production_system.json_validation import JsonHandler
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import Tracer
+
+# Micro-batching parameters used when they are missing from the configuration
+DEFAULT_MICRO_BATCHING = {
+    "enabled": False,
+    "max_batch_size": 32,
+    "max_wait_ms": 2
+}
 
 
 
@@ -29,9 +38,19 @@ class ProductionOrchestrator:
 
         self._configuration = ConfigurationParameters()
         self._evaluation_phase = self._configuration.parameters['evaluation_phase']
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(self._configuration.parameters.get("http_client") or {}))
         self._prod_sys_io = ProductionSystemIO("0.0.0.0", 5005)
         self._session_counter = 0
         self._deployed = False
+        # the classifier deployed before a restart is used until a new one is received
+        Deployment.restore()
+        # long-lived inference engine, the classifier is loaded once per deployment
+        self._classification = Classification()
+        # spans of the sessions, reported to the Service Class if tracing is enabled
+        self._tracer = Tracer.configure("Production System", self._configuration.parameters.get("tracing"))
+        # prepared sessions received together are classified with a single prediction
+        self._micro_batching = {**DEFAULT_MICRO_BATCHING, **(self._configuration.parameters.get("micro_batching") or {})}
 
 
 
@@ -42,7 +61,7 @@ class ProductionOrchestrator:
 
         """
         print("Start production process")
-        self._prod_sys_io.start_server()
+        self._prod_sys_io.start_server(self._configuration.parameters.get("serving"))
         while True:
 
             # receive classifier or prepared session
@@ -55,22 +74,24 @@ class ProductionOrchestrator:
                 self._prod_sys_io.send_timestamp(time.time(), "start")
 
 
-            handler = JsonHandler()
-
-
-
             #develop session
             if message['ip'] == self._configuration.global_netconf['Development System']['ip'] :
                 #deploy operation
                 print("Classifier received")
 
-                #convert json message in object class
-                classifier_json = message['message']
-
                 deployment = Deployment()
-                result = deployment.deploy(classifier_json)
+                if 'classifier_path' in message:
+                    # classifier uploaded in binary format, already checked against its hash
+                    result = deployment.deploy_file(message['classifier_path'], message['classifier_sha256'])
+                else:
+                    #convert json message in object class
+                    classifier_json = message['message']
+                    result = deployment.deploy(classifier_json)
                 if result is False:
                     print("error in classifier deployment")
+                else:
+                    # the new classifier replaces the current one as soon as it is loaded
+                    self._classification.reload()
 
                 print("classifier deployed")
                 self._deployed = True
@@ -91,62 +112,111 @@ class ProductionOrchestrator:
 
             # classify session
             elif message['ip'] == self._configuration.global_netconf['Preparation System']['ip'] :
-                #classify operation
-                print("Prepared session received")
-                prepared_session = message['message']
-                prepared_session_dict = json.loads(prepared_session)
-                # validation of json schema
-                schemas_path = "production_schema/PreparedSessionSchema.json"
-                result = handler.validate_json(prepared_session_dict, schemas_path)
-                if result is False:
-                    print("prepared session not valid")
-                    break
+                messages = [message]
+                if self._micro_batching["enabled"]:
+                    # the sessions already received, or received within max_wait_ms, join the batch
+                    messages = self._prod_sys_io.get_batch(message, self._micro_batching["max_batch_size"],
+                                                           self._micro_batching["max_wait_ms"] / 1000)
 
-                classification = Classification()
-                label = classification.classify(prepared_session_dict, self._deployed)
-                if label is None:
-                    print("error: classifier not deployed")
+                if not self._classify_sessions(messages):
                     break
 
-                print("label generated")
+                if self._unit_test:
+                    return
+
+            else:
+                print("sender unknown")
+                if self._unit_test:
+                    return
 
 
-                #if evaluation phase parameter is true label is sent also to Evaluation System
-                if self._evaluation_phase:
-                    eval_sys_ip = self._configuration.global_netconf['Evaluation System']['ip']
-                    eval_sys_port = self._configuration.global_netconf['Evaluation System']['port']
-                    print("Send label to evaluate session")
-                    self._prod_sys_io.send_label(eval_sys_ip, eval_sys_port, label, "send")
 
-                # Send label to client
-                serv_cl_ip = self._configuration.global_netconf['Service Class']['ip']
-                serv_cl_port = self._configuration.global_netconf['Service Class']['port']
-                print("Send label to service class")
-                self._prod_sys_io.send_label(serv_cl_ip, serv_cl_port, label, "client")
-                self._session_counter += 1
-                print(self._evaluation_phase)
-                print(self._session_counter)
+    def _classify_sessions(self, messages):
+        """
+        Classify prepared sessions and send their labels.
+        Args:
+            messages: received messages containing the prepared sessions
 
-                if self._service:
-                    print("Send end message to Service Class")
-                    self._prod_sys_io.send_timestamp(time.time(), "end")
+        Returns:
+            False if the production process must stop (invalid session or classifier not deployed),
+            after the valid sessions have been classified
+        """
+        handler = JsonHandler()
+        prepared_sessions = []
+        valid = True
+        for number, message in enumerate(messages):
+            #classify operation
+            print("Prepared session received")
+            if self._service and number > 0:
+                # the start message of the first session is sent when it is received
+                self._prod_sys_io.send_timestamp(message.get('received') or time.time(), "start")
+
+            prepared_session = message['message']
+            prepared_session_dict = json.loads(prepared_session)
+            # validation of json schema
+            schemas_path = "production_schema/PreparedSessionSchema.json"
+            result = handler.validate_json(prepared_session_dict, schemas_path)
+            if result is False:
+                print("prepared session not valid")
+                # only this session is skipped, the other sessions of the batch are classified
+                valid = False
+                continue
+
+            # the span of the session starts when the message is received
+            self._tracer.receive(prepared_session_dict["uuid"], message.get('trace'), message.get('received'))
+            prepared_sessions.append(prepared_session_dict)
+
+        if not prepared_sessions:
+            return valid
+
+        if len(prepared_sessions) == 1:
+            labels = self._classification.classify(prepared_sessions[0], self._deployed)
+            labels = None if labels is None else [labels]
+        else:
+            labels = self._classification.classify_batch(prepared_sessions, self._deployed)
+        if labels is None:
+            print("error: classifier not deployed")
+            return False
+
+        print("label generated")
+
+        for prepared_session_dict, label in zip(prepared_sessions, labels):
+
+            # Send label to client
+            serv_cl_ip = self._configuration.global_netconf['Service Class']['ip']
+            serv_cl_port = self._configuration.global_netconf['Service Class']['port']
+            targets = [(serv_cl_ip, serv_cl_port, "client")]
+            print("Send label to service class")
+
+            #if evaluation phase parameter is true label is sent also to Evaluation System
+            if self._evaluation_phase:
+                eval_sys_ip = self._configuration.global_netconf['Evaluation System']['ip']
+                eval_sys_port = self._configuration.global_netconf['Evaluation System']['port']
+                targets.append((eval_sys_ip, eval_sys_port, "send"))
+                print("Send label to evaluate session")
+
+            # the label is sent to all the targets at the same time, with the trace context of the session
+            self._tracer.process(prepared_session_dict["uuid"])
+            self._prod_sys_io.send_labels(targets, label, headers=self._tracer.context(prepared_session_dict["uuid"]))
+            self._tracer.send(prepared_session_dict["uuid"])
+            self._session_counter += 1
+            print(self._evaluation_phase)
+            print(self._session_counter)
 
+            if self._service:
+                print("Send end message to Service Class")
+                self._prod_sys_io.send_timestamp(time.time(), "end")
 
-                if self._evaluation_phase is True and self._session_counter == self._configuration.parameters['max_session_evaluation']:
-                    self._session_counter = 0
-                    self._evaluation_phase = False
 
-                elif self._evaluation_phase is False and self._session_counter == self._configuration.parameters['max_session_production']:
-                    self._session_counter = 0
-                    self._evaluation_phase = False
+            if self._evaluation_phase is True and self._session_counter == self._configuration.parameters['max_session_evaluation']:
+                self._session_counter = 0
+                self._evaluation_phase = False
 
-                if self._unit_test:
-                    return
+            elif self._evaluation_phase is False and self._session_counter == self._configuration.parameters['max_session_production']:
+                self._session_counter = 0
+                self._evaluation_phase = False
 
-            else:
-                print("sender unknown")
-                if self._unit_test:
-                    return
+        return valid
 
 
 
@@ -1,14 +1,34 @@
 """
     Class for managing the sending and receiving of messages
 """
+import gzip
+import hashlib
+import os
 import queue
+import re
+import shutil
 import threading
 import requests
 import json
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from production_system.label import Label
 from production_system.configuration_parameters import ConfigurationParameters
+from utility.http_client.headers import SENDER_PORT_HEADER, MODEL_ENCODING_HEADER
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import TRACE_HEADER
+from utility.wsgi_server.wsgi_server import WsgiServer
+
+# directory of the classifiers being uploaded, on the same file system of the deployed one
+UPLOAD_DIRECTORY = "model/uploads"
+# Content-Range of a chunk of an uploaded classifier: "bytes <first>-<last>/<total>"
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+SHA256 = re.compile(r"[0-9a-f]{64}")
+# number of completed uploads remembered, so that the retry of a completed upload does nothing
+COMPLETED_UPLOADS = 16
 
 
 class ProductionSystemIO:
@@ -27,16 +47,27 @@ class ProductionSystemIO:
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
+        # threads sending the same label to several systems at the same time, over the shared client
+        # (its threads are started by the first send)
+        self.send_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="label-sender")
         self.msg_queue = queue.Queue()
+        # messages taken from the queue while collecting a batch, but not part of it
+        self.pending_messages = deque()
 
         # Lock and condition for blocking behavior
         self.message_condition = threading.Condition()
+        # the chunks of the uploaded classifiers are written one at a time
+        self.upload_lock = threading.Lock()
+        # sha256 -> size of the completed uploads, the most recent last
+        self.completed_uploads = OrderedDict()
 
         # Define a route to receive messages
         @self.app.route('/send', methods=['POST'])
         def receive_message():
             # Get the sender's IP
-
+            received = time.time()
             data = request.json
             sender_ip = request.remote_addr
             sender_port = data.get('port')
@@ -45,19 +76,138 @@ class ProductionSystemIO:
             message = {
                 'ip': sender_ip,
                 'port': sender_port,
-                'message': message_content
+                'message': message_content,
+                'trace': request.headers.get(TRACE_HEADER),
+                'received': received
             }
 
             self.msg_queue.put(message)
 
             return jsonify({"status": "received"}), 200
 
-    def start_server(self):
+        # Define a route to know how much of a classifier has been uploaded, to resume the upload
+        @self.app.route('/classifier/<sha256>', methods=['GET'])
+        def get_classifier_upload(sha256):
+            if not SHA256.fullmatch(sha256):
+                return jsonify({"error": "Invalid classifier hash"}), 400
+            with self.upload_lock:
+                if sha256 in self.completed_uploads:
+                    # already received: the sender has nothing left to upload
+                    return jsonify({"received": self.completed_uploads[sha256], "status": "received"}), 200
+                return jsonify({"received": self._uploaded_bytes(sha256)}), 200
+
+        # Define a route to receive a classifier in binary format, in one or more chunks
+        @self.app.route('/classifier/<sha256>', methods=['PUT'])
+        def receive_classifier_chunk(sha256):
+            received = time.time()
+            if not SHA256.fullmatch(sha256):
+                return jsonify({"error": "Invalid classifier hash"}), 400
+            content_range = CONTENT_RANGE.fullmatch(request.headers.get("Content-Range", ""))
+            if content_range is None:
+                return jsonify({"error": "Missing or invalid Content-Range"}), 400
+            first, last, total = (int(value) for value in content_range.groups())
+
+            with self.upload_lock:
+                if sha256 in self.completed_uploads:
+                    # the response to the last chunk was lost: the classifier is not received again
+                    return jsonify({"status": "received", "received": self.completed_uploads[sha256]}), 200
+
+                uploaded = self._uploaded_bytes(sha256)
+                if first != uploaded:
+                    # a chunk lost or sent twice: the sender resumes from the bytes already received
+                    return jsonify({"error": "Unexpected chunk", "received": uploaded}), 409
+
+                os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+                with open(self._upload_path(sha256), "ab") as part_file:
+                    # the chunk is streamed to disk, it is never held in memory
+                    shutil.copyfileobj(request.stream, part_file, 64 * 1024)
+                uploaded = self._uploaded_bytes(sha256)
+                if uploaded > last + 1:
+                    # more bytes than announced: the chunk is discarded
+                    os.truncate(self._upload_path(sha256), first)
+                    uploaded = first
+                if uploaded != last + 1:
+                    return jsonify({"error": "Incomplete chunk", "received": uploaded}), 409
+                if uploaded < total:
+                    return jsonify({"status": "chunk received", "received": uploaded}), 200
+
+                classifier_path = self._complete_upload(sha256, request.headers.get(MODEL_ENCODING_HEADER, "identity"))
+                if classifier_path is not None:
+                    self.completed_uploads[sha256] = uploaded
+                    while len(self.completed_uploads) > COMPLETED_UPLOADS:
+                        self.completed_uploads.popitem(last=False)
+
+            if classifier_path is None:
+                return jsonify({"error": "The classifier does not match its hash"}), 422
+
+            self.msg_queue.put({
+                'ip': request.remote_addr,
+                'port': request.headers.get(SENDER_PORT_HEADER, type=int),
+                'classifier_path': classifier_path,
+                'classifier_sha256': sha256,
+                'received': received
+            })
+
+            return jsonify({"status": "received", "received": uploaded}), 200
+
+    @staticmethod
+    def _upload_path(sha256: str) -> str:
+        """
+        :param sha256: The hash of the classifier being uploaded.
+        :return: The path of the part of the classifier received so far.
+        """
+        return os.path.join(UPLOAD_DIRECTORY, f"{sha256}.part")
+
+    def _uploaded_bytes(self, sha256: str) -> int:
+        """
+        :param sha256: The hash of the classifier being uploaded.
+        :return: The number of bytes of the classifier received so far.
+        """
+        try:
+            return os.path.getsize(self._upload_path(sha256))
+        except OSError:
+            return 0
+
+    def _complete_upload(self, sha256: str, encoding: str) -> Optional[str]:
+        """
+        Decompress an uploaded classifier and check its hash.
+
+        :param sha256: The SHA-256 of the classifier, as sent by the Development System.
+        :param encoding: The encoding of the upload, "gzip" or "identity".
+        :return: The path of the received classifier, None if it does not match its hash (the upload is discarded).
+        """
+        part_path = self._upload_path(sha256)
+        classifier_path = os.path.join(UPLOAD_DIRECTORY, f"{sha256}.classifier")
+        digest = hashlib.sha256()
+        try:
+            opener = gzip.open if encoding == "gzip" else open
+            with opener(part_path, "rb") as source, open(classifier_path, "wb") as target:
+                # decompressed and hashed one block at a time
+                for block in iter(lambda: source.read(64 * 1024), b""):
+                    digest.update(block)
+                    target.write(block)
+                target.flush()
+                os.fsync(target.fileno())
+        except (OSError, EOFError) as e:
+            print(f"Error reading the uploaded classifier: {e}")
+        finally:
+            os.remove(part_path)
+
+        if digest.hexdigest() != sha256:
+            print("The uploaded classifier does not match its hash")
+            if os.path.exists(classifier_path):
+                os.remove(classifier_path)
+            return None
+        return classifier_path
+
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
     def send_configuration(self) -> Optional[Dict]:
         """
@@ -77,7 +227,7 @@ class ProductionSystemIO:
             "message": json.dumps(message)
         }
         try:
-            response = requests.post(url, json=payload)
+            response = self.http_client.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
@@ -107,7 +257,48 @@ class ProductionSystemIO:
             "message": label_json
         }
         try:
-            response = requests.post(url, json=payload)
+            response = self.http_client.post(url, json=payload)
+            if response.status_code == 200:
+                return response.json()
+        except requests.RequestException as e:
+            print(f"Error sending message: {e}")
+        return None
+
+    def send_labels(self, targets: List[Tuple[str, int, str]], label: Label,
+                    headers: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """
+        Send a label to several target modules at the same time.
+
+        :param targets: The (ip, port, rule) of each target module, rule as in send_label.
+        :param label: The label to send.
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from each target, if any, in the same order of targets.
+        """
+
+        # convert label into json
+        label_json = json.dumps(label.to_dictionary())
+        routes = {"send": "send", "client": "ClientSide"}
+        payload = {
+            "port": self.port,
+            "message": label_json
+        }
+        # the timeout and the retries are the ones configured for the HttpClient
+        futures = [self.send_executor.submit(self._post_message, f"http://{target_ip}:{target_port}/{routes[rule]}",
+                                             payload, headers)
+                   for target_ip, target_port, rule in targets]
+        return [future.result() for future in futures]
+
+    def _post_message(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Send a message over the shared HttpClient.
+
+        :param url: The URL of the target route.
+        :param payload: The message to send.
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from the target, if any.
+        """
+        try:
+            response = self.http_client.post(url, json=payload, headers=headers)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
@@ -120,9 +311,36 @@ class ProductionSystemIO:
 
         :return: A dictionary containing the sender's IP, port, and the message content.
         """
+        if self.pending_messages:
+            return self.pending_messages.popleft()
         print("waiting new message...")
         return self.msg_queue.get(block=True)
 
+    def get_batch(self, first_message: Dict, max_batch_size: int, max_wait: float) -> List[Dict]:
+        """
+        Collect the prepared sessions following a received one from the same sender, to process them together.
+        The batch ends when it has max_batch_size messages, after max_wait seconds, or when another message
+        is received (of another sender, or a classifier): it is returned by the next get_last_message.
+
+        :param first_message: The message starting the batch, as returned by get_last_message.
+        :param max_batch_size: Maximum number of messages of the batch.
+        :param max_wait: Maximum time (in seconds) spent waiting for the other messages.
+        :return: The messages of the batch, starting with first_message.
+        """
+        batch = [first_message]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < max_batch_size and not self.pending_messages:
+            try:
+                # the messages already received are taken without waiting
+                message = self.msg_queue.get(block=True, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if message['ip'] != first_message['ip'] or 'message' not in message:
+                self.pending_messages.append(message)
+                break
+            batch.append(message)
+        return batch
+
     # Testing method
     def send_timestamp(self, timestamp: float, status: str) -> bool:
         """
@@ -152,7 +370,7 @@ class ProductionSystemIO:
                 "message": json.dumps(timestamp_message)
             }
 
-            response = requests.post(url, json=packet)
+            response = self.http_client.post(url, json=packet)
             if response.status_code == 200:
                 return True
         except requests.RequestException as e:
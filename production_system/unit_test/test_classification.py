@@ -1,115 +1,150 @@
+import os
 import unittest
+import warnings
+import joblib
+import numpy as np
 import pandas as pd
 from unittest.mock import patch, MagicMock
 from production_system.classification import Classification
+from production_system.deployment import Deployment
 from production_system.label import Label
 
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model", "classifier.sav")
 
-class TestClassification(unittest.TestCase):
 
-    @patch('production_system.classification.joblib.load')
-    def test_classify_valid_prepared_session(self, mock_joblib_load):
-        # Mock the classifier loaded by joblib
-        mock_classifier = MagicMock()
-        mock_classifier.predict.return_value = ["movement_label"]
-        mock_joblib_load.return_value = mock_classifier
+class TestClassification(unittest.TestCase):
 
+    def setUp(self):
         # Test data
-        prepared_session_data = {
+        self.prepared_session_data = {
             "uuid": "001",
-            "PSD_alpha_band": 0.8,
-            "PSD_beta_band": 0.7,
-            "PSD_theta_band": 0.9,
-            "PSD_delta_band": 0.6,
+            "psd_alpha_band": 0.8,
+            "psd_beta_band": 0.7,
+            "psd_theta_band": 0.9,
+            "psd_delta_band": 0.6,
             "activity": "cooking",
-            "environment": "house",
-            "label": "turnRight"
+            "environment": "house"
         }
 
+    @patch('production_system.classification.joblib.load')
+    def test_classify_valid_prepared_session(self, mock_joblib_load):
+        # Mock the classifier loaded by joblib
+        mock_classifier = MagicMock(spec=["predict"])
+        mock_classifier.predict.return_value = np.array([[1, 0, 0]])
+        mock_joblib_load.return_value = mock_classifier
+
         # Instantiate the classification class
         classification_instance = Classification()
 
         # Call the classify method
-        label = classification_instance.classify(prepared_session_data)
+        label = classification_instance.classify(self.prepared_session_data, True)
 
         # Assertions
         self.assertIsInstance(label, Label)
         self.assertEqual(label.uuid, "001")
-        self.assertEqual(label.movements, ["movement_label"])
-
-        # Check that the classifier's predict method was called with the correct input
-        expected_features_struct = {
-            'PSD_alpha_band': 0.8,
-            'PSD_beta_band': 0.7,
-            'PSD_theta_band': 0.9,
-            'PSD_delta_band': 0.6,
-            'activity': 2,
-            'environment': 3,
-            'label': 0
-        }
-        expected_features = pd.DataFrame([expected_features_struct])
+        self.assertEqual(label.movements, "turnLeft")
 
-        # Recupera gli argomenti passati alla chiamata
+        # Check that the classifier's predict method was called with the encoded features
         args, kwargs = mock_classifier.predict.call_args
-        passed_features = args[0]  # Il primo argomento della chiamata
+        np.testing.assert_array_equal(args[0], [[0.8, 0.7, 0.9, 0.6, 2, 3]])
 
-        # Verifica l'uguaglianza dei DataFrame
-        pd.testing.assert_frame_equal(expected_features, passed_features)
+    def test_classify_without_deployed_classifier(self):
+        classification_instance = Classification()
+        self.assertIsNone(classification_instance.classify(self.prepared_session_data, False))
 
     @patch('production_system.classification.joblib.load')
-    def test_classify_without_preloaded_classifier(self, mock_joblib_load):
-        # Mock joblib to ensure classifier is loaded
-        mock_classifier = MagicMock()
-        mock_classifier.predict.return_value = ["test_movement"]
-        mock_joblib_load.return_value = mock_classifier
-
-        # Test data
-        prepared_session_data = {
-            "uuid": "002",
-            "PSD_alpha_band": 0.1,
-            "PSD_beta_band": 0.2,
-            "PSD_theta_band": 0.3,
-            "PSD_delta_band": 0.4,
-            "activity": "gaming",
-            "environment": "slope",
-            "label": "move"
-        }
+    def test_classifier_loaded_once_per_deployment(self, mock_joblib_load):
+        old_classifier = MagicMock(spec=["predict"])
+        old_classifier.predict.return_value = np.array([[0, 0, 1]])
+        new_classifier = MagicMock(spec=["predict"])
+        new_classifier.predict.return_value = np.array([[1, 0, 0]])
+        mock_joblib_load.side_effect = [old_classifier, new_classifier]
 
         classification_instance = Classification()
-        label = classification_instance.classify(prepared_session_data)
-
-        self.assertEqual(label.uuid, "002")
-        self.assertEqual(label.movements, ["test_movement"])
-
+        with patch.object(Deployment, "model_id", "aaaa"):
+            for _ in range(3):
+                label = classification_instance.classify(self.prepared_session_data, True)
         mock_joblib_load.assert_called_once_with("model/classifier.sav")
+        self.assertEqual(label.to_dictionary(), {"uuid": "001", "movements": "turnRight", "model_version": "aaaa"})
 
-    @patch('production_system.classification.joblib.load')
-    def test_classify_with_preloaded_classifier(self, mock_joblib_load):
-        # Preload a mock classifier
-        mock_classifier = MagicMock()
-        mock_classifier.predict.return_value = ["preloaded_movement"]
-        classification_instance = Classification()
-        classification_instance._classifier = mock_classifier  # Set the preloaded classifier
+        # a new deployment: the previous classifier is used until the new one is loaded
+        with patch.object(Deployment, "model_version", Deployment.model_version + 1), \
+             patch.object(Deployment, "model_id", "bbbb"):
+            label = classification_instance.classify(self.prepared_session_data, True)
+            self.assertEqual((label.movements, label.model_version), ("turnRight", "aaaa"))
 
-        # Test data
-        prepared_session_data = {
-            "uuid": "003",
-            "PSD_alpha_band": 0.5,
-            "PSD_beta_band": 0.6,
-            "PSD_theta_band": 0.7,
-            "PSD_delta_band": 0.8,
-            "activity": "relax",
-            "environment": "track",
-            "label": "move"
-        }
+            classification_instance.wait_reload()
+            label = classification_instance.classify(self.prepared_session_data, True)
+            self.assertEqual((label.movements, label.model_version), ("turnLeft", "bbbb"))
+        self.assertEqual(mock_joblib_load.call_count, 2)
 
-        label = classification_instance.classify(prepared_session_data)
+    @patch('production_system.classification.joblib.load')
+    def test_failed_reload_keeps_classifier(self, mock_joblib_load):
+        mock_classifier = MagicMock(spec=["predict"])
+        mock_classifier.predict.return_value = np.array([[0, 0, 1]])
+        mock_joblib_load.side_effect = [mock_classifier, EOFError("truncated file")]
 
-        self.assertEqual(label.uuid, "003")
-        self.assertEqual(label.movements, ["preloaded_movement"])
+        classification_instance = Classification()
+        classification_instance.classify(self.prepared_session_data, True)
+        with patch.object(Deployment, "model_version", Deployment.model_version + 1):
+            classification_instance.reload()
+            classification_instance.wait_reload()
+
+            # the broken classifier is not loaded again, the sessions are still classified
+            label = classification_instance.classify(self.prepared_session_data, True)
+        self.assertEqual(label.movements, "turnRight")
+        self.assertEqual(mock_joblib_load.call_count, 2)
+
+    def test_same_predictions_as_dataframe(self):
+        classifier = joblib.load(MODEL_PATH)
+        classification_instance = Classification(MODEL_PATH)
+        classification_instance.load()
+
+        rng = np.random.default_rng(0)
+        for number in range(20):
+            session = {
+                "uuid": str(number),
+                "psd_alpha_band": rng.uniform(0, 20),
+                "psd_beta_band": rng.uniform(0, 20),
+                "psd_theta_band": rng.uniform(0, 20),
+                "psd_delta_band": rng.uniform(0, 20),
+                "activity": ["shopping", "sport", "cooking", "relax", "gaming"][number % 5],
+                "environment": ["slippery", "plain", "slope", "house", "track"][number % 5]
+            }
+
+            # classification of the original implementation, through a one-row DataFrame
+            features = pd.DataFrame([{
+                "psd_alpha_band": session["psd_alpha_band"],
+                "psd_beta_band": session["psd_beta_band"],
+                "psd_theta_band": session["psd_theta_band"],
+                "psd_delta_band": session["psd_delta_band"],
+                "activity": number % 5,
+                "environment": number % 5
+            }])
+            expected = classifier.predict(features).flatten()[0]
+
+            # the NumPy row must not trigger the feature names warning of sklearn
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", UserWarning)
+                label = classification_instance.classify(session, True)
+            self.assertEqual(label.movements, {0: "turnRight", 1: "turnLeft"}[int(expected)])
+
+    def test_classify_batch(self):
+        classification_instance = Classification(MODEL_PATH)
+
+        sessions = []
+        for number, activity in enumerate(["shopping", "sport", "cooking", "relax", "gaming"]):
+            sessions.append({**self.prepared_session_data, "uuid": str(number), "activity": activity,
+                             "psd_alpha_band": number * 3.0})
+
+        # one prediction for the whole batch, same labels as one session at a time
+        labels = classification_instance.classify_batch(sessions, True)
+        self.assertEqual([label.uuid for label in labels], ["0", "1", "2", "3", "4"])
+        self.assertEqual([label.movements for label in labels],
+                         [classification_instance.classify(session, True).movements for session in sessions])
+
+        self.assertIsNone(classification_instance.classify_batch(sessions, False))
 
-        # joblib.load should not be called since the classifier is preloaded
-        mock_joblib_load.assert_not_called()
 
 if __name__ == '__main__':
     unittest.main()
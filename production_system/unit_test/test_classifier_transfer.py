@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import requests
+from werkzeug.serving import make_server
+
+from development_system.learning_set_receiver_and_classifier_sender import LearningSetReceiverAndClassifierSender
+from production_system.deployment import Deployment
+from production_system.production_system_communication import ProductionSystemIO
+from utility.http_client.headers import MODEL_ENCODING_HEADER, SENDER_PORT_HEADER
+from utility.http_client.http_client import HttpClient
+
+
+class TestClassifierTransfer(unittest.TestCase):
+
+    def setUp(self):
+        # the classifiers are received in model/uploads and deployed in model
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        os.mkdir("model")
+
+        self.system_io = ProductionSystemIO(host='127.0.0.1', port=5005)
+        self.client = self.system_io.app.test_client()
+        self.classifier = b"PK\x03\x04" + os.urandom(5000)
+        self.sha256 = hashlib.sha256(self.classifier).hexdigest()
+        self.url = f"/classifier/{self.sha256}"
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+        Deployment.model_path = "model/classifier.sav"
+        Deployment.model_id = None
+
+    def _put(self, body, first, total, encoding="identity"):
+        return self.client.put(self.url, data=body, headers={
+            "Content-Range": f"bytes {first}-{first + len(body) - 1}/{total}",
+            MODEL_ENCODING_HEADER: encoding,
+            SENDER_PORT_HEADER: "5004"
+        })
+
+    def test_chunked_upload(self):
+        self.assertEqual(self.client.get(self.url).json, {"received": 0})
+
+        response = self._put(self.classifier[:2000], 0, len(self.classifier))
+        self.assertEqual(response.json["received"], 2000)
+        self.assertTrue(self.system_io.msg_queue.empty())
+
+        # a chunk sent twice is refused, the sender resumes from the received bytes
+        response = self._put(self.classifier[:2000], 0, len(self.classifier))
+        self.assertEqual((response.status_code, response.json["received"]), (409, 2000))
+
+        response = self._put(self.classifier[2000:], 2000, len(self.classifier))
+        self.assertEqual(response.status_code, 200)
+
+        message = self.system_io.msg_queue.get_nowait()
+        self.assertEqual((message['port'], message['classifier_sha256']), (5004, self.sha256))
+        with open(message['classifier_path'], "rb") as f:
+            self.assertEqual(f.read(), self.classifier)
+
+        # the received classifier replaces the deployed one
+        self.assertTrue(Deployment.deploy_file(message['classifier_path'], self.sha256))
+        self.assertEqual((Deployment.model_path, Deployment.model_id), ("model/classifier.npz", self.sha256[:12]))
+        self.assertEqual(os.listdir("model/uploads"), [])
+
+    def test_completed_upload_not_received_again(self):
+        response = self._put(self.classifier, 0, len(self.classifier))
+        self.assertEqual(response.status_code, 200)
+        self.system_io.msg_queue.get_nowait()
+
+        # the response was lost: the sender finds the whole classifier received
+        self.assertEqual(self.client.get(self.url).json["received"], len(self.classifier))
+        response = self._put(self.classifier[:2000], 0, len(self.classifier))
+        self.assertEqual((response.status_code, response.json["received"]), (200, len(self.classifier)))
+        self.assertTrue(self.system_io.msg_queue.empty())
+
+    def test_compressed_upload(self):
+        compressed = gzip.compress(self.classifier)
+        response = self._put(compressed, 0, len(compressed), "gzip")
+        self.assertEqual(response.status_code, 200)
+
+        message = self.system_io.msg_queue.get_nowait()
+        with open(message['classifier_path'], "rb") as f:
+            self.assertEqual(f.read(), self.classifier)
+
+    def test_hash_mismatch(self):
+        corrupted = b"x" + self.classifier[1:]
+        response = self._put(corrupted, 0, len(corrupted))
+        self.assertEqual(response.status_code, 422)
+        self.assertTrue(self.system_io.msg_queue.empty())
+        self.assertEqual(os.listdir("model/uploads"), [])
+
+    def test_upload_from_development_system(self):
+        server = make_server("127.0.0.1", 0, self.system_io.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with open("classifier.npz", "wb") as f:
+                f.write(self.classifier)
+            sender = LearningSetReceiverAndClassifierSender(host='127.0.0.1', port=5004)
+
+            # the first attempt of the second chunk fails: the upload resumes from the received bytes
+            put = HttpClient.put
+            calls = []
+
+            def failing_put(client, url, **kwargs):
+                calls.append(kwargs["headers"]["Content-Range"])
+                if len(calls) == 2:
+                    put(client, url, **{**kwargs, "data": kwargs["data"][:100]})
+                    raise requests.ConnectionError("connection reset")
+                return put(client, url, **kwargs)
+
+            with patch.object(HttpClient, "put", failing_put):
+                response = sender.upload_classifier("classifier.npz", "127.0.0.1", server.server_port,
+                                                    chunk_size=2048, compress=False)
+        finally:
+            server.shutdown()
+
+        self.assertEqual(response["status"], "received")
+        self.assertEqual(calls[:3], ["bytes 0-2047/5004", "bytes 2048-4095/5004", "bytes 2148-4195/5004"])
+        message = self.system_io.msg_queue.get_nowait()
+        with open(message['classifier_path'], "rb") as f:
+            self.assertEqual(f.read(), self.classifier)
+
+    def test_lost_response_to_last_chunk(self):
+        server = make_server("127.0.0.1", 0, self.system_io.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with open("classifier.npz", "wb") as f:
+                f.write(self.classifier)
+            sender = LearningSetReceiverAndClassifierSender(host='127.0.0.1', port=5004)
+
+            # the last chunk is received, but its response is lost
+            put = HttpClient.put
+            calls = []
+
+            def losing_put(client, url, **kwargs):
+                calls.append(kwargs["headers"]["Content-Range"])
+                response = put(client, url, **kwargs)
+                if len(calls) == 3:
+                    raise requests.ConnectionError("connection reset")
+                return response
+
+            with patch.object(HttpClient, "put", losing_put):
+                response = sender.upload_classifier("classifier.npz", "127.0.0.1", server.server_port,
+                                                    chunk_size=2048, compress=False)
+        finally:
+            server.shutdown()
+
+        # the upload is not restarted, the classifier is deployed once
+        self.assertEqual(response, {"status": "received", "received": 5004})
+        self.assertEqual(len(calls), 3)
+        self.system_io.msg_queue.get_nowait()
+        self.assertTrue(self.system_io.msg_queue.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
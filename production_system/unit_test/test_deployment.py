@@ -1,27 +1,76 @@
+import hashlib
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
 from production_system.deployment import Deployment
 
 class TestDeployment(unittest.TestCase):
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_deploy_successful(self, mock_file):
+    def test_deploy_successful(self):
         """
         Test che verifica il comportamento del metodo deploy con un classificatore valido.
         """
-        # Mock del classificatore
-        mock_classifier = MagicMock()
-        mock_classifier.encoded.return_value = b"mock_binary_content"
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "model"))
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                model_version = Deployment.model_version
 
-        # Chiamata al metodo deploy
-        result = Deployment.deploy(mock_classifier)
+                # un classificatore serializzato (.sav) e i pesi esportati (.npz)
+                self.assertTrue(Deployment.deploy("\x80mock_binary_content"))
+                self.assertEqual(Deployment.model_path, "model/classifier.sav")
+                with open("model/classifier.sav", "rb") as f:
+                    self.assertEqual(f.read(), b"\x80mock_binary_content")
+
+                self.assertTrue(Deployment.deploy("PK\x03\x04mock_weights"))
+                self.assertEqual(Deployment.model_path, "model/classifier.npz")
+
+                # nessun file temporaneo rimasto, la versione cambia ad ogni deploy
+                self.assertEqual(sorted(os.listdir("model")), ["classifier.npz", "classifier.sav", "deployment.json"])
+                self.assertEqual(Deployment.model_version, model_version + 2)
+                self.assertEqual(Deployment.model_id, hashlib.sha256(b"PK\x03\x04mock_weights").hexdigest()[:12])
+            finally:
+                os.chdir(cwd)
+                Deployment.model_path = "model/classifier.sav"
+                Deployment.model_id = None
+
+    def test_restore(self):
+        """
+        Test che verifica che il classificatore installato sia ripristinato dopo un riavvio.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            os.mkdir(os.path.join(directory, "model"))
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                self.assertTrue(Deployment.deploy("\x80mock_binary_content"))
+                self.assertTrue(Deployment.deploy("PK\x03\x04mock_weights"))
+                model_id = Deployment.model_id
+
+                # riavvio: il file di deployment indica i pesi esportati, non il .sav
+                Deployment.model_path = "model/classifier.sav"
+                Deployment.model_id = None
+                Deployment.restore()
+                self.assertEqual((Deployment.model_path, Deployment.model_id), ("model/classifier.npz", model_id))
 
-        # Verifica se il risultato è True
-        self.assertTrue(result)
+                # senza file di deployment si usa il classificatore più recente
+                os.remove("model/deployment.json")
+                os.utime("model/classifier.sav", (0, 0))
+                Deployment.model_path = "model/classifier.sav"
+                Deployment.model_id = None
+                Deployment.restore()
+                self.assertEqual((Deployment.model_path, Deployment.model_id), ("model/classifier.npz", model_id))
 
-        # Verifica se il file è stato scritto correttamente
-        mock_file.assert_called_once_with("model/classifier.sav", "wb")
-        mock_file().write.assert_called_once_with(b"mock_binary_content")
+                os.remove("model/classifier.npz")
+                Deployment.restore()
+                self.assertEqual((Deployment.model_path, Deployment.model_id),
+                                 ("model/classifier.sav", hashlib.sha256(b"\x80mock_binary_content").hexdigest()[:12]))
+            finally:
+                os.chdir(cwd)
+                Deployment.model_path = "model/classifier.sav"
+                Deployment.model_id = None
 
     def test_deploy_encoding_failure(self):
         """
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+import warnings
+import joblib
+import numpy as np
+from development_system.classifier import Classifier
+from production_system.classification import Classification
+from production_system.numpy_mlp import NumpyMLP
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model", "classifier.sav")
+
+
+class TestNumpyMLP(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.weights_path = os.path.join(self.directory.name, "classifier.npz")
+        rng = np.random.default_rng(0)
+        self.features = np.column_stack([rng.uniform(0, 20, (500, 4)),
+                                         rng.integers(0, 5, (500, 2))]).astype(float)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_same_predictions_as_deployed_classifier(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            classifier = joblib.load(MODEL_PATH)
+            # the classifier is trained on a DataFrame, the NumPy rows are checked without the feature names
+            classifier.export_weights(self.weights_path)
+            del classifier.feature_names_in_
+
+        network = NumpyMLP.load(self.weights_path)
+        self.assertEqual(network.feature_names[0], "psd_alpha_band")
+        np.testing.assert_array_equal(network.predict(self.features), classifier.predict(self.features))
+
+    def test_same_predictions_multiclass(self):
+        # labels of a single column: softmax output, one class per session
+        classifier = Classifier()
+        classifier.set_num_layers(2)
+        classifier.set_num_neurons(8)
+        classifier.set_num_iterations(50)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            classifier.fit(self.features, (self.features[:, 0] // 7).astype(int))
+        classifier.export_weights(self.weights_path)
+
+        network = NumpyMLP.load(self.weights_path)
+        self.assertEqual(network.out_activation, "softmax")
+        np.testing.assert_array_equal(network.predict(self.features), classifier.predict(self.features))
+
+    def test_classification_with_exported_weights(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            joblib.load(MODEL_PATH).export_weights(self.weights_path)
+
+        session = {"uuid": "001", "psd_alpha_band": 3.5, "psd_beta_band": 1.2, "psd_theta_band": 9.1,
+                   "psd_delta_band": 4.4, "activity": "relax", "environment": "plain"}
+        label = Classification(self.weights_path).classify(session, True)
+        expected = Classification(MODEL_PATH).classify(session, True)
+        self.assertEqual(label.movements, expected.movements)
+
+
+if __name__ == '__main__':
+    unittest.main()
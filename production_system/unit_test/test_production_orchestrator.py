@@ -1,3 +1,4 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock
 from production_system.production_orchestrator import ProductionOrchestrator
@@ -11,9 +12,11 @@ class TestProductionOrchestrator(unittest.TestCase):
 
     @patch('production_system.production_orchestrator.ProductionSystemIO')
     @patch('production_system.production_orchestrator.JsonHandler')
+    @patch('production_system.production_orchestrator.Classification')
     @patch('production_system.production_orchestrator.Deployment')
     @patch('production_system.production_orchestrator.ConfigurationParameters')
-    def test_develop_session(self, MockConfigurationParameters, MockDeployment, MockJsonHandler, MockProductionSystemIO):
+    def test_develop_session(self, MockConfigurationParameters, MockDeployment, MockClassification, MockJsonHandler,
+                             MockProductionSystemIO):
         """
         Test del processo di sviluppo (deploy del classificatore).
         """
@@ -39,6 +42,8 @@ class TestProductionOrchestrator(unittest.TestCase):
 
         # Assertions
         mock_deployment.deploy.assert_called_once_with(mock_io.get_last_message.return_value['message'])
+        # the new classifier is loaded in the background
+        MockClassification.return_value.reload.assert_called_once()
 
     @patch('production_system.production_orchestrator.ProductionSystemIO')
     @patch('production_system.production_orchestrator.JsonHandler')
@@ -92,15 +97,15 @@ class TestProductionOrchestrator(unittest.TestCase):
             "production_schema/PreparedSessionSchema.json"
         )
         mock_classification.classify.assert_called_once()
-        mock_io.send_label.assert_any_call(
-            mock_config.global_netconf['Evaluation System']['ip'],
-            mock_config.global_netconf['Evaluation System']['port'],
-            mock_label
-        )
-        mock_io.send_label.assert_any_call(
-            mock_config.global_netconf['Service Class']['ip'],
-            mock_config.global_netconf['Service Class']['port'],
-            mock_label
+        mock_io.send_labels.assert_called_once_with(
+            [
+                (mock_config.global_netconf['Service Class']['ip'],
+                 mock_config.global_netconf['Service Class']['port'], "client"),
+                (mock_config.global_netconf['Evaluation System']['ip'],
+                 mock_config.global_netconf['Evaluation System']['port'], "send")
+            ],
+            mock_label,
+            headers={}  # tracing disabled
         )
 
     @patch('production_system.production_orchestrator.ProductionSystemIO')
@@ -204,7 +209,93 @@ class TestProductionOrchestrator(unittest.TestCase):
             "production_schema/PreparedSessionSchema.json"
         )
         mock_classification.classify.assert_not_called()  # Assicura che classify non venga chiamato
-        mock_io.send_label.assert_not_called()  # Assicura che nessuna label venga inviata
+        mock_io.send_labels.assert_not_called()  # Assicura che nessuna label venga inviata
+
+    @patch('production_system.production_orchestrator.ProductionSystemIO')
+    @patch('production_system.production_orchestrator.JsonHandler')
+    @patch('production_system.production_orchestrator.Classification')
+    @patch('production_system.production_orchestrator.ConfigurationParameters')
+    def test_classify_micro_batch(self, MockConfigurationParameters, MockClassification, MockJsonHandler,
+                                  MockProductionSystemIO):
+        """
+        Test della classificazione di più sessioni preparate con una sola predizione.
+        """
+        # Mock Configuration
+        mock_config = MockConfigurationParameters.return_value
+        mock_config.global_netconf = {
+            "Preparation System": {"ip": "151.83.144.119"},
+            "Evaluation System": {"ip": "2.38.52.205", "port": 5030},
+            "Service Class": {"ip": "2.38.52.205", "port": 5010},
+            "Development System": {"ip": "87.19.204.54"},
+        }
+        mock_config.parameters = {"evaluation_phase": False, "max_session_evaluation": 5,
+                                  "max_session_production": 10,
+                                  "micro_batching": {"enabled": True, "max_batch_size": 8, "max_wait_ms": 2}}
+
+        # Mock ProductionSystemIO: three sessions received together
+        messages = [{'ip': "151.83.144.119", 'message': json.dumps({'uuid': str(number)})} for number in range(3)]
+        mock_io = MockProductionSystemIO.return_value
+        mock_io.get_last_message.return_value = messages[0]
+        mock_io.get_batch.return_value = messages
+
+        # Mock JsonHandler
+        MockJsonHandler.return_value.validate_json.return_value = True
+
+        # Mock Classification
+        mock_classification = MockClassification.return_value
+        mock_labels = [MagicMock(), MagicMock(), MagicMock()]
+        mock_classification.classify_batch.return_value = mock_labels
+
+        orchestrator = ProductionOrchestrator(service=False, unit_test=True)
+        orchestrator.production()
+
+        # Assertions
+        mock_io.get_batch.assert_called_once_with(messages[0], 8, 0.002)
+        mock_classification.classify_batch.assert_called_once_with([{'uuid': "0"}, {'uuid': "1"}, {'uuid': "2"}], False)
+        mock_classification.classify.assert_not_called()
+        self.assertEqual([call.args[1] for call in mock_io.send_labels.call_args_list], mock_labels)
+
+    @patch('production_system.production_orchestrator.ProductionSystemIO')
+    @patch('production_system.production_orchestrator.JsonHandler')
+    @patch('production_system.production_orchestrator.Classification')
+    @patch('production_system.production_orchestrator.ConfigurationParameters')
+    def test_micro_batch_with_invalid_session(self, MockConfigurationParameters, MockClassification, MockJsonHandler,
+                                              MockProductionSystemIO):
+        """
+        Test che una sessione non valida in mezzo al batch non impedisca la classificazione delle altre.
+        """
+        # Mock Configuration
+        mock_config = MockConfigurationParameters.return_value
+        mock_config.global_netconf = {
+            "Preparation System": {"ip": "151.83.144.119"},
+            "Evaluation System": {"ip": "2.38.52.205", "port": 5030},
+            "Service Class": {"ip": "2.38.52.205", "port": 5010},
+            "Development System": {"ip": "87.19.204.54"},
+        }
+        mock_config.parameters = {"evaluation_phase": False, "max_session_evaluation": 5,
+                                  "max_session_production": 10,
+                                  "micro_batching": {"enabled": True, "max_batch_size": 8, "max_wait_ms": 2}}
+
+        # Mock ProductionSystemIO: the second of three sessions is not valid
+        messages = [{'ip': "151.83.144.119", 'message': json.dumps({'uuid': str(number)})} for number in range(3)]
+        mock_io = MockProductionSystemIO.return_value
+        mock_io.get_last_message.return_value = messages[0]
+        mock_io.get_batch.return_value = messages
+
+        # Mock JsonHandler
+        MockJsonHandler.return_value.validate_json.side_effect = [True, False, True]
+
+        # Mock Classification
+        mock_classification = MockClassification.return_value
+        mock_labels = [MagicMock(), MagicMock()]
+        mock_classification.classify_batch.return_value = mock_labels
+
+        orchestrator = ProductionOrchestrator(service=False, unit_test=True)
+        orchestrator.production()
+
+        # Assertions
+        mock_classification.classify_batch.assert_called_once_with([{'uuid': "0"}, {'uuid': "2"}], False)
+        self.assertEqual([call.args[1] for call in mock_io.send_labels.call_args_list], mock_labels)
 
 
 if __name__ == '__main__':
@@ -7,6 +7,7 @@ from unittest.mock import patch, MagicMock
 from production_system.production_system_communication import ProductionSystemIO
 from production_system.label import Label
 from production_system.configuration_parameters import ConfigurationParameters
+from utility.http_client.http_client import HttpClient
 
 class TestProductionSystemIO(unittest.TestCase):
 
@@ -16,7 +17,7 @@ class TestProductionSystemIO(unittest.TestCase):
         """
         self.system_io = ProductionSystemIO(host='127.0.0.1', port=5001)
 
-    @patch('production_system.production_system_communication.requests.post')
+    @patch.object(HttpClient, 'post')
     def test_send_configuration(self, mock_post):
         """
         Test the send_configuration method.
@@ -35,7 +36,7 @@ class TestProductionSystemIO(unittest.TestCase):
             json={"port": 5001, "message": "Test Message"}
         )
 
-    @patch('production_system.production_system_communication.requests.post')
+    @patch.object(HttpClient, 'post')
     def test_send_label(self, mock_post):
         """
         Test the send_label method.
@@ -79,5 +80,59 @@ class TestProductionSystemIO(unittest.TestCase):
         })
         self.assertIsNone(self.system_io.last_message)
 
+    @patch.object(HttpClient, 'post')
+    def test_send_labels(self, mock_post):
+        """
+        Test that send_labels sends the label to every target over the shared HttpClient.
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {"status": "received"}
+
+        label = MagicMock()
+        label.to_dictionary.return_value = {"uuid": "001", "movements": "move"}
+        targets = [("127.0.0.1", 5010, "client"), ("127.0.0.1", 5030, "send")]
+
+        responses = self.system_io.send_labels(targets, label, headers={"X-Trace-Context": "1/a"})
+
+        self.assertEqual(responses, [{"status": "received"}] * 2)
+        payload = {"port": 5001, "message": '{"uuid": "001", "movements": "move"}'}
+        self.assertCountEqual([call.args[0] for call in mock_post.call_args_list],
+                              ['http://127.0.0.1:5010/ClientSide', 'http://127.0.0.1:5030/send'])
+        for call in mock_post.call_args_list:
+            self.assertEqual(call.kwargs, {"json": payload, "headers": {"X-Trace-Context": "1/a"}})
+
+    def test_get_batch(self):
+        """
+        Test the get_batch method: a message of another sender ends the batch and is returned next.
+        """
+        preparation = [{'ip': '10.0.0.2', 'port': 5002, 'message': str(number)} for number in range(4)]
+        development = {'ip': '10.0.0.4', 'port': 5004, 'message': 'classifier'}
+        for message in preparation[:3] + [development, preparation[3]]:
+            self.system_io.msg_queue.put(message)
+
+        first = self.system_io.get_last_message()
+        self.assertEqual(self.system_io.get_batch(first, 32, 0.002), preparation[:3])
+        self.assertEqual(self.system_io.get_last_message(), development)
+
+        # the batch is limited by max_batch_size, then by max_wait
+        first = self.system_io.get_last_message()
+        self.assertEqual(self.system_io.get_batch(first, 1, 0.002), [preparation[3]])
+        self.assertEqual(self.system_io.get_batch(first, 32, 0.002), [preparation[3]])
+
+    def test_get_batch_stops_at_classifier(self):
+        """
+        Test that an uploaded classifier from the same host is not part of a batch of prepared sessions.
+        """
+        preparation = [{'ip': '10.0.0.2', 'port': 5002, 'message': str(number)} for number in range(2)]
+        classifier = {'ip': '10.0.0.2', 'port': 5004, 'classifier_path': 'model/uploads/a.classifier',
+                      'classifier_sha256': 'a'}
+        for message in [preparation[0], classifier, preparation[1]]:
+            self.system_io.msg_queue.put(message)
+
+        first = self.system_io.get_last_message()
+        self.assertEqual(self.system_io.get_batch(first, 32, 0.002), preparation[:1])
+        self.assertEqual(self.system_io.get_last_message(), classifier)
+        self.assertEqual(self.system_io.get_last_message(), preparation[1])
+
 if __name__ == '__main__':
     unittest.main()
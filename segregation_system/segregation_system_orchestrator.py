@@ -8,6 +8,8 @@ from segregation_system.segregation_database_manager.segregation_system_database
     SegregationSystemDatabaseController
 from segregation_system.segregation_system_parameters import SegregationSystemConfiguration
 from segregation_system.session_receiver_and_configuration_sender import SessionReceiverAndConfigurationSender
+from utility.http_client.http_client import HttpClient
+from utility.tracing.tracer import Tracer
 
 execution_state_file_path = "user/user_responses.json"
 
@@ -36,8 +38,18 @@ class SegregationSystemOrchestrator:
         """
         self.set_testing(testing)  # Set the testing attribute.
         self.db = SegregationSystemDatabaseController()
-        self.message_broker = SessionReceiverAndConfigurationSender()
-        self.message_broker.start_server()
+        SegregationSystemConfiguration.configure_parameters()
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(SegregationSystemConfiguration.LOCAL_PARAMETERS.get("http_client") or {}))
+        # capacity of the inbox of the received sessions and policy applied when it is full
+        inbox_parameters = {key: SegregationSystemConfiguration.LOCAL_PARAMETERS[key]
+                            for key in ("inbox_capacity", "overflow_policy", "spill_path")
+                            if key in SegregationSystemConfiguration.LOCAL_PARAMETERS}
+        self.message_broker = SessionReceiverAndConfigurationSender(**inbox_parameters)
+        # the serving backend is read from the Segregation System's parameters
+        self.message_broker.start_server(SegregationSystemConfiguration.LOCAL_PARAMETERS.get("serving"))
+        # spans of the sessions, reported to the Service Class if tracing is enabled
+        self.tracer = Tracer.configure("Segregation System", SegregationSystemConfiguration.LOCAL_PARAMETERS.get("tracing"))
 
     def run(self):
         """
@@ -64,11 +76,11 @@ class SegregationSystemOrchestrator:
 
             while True:
                 # Receive a prepared session from the preparation system.
-                message = self.message_broker.get_last_message()
+                received_message = self.message_broker.get_last_message()
                 self.message_broker.send_timestamp("start")
 
                 # Convert the string into a dict object.
-                message = SegregationSystemJsonHandler.string_to_dict(message['message'])
+                message = SegregationSystemJsonHandler.string_to_dict(received_message['message'])
 
                 # Validation of the prepared session.
                 if SegregationSystemJsonHandler.validate_json(message, "schemas/preparedSessionSchema.json"):
@@ -79,6 +91,8 @@ class SegregationSystemOrchestrator:
                         #print("Prepared Session Valid! (class)")
 
                         self.db.store_prepared_session(message) # Store the new prepared session in the database.
+                        # The segregation system is the last hop of the session.
+                        self.tracer.record(message["uuid"], received_message.get('trace'), received_message.get('received'))
                         prepared_session_stored_counter += 1 # Increase the number of stored prepared sessions.
                         print("Prepared Session STORED! [", prepared_session_stored_counter, "].")
 
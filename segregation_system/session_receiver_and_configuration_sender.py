@@ -1,13 +1,15 @@
 import json
-import queue
 import time
-import threading
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 import requests
 from flask import Flask, request, jsonify
 
 from segregation_system.segregation_system_parameters import SegregationSystemConfiguration
+from utility.http_client.http_client import HttpClient
+from utility.message_broker.message_inbox import MessageInbox, SPILL
+from utility.tracing.tracer import TRACE_HEADER
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class SessionReceiverAndConfigurationSender:
@@ -17,49 +19,57 @@ class SessionReceiverAndConfigurationSender:
     This class supports sending and receiving messages in a blocking manner.
     """
 
-    def __init__(self, host: str = '0.0.0.0', port: int = 5003):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5003, inbox_capacity: int = 1024,
+                 overflow_policy: str = SPILL, spill_path: Optional[str] = "data/inbox_spill.jsonl"):
         """
         Initialize the Flask communication server.
 
         :param host: The host address for the Flask server.
         :param port: The port number for the Flask server.
+        :param inbox_capacity: Maximum number of received messages kept in memory.
+        :param overflow_policy: Policy of a full inbox: reject (answer 503), drop_oldest or spill (to spill_path).
+        :param spill_path: File where the messages are spilled by the spill policy.
         """
         self.app = Flask(__name__)
         self.host = host
         self.port = port
-        self.last_message = None
-        self.queue = queue.Queue()
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
 
-        # Lock and condition for blocking behavior
-        self.message_condition = threading.Condition()
+        # Bounded FIFO of the received messages: prepared session bursts are spilled to disk, not lost
+        self.inbox = MessageInbox(inbox_capacity, overflow_policy, spill_path)
 
 
         # Define a route to receive messages
         @self.app.route('/send', methods=['POST'])
         def receive_message():
+            received = time.time()
             data = request.json
             sender_ip = request.remote_addr
             sender_port = data.get('port')
             message = data.get('message')
 
-            with self.message_condition:
-                self.last_message = {
-                    'ip': sender_ip,
-                    'port': sender_port,
-                    'message': message
-                }
-                self.queue.put(self.last_message)
-                # Notify any threads waiting for a message
-                self.message_condition.notify_all()
+            accepted = self.inbox.put({
+                'ip': sender_ip,
+                'port': sender_port,
+                'message': message,
+                'trace': request.headers.get(TRACE_HEADER),
+                'received': received
+            })
+            if not accepted:
+                # the sender can retry later
+                return jsonify({"status": "error", "message": "Inbox full"}), 503
 
             return jsonify({"status": "received"}), 200
 
-    def start_server(self):
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
     def send_message(self, target_ip: str, target_port: int, message: str , dest: str = "send") -> Optional[Dict]:
         """
@@ -76,7 +86,7 @@ class SessionReceiverAndConfigurationSender:
             "message": message
         }
         try:
-            response = requests.post(url, json=payload)
+            response = self.http_client.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
@@ -89,7 +99,17 @@ class SessionReceiverAndConfigurationSender:
 
         :return: A dictionary containing the sender's IP, port, and the message content.
         """
-        return self.queue.get(block=True)
+        return self.inbox.get()
+
+    def get_messages(self, max_n: int, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Wait for a message to be received, then return up to max_n of the received messages.
+
+        :param max_n: Maximum number of messages to return.
+        :param timeout: Maximum time to wait for the first message (in seconds), None to wait indefinitely.
+        :return: The received messages in arrival order (empty if the timeout expired).
+        """
+        return self.inbox.get_messages(max_n, timeout)
 
     def send_configuration(self , msg : str):
         """
@@ -22,6 +22,9 @@ class TestSegregationSystemConfiguration(unittest.TestCase):
                          config_data["training_set_percentage"])
         self.assertEqual(SegregationSystemConfiguration.LOCAL_PARAMETERS["validation_set_percentage"],
                          config_data["validation_set_percentage"])
+        # inbox of the received sessions
+        for key in ("inbox_capacity", "overflow_policy", "spill_path"):
+            self.assertEqual(SegregationSystemConfiguration.LOCAL_PARAMETERS[key], config_data[key])
 
 
 if __name__ == '__main__':
@@ -4,18 +4,23 @@ Author: Giovanni Ligato
 
 import os
 
+from service_class.LogWriter import LogWriter
+
 class CSVLogger:
     """
     Handles CSV logging for different phases of the Service Class.
     Ensures that existing files are not overwritten.
+    The rows are written in the background by a LogWriter.
     """
 
-    def __init__(self, basedir: str, phase: str):
+    def __init__(self, basedir: str, phase: str, flush_interval: float = 1.0, buffer_size: int = 1000):
         """
         Initialize the CSVLogger.
 
         :param basedir: The base directory for the CSVLogger.
         :param phase: The phase for which to log.
+        :param flush_interval: Maximum time (in seconds) a row waits in memory before being written.
+        :param buffer_size: Number of rows in memory that triggers a write.
         """
 
         self.basedir = basedir
@@ -27,6 +32,8 @@ class CSVLogger:
 
         self.file_path = self._generate_file_path()
 
+        self.writer = LogWriter(self.file_path, flush_interval, buffer_size)
+
     def _generate_file_path(self) -> str:
         """Generate a new file path ensuring no overwriting."""
         base_name = f"{self.phase}_log"
@@ -41,8 +48,7 @@ class CSVLogger:
 
         :param header: The header to write.
         """
-        with open(self.file_path, "w") as file:
-            file.write(header + "\n")
+        self.writer.rewrite(header)
 
     def log(self, row: str):
         """
@@ -50,5 +56,10 @@ class CSVLogger:
 
         :param row: The row to append.
         """
-        with open(self.file_path, "a") as file:
-            file.write(row + "\n")
+        self.writer.write(row)
+
+    def close(self):
+        """
+        Write the remaining rows to the CSV file and stop the writer.
+        """
+        self.writer.close()
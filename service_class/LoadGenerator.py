@@ -0,0 +1,129 @@
+"""
+Author: Giovanni Ligato
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+
+from service_class.CSVLogger import CSVLogger
+from service_class.RecordSender import RecordSender
+
+ARRIVAL_PROCESSES = ("constant", "poisson", "trace")
+
+
+class LoadGenerator:
+    """
+    Open-loop load generator: sends sessions to the Ingestion System at a given arrival rate for a fixed duration,
+    without waiting for the responses of the systems (the arrivals do not depend on the completions).
+    """
+
+    def __init__(self, record_sender: RecordSender, csv_logger: CSVLogger, arrival_process: str, duration: float,
+                 rate: Optional[float] = None, trace_path: Optional[str] = None, include_labels: bool = False,
+                 concurrency: int = 8, seed: Optional[int] = None):
+        """
+        Initialize the load generator.
+
+        :param record_sender: The RecordSender used to prepare and send the sessions.
+        :param csv_logger: The CSVLogger recording the send time of each session.
+        :param arrival_process: How the sessions arrive: "constant" (one every 1/rate seconds),
+                                "poisson" (exponential inter-arrival times of mean 1/rate) or "trace" (replayed from a file).
+        :param duration: Duration of the test (in seconds).
+        :param rate: Number of sessions per second, for the constant and poisson processes.
+        :param trace_path: File with one arrival time (in seconds) per line, for the trace process.
+        :param include_labels: Whether to send the label record of each session.
+        :param concurrency: Number of sessions being sent at the same time.
+        :param seed: Seed of the poisson process, None for a random seed.
+        """
+        if arrival_process not in ARRIVAL_PROCESSES:
+            raise ValueError(f"Unknown arrival process '{arrival_process}', expected one of {ARRIVAL_PROCESSES}")
+        if arrival_process in ("constant", "poisson") and not rate:
+            raise ValueError(f"The {arrival_process} arrival process requires a rate.")
+        if arrival_process == "trace" and not trace_path:
+            raise ValueError("The trace arrival process requires a trace file.")
+
+        self.record_sender = record_sender
+        self.csv_logger = csv_logger
+        self.arrival_process = arrival_process
+        self.duration = duration
+        self.rate = rate
+        self.trace_path = trace_path
+        self.include_labels = include_labels
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+
+        # the sessions are logged by the sending threads
+        self.log_lock = threading.Lock()
+
+    def arrival_times(self) -> List[float]:
+        """
+        Compute the arrival time of each session, in seconds from the start of the test.
+
+        :return: The arrival times, in increasing order and lower than the duration.
+        """
+        if self.arrival_process == "constant":
+            return [number / self.rate for number in range(int(self.duration * self.rate))]
+
+        if self.arrival_process == "poisson":
+            arrival_times = []
+            arrival_time = self.random.expovariate(self.rate)
+            while arrival_time < self.duration:
+                arrival_times.append(arrival_time)
+                arrival_time += self.random.expovariate(self.rate)
+            return arrival_times
+
+        with open(self.trace_path, "r") as trace_file:
+            trace = sorted(float(line) for line in trace_file if line.strip())
+        # the trace can contain absolute timestamps: it starts at its first arrival
+        return [arrival_time - trace[0] for arrival_time in trace if arrival_time - trace[0] < self.duration]
+
+    def run(self) -> int:
+        """
+        Send the sessions at their arrival times and wait for all of them to be sent.
+
+        :return: The number of sessions sent.
+        """
+        arrival_times = self.arrival_times()
+        print(f"Sending {len(arrival_times)} sessions in {self.duration} seconds ({self.arrival_process} arrivals).")
+
+        self.csv_logger.write_header("session,uuid,scheduled_timestamp,send_timestamp,sent_timestamp,status")
+
+        start = time.monotonic()
+        start_timestamp = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for number, arrival_time in enumerate(arrival_times, start=1):
+                delay = start + arrival_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+                records = self.record_sender.prepare_session(self._next_session_index(), self.include_labels)
+                # if all the threads are busy the session waits: send_timestamp - scheduled_timestamp grows
+                executor.submit(self._send_session, number, records, start_timestamp + arrival_time)
+
+        return len(arrival_times)
+
+    def _next_session_index(self) -> int:
+        """
+        :return: The index of a random session of the CSV files, the sessions are reused when all have been sent.
+        """
+        generator = self.record_sender.unique_random_generator
+        if not generator.remaining_numbers:
+            generator.reset()
+        return generator.generate()
+
+    def _send_session(self, number: int, records: list, scheduled_timestamp: float):
+        """
+        Send the records of a session and log its send time.
+
+        :param number: Number of the session in the test.
+        :param records: The records of the session.
+        :param scheduled_timestamp: Time at which the session should have been sent.
+        """
+        uuid = records[0]["value"]["UUID"]
+        send_timestamp = time.time()
+        status = "sent" if self.record_sender.send_session(records) else "failed"
+
+        with self.log_lock:
+            self.csv_logger.log(f"{number},{uuid},{scheduled_timestamp},{send_timestamp},{time.time()},{status}")
@@ -0,0 +1,96 @@
+"""
+Author: Giovanni Ligato
+"""
+
+import threading
+from typing import List
+
+
+class LogWriter:
+    """
+    Appends lines to a log file from a background thread.
+
+    The lines are kept in memory and written when the buffer is full or every flush_interval seconds,
+    so the threads logging an event (e.g. the request handlers) never wait for the file.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, buffer_size: int = 1000):
+        """
+        Initialize the log writer and start its background thread.
+
+        :param path: The path of the log file, the lines are appended to it.
+        :param flush_interval: Maximum time (in seconds) a line waits in memory before being written.
+        :param buffer_size: Number of lines in memory that triggers a write.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+
+        # lines not written yet
+        self._lines: List[str] = []
+        self._condition = threading.Condition()
+        # held while writing, so that lines are written in order
+        self._file_lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, line: str):
+        """
+        Add a line to the log, it is written later by the background thread (immediately if the writer is closed).
+
+        :param line: The line to append, without the trailing newline.
+        """
+        with self._condition:
+            self._lines.append(line)
+            closed = self._closed
+            if len(self._lines) >= self.buffer_size:
+                self._condition.notify()
+        if closed:
+            self.flush()
+
+    def rewrite(self, line: str):
+        """
+        Replace the content of the log file with a line (e.g. the header of a CSV file).
+        The lines not written yet are discarded.
+
+        :param line: The first line of the file, without the trailing newline.
+        """
+        with self._file_lock:
+            with self._condition:
+                self._lines = []
+            with open(self.path, "w") as log_file:
+                log_file.write(line + "\n")
+
+    def flush(self):
+        """
+        Write the lines in memory to the log file.
+        """
+        with self._file_lock:
+            with self._condition:
+                lines, self._lines = self._lines, []
+            if lines:
+                with open(self.path, "a") as log_file:
+                    log_file.write("".join(line + "\n" for line in lines))
+
+    def close(self):
+        """
+        Stop the background thread and write the remaining lines.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or len(self._lines) >= self.buffer_size,
+                                         self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
@@ -0,0 +1,39 @@
+"""
+Author: Giovanni Ligato
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Spaces out the requests of several threads so that at most `rate` requests per second are sent.
+    """
+
+    def __init__(self, rate: float):
+        """
+        Initialize the rate limiter.
+
+        :param rate: Maximum number of requests per second.
+        """
+        if rate <= 0:
+            raise ValueError("The rate must be greater than 0.")
+
+        self.interval = 1.0 / rate
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Wait until the calling thread is allowed to send a request.
+        """
+        with self.lock:
+            now = time.monotonic()
+            wait_until = max(self.next_time, now)
+            # the next request can be sent one interval after this one
+            self.next_time = wait_until + self.interval
+
+        delay = wait_until - now
+        if delay > 0:
+            time.sleep(delay)
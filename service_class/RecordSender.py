@@ -3,23 +3,51 @@ Author: Giovanni Ligato
 """
 
 import json
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
 import pandas as pd
 import requests
 import random
 
+from service_class.RateLimiter import RateLimiter
 from service_class.UniqueRandomGenerator import UniqueRandomGenerator
 from service_class.ServiceClassParameters import ServiceClassParameters
+from utility.http_client.headers import SENDER_PORT_HEADER, RECORD_STREAM_CONTENT_TYPE
+from utility.http_client.http_client import HttpClient
 
 class RecordSender:
 
-    def __init__(self, basedir: str = "."):
+    def __init__(self, basedir: str = ".", batch_size: int = 1, concurrency: int = 1,
+                 rate_limit: Optional[float] = None, max_retries: Optional[int] = 5, retry_delay: float = 0.1):
         """
         Initialize the RecordSender class by reading all the data from the CSV files.
 
         :param basedir: Base directory of Record Sender.
+        :param batch_size: Number of records sent in each request, 1 to send them one at a time.
+        :param concurrency: Number of requests in flight at the same time.
+        :param rate_limit: Maximum number of requests per second, None for no limit.
+        :param max_retries: Number of times a failed request is sent again, None to retry until it succeeds.
+        :param retry_delay: Time (in seconds) a failed request waits in the retry queue.
         """
 
         self.base_dir = basedir
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
+        if self.http_client.pool_maxsize < concurrency:
+            # one kept-alive connection for each request in flight, with the configured timeout and retries
+            shared_client = self.http_client
+            self.http_client = HttpClient(timeout=shared_client.timeout, retries=shared_client.retries,
+                                          backoff_factor=shared_client.backoff_factor,
+                                          retry_statuses=shared_client.retry_statuses, pool_maxsize=concurrency)
 
         # Read the data from the CSV files
         self.calendar = RecordSender.csv_reader(f"{basedir}/../data/calendar.csv")
@@ -59,53 +87,218 @@ class RecordSender:
         bucket = []
         for _ in range(session_count):
             index = self.unique_random_generator.generate()
+            bucket.extend(self.prepare_session(index, include_labels))
+
+        return bucket
+
+    def prepare_session(self, index: int, include_labels: bool):
+        """
+        Prepare the records of a session.
 
-            bucket.append({
+        :param index: Index of the session in the CSV files.
+        :param include_labels: Whether to include the label record.
+        :return: A list with the records of the session.
+        """
+        records = [
+            {
                 "source": "calendar",
                 "value": self.calendar.iloc[index].to_dict()
-            })
-            bucket.append({
+            },
+            {
                 "source": "environment",
                 "value": self.environment.iloc[index].to_dict()
-            })
-            bucket.append({
+            },
+            {
                 "source": "helmet",
                 "value": self.helmet.iloc[index].to_dict()
-            })
+            }
+        ]
 
-            if include_labels:
-                bucket.append({
-                    "source": "labels",
-                    "value": self.labels.iloc[index].to_dict()
-                })
+        if include_labels:
+            records.append({
+                "source": "labels",
+                "value": self.labels.iloc[index].to_dict()
+            })
 
-        return bucket
+        return records
 
     def send_bucket(self, bucket: list):
         """
-        Send records from the bucket to the Ingestion System randomly.
+        Send records from the bucket to the Ingestion System in random order.
 
-        :param bucket: The list of records to send.
+        The bucket is shuffled once, then `concurrency` threads send its records (batch_size records
+        per request) over the pooled connections, each one waiting for the rate limiter if any.
+        A request that could not be delivered (connection error or 5xx status) is put in a retry queue
+        and sent again after retry_delay seconds, up to max_retries times. A request refused by the
+        Ingestion System (4xx) or whose response was lost (read timeout) is not sent again.
+
+        :param bucket: The list of records to send, at the end it contains the records that could not be sent.
+        :return: The number of records sent, of requests retried and of records not sent.
         """
-        url = f"http://{ServiceClassParameters.GLOBAL_PARAMETERS['Ingestion System']['ip']}:{ServiceClassParameters.GLOBAL_PARAMETERS['Ingestion System']['port']}/send"
+        url = self._ingestion_url()
 
-        while bucket:
-            record = random.choice(bucket)
-            try:
+        random.shuffle(bucket)
+        # requests still to send: (records, attempts already made)
+        pending = deque((bucket[i:i + self.batch_size], 0) for i in range(0, len(bucket), self.batch_size))
+        # failed requests: (time of the next attempt, records, attempts already made), in order of time
+        retry_queue = deque()
+        lock = threading.Lock()
+        stats = {"sent": 0, "retried": 0, "failed": 0}
+        failed_records = []
+
+        def next_request():
+            # a ready retry has the precedence, None when there is nothing left to send
+            with lock:
+                if retry_queue and (not pending or retry_queue[0][0] <= time.monotonic()):
+                    ready_time, records, attempts = retry_queue.popleft()
+                    return ready_time, records, attempts
+                if pending:
+                    records, attempts = pending.popleft()
+                    return 0, records, attempts
+                return None
+
+        def worker():
+            while True:
+                request = next_request()
+                if request is None:
+                    return
+                ready_time, records, attempts = request
+
+                delay = ready_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+
+                dropped, retry = self._send_records(url, records)
+                with lock:
+                    stats["sent"] += len(records) - len(dropped) - len(retry)
+                    stats["failed"] += len(dropped)
+                    failed_records.extend(dropped)
+                    if not retry:
+                        continue
+                    if self.max_retries is None or attempts < self.max_retries:
+                        stats["retried"] += 1
+                        retry_queue.append((time.monotonic() + self.retry_delay, retry, attempts + 1))
+                    else:
+                        stats["failed"] += len(retry)
+                        failed_records.extend(retry)
+
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.concurrency, len(pending)))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        bucket[:] = failed_records
+        if stats["failed"]:
+            print(f"{stats['failed']} records not sent.")
+        return stats
+
+    def send_session(self, records: list) -> bool:
+        """
+        Send the records of a session in random order from the calling thread, batch_size records per request.
+
+        :param records: The records of the session.
+        :return: True if all the records were received, False if a request failed.
+        """
+        url = self._ingestion_url()
 
-                # Preparing the packet to send
-                packet = {
-                    "port": ServiceClassParameters.GLOBAL_PARAMETERS["Service Class"]["port"],
-                    "message": json.dumps(record)
-                }
-
-                response = requests.post(url, json=packet)
-                if response.status_code == 200:
-                    bucket.remove(record)
-                else:
-                    print(f"Failed to send record: {record}")
+        random.shuffle(records)
+        for i in range(0, len(records), self.batch_size):
+            dropped, retry = self._send_records(url, records[i:i + self.batch_size])
+            if dropped or retry:
+                return False
+        return True
+
+    def _ingestion_url(self) -> str:
+        """
+        :return: The URL of the route of the Ingestion System receiving the records (/send_batch if batch_size > 1).
+        """
+        route = "send_batch" if self.batch_size > 1 else "send"
+        return f"http://{ServiceClassParameters.GLOBAL_PARAMETERS['Ingestion System']['ip']}:{ServiceClassParameters.GLOBAL_PARAMETERS['Ingestion System']['port']}/{route}"
+
+    def _send_records(self, url: str, records: list) -> Tuple[list, list]:
+        """
+        Send one record to the /send route, or a batch of records to the /send_batch route
+        as a stream of JSON records, one per line.
+
+        A batch refused because some of its records are invalid is sent again without them,
+        the invalid records are logged and dropped.
+
+        :param url: The URL of the route.
+        :param records: The records to send.
+        :return: The records dropped (invalid, refused with a 4xx status or with a lost response) and the records
+                 that can be sent again (connection error or 5xx status), both empty if all the records were received.
+        """
+        dropped = []
+        while records:
+            try:
+                response = self._post_records(url, records)
+            except requests.ConnectionError as e:
+                print(f"Error sending records: {e}")
+                return dropped, records
             except requests.RequestException as e:
-                print(f"Error sending record: {e}")
+                # the records may have been received: sending them again could duplicate them
+                print(f"Error sending records: {e}")
+                return dropped + records, []
+
+            if response.status_code == 200:
+                return dropped, []
+
+            invalid = self._invalid_indexes(response, len(records)) if response.status_code == 400 else []
+            if not invalid:
+                print(f"Failed to send {len(records)} records: {response.status_code}")
+                if 400 <= response.status_code < 500:
+                    # the same request would be refused again
+                    return dropped + records, []
+                return dropped, records
+
+            for index in invalid:
+                print(f"Dropping invalid record: {records[index]}")
+            dropped.extend(records[index] for index in invalid)
+            records = [record for index, record in enumerate(records) if index not in invalid]
+
+        return dropped, []
+
+    def _post_records(self, url: str, records: list) -> requests.Response:
+        """
+        Post the records to the route of the Ingestion System.
+
+        :param url: The URL of the route.
+        :param records: The records to send.
+        :return: The response of the Ingestion System.
+        """
+        if self.batch_size > 1:
+            headers = {
+                "Content-Type": RECORD_STREAM_CONTENT_TYPE,
+                SENDER_PORT_HEADER: str(ServiceClassParameters.GLOBAL_PARAMETERS["Service Class"]["port"])
+            }
+            body = "\n".join(json.dumps(record) for record in records)
+            return self.http_client.post(url, data=body.encode("utf-8"), headers=headers)
+
+        # Preparing the packet to send
+        packet = {
+            "port": ServiceClassParameters.GLOBAL_PARAMETERS["Service Class"]["port"],
+            "message": json.dumps(records[0])
+        }
+        return self.http_client.post(url, json=packet)
+
+    @staticmethod
+    def _invalid_indexes(response: requests.Response, count: int) -> set:
+        """
+        Read the indexes of the invalid records returned by /send_batch with a 400 status.
+
+        :param response: The response of the Ingestion System.
+        :param count: Number of records of the request.
+        :return: The indexes of the invalid records, empty if the response does not list them.
+        """
+        try:
+            body = response.json()
+        except ValueError:
+            return set()
+        invalid = body.get("invalid", []) if isinstance(body, dict) else []
+        return {index for index in invalid if isinstance(index, int) and 0 <= index < count}
 
 
 if __name__ == "__main__":
@@ -8,6 +8,9 @@ from service_class.ServiceClassParameters import ServiceClassParameters
 from service_class.ServiceReceiver import ServiceReceiver
 from service_class.RecordSender import RecordSender
 from service_class.CSVLogger import CSVLogger
+from service_class.LoadGenerator import LoadGenerator
+from service_class.TraceCollector import TraceCollector
+from utility.http_client.http_client import HttpClient
 
 class ServiceClassOrchestrator:
     """
@@ -27,11 +30,29 @@ class ServiceClassOrchestrator:
         # Load the parameters of the Service Class
         ServiceClassParameters.loadParameters(self.basedir)
 
-        self.csv_logger = CSVLogger(self.basedir, ServiceClassParameters.LOCAL_PARAMETERS["phase"])
+        # timeout and retries of the messages sent to the other systems
+        HttpClient.configure(**(ServiceClassParameters.LOCAL_PARAMETERS.get("http_client") or {}))
 
-        self.serviceReceiver = ServiceReceiver(basedir=self.basedir, csv_logger=self.csv_logger)
+        # The logs are written in the background, every log_flush_interval seconds or log_buffer_size lines
+        log_flush_interval = ServiceClassParameters.LOCAL_PARAMETERS.get("log_flush_interval", 1.0)
+        log_buffer_size = ServiceClassParameters.LOCAL_PARAMETERS.get("log_buffer_size", 1000)
 
-        self.recordSender = RecordSender(basedir=self.basedir)
+        self.csv_logger = CSVLogger(self.basedir, ServiceClassParameters.LOCAL_PARAMETERS["phase"],
+                                    log_flush_interval, log_buffer_size)
+
+        # Spans of the sessions reported by the systems
+        self.trace_collector = TraceCollector(self.basedir)
+
+        self.serviceReceiver = ServiceReceiver(basedir=self.basedir, csv_logger=self.csv_logger,
+                                               trace_collector=self.trace_collector,
+                                               log_flush_interval=log_flush_interval,
+                                               log_buffer_size=log_buffer_size)
+
+        self.recordSender = RecordSender(basedir=self.basedir,
+                                         batch_size=ServiceClassParameters.LOCAL_PARAMETERS.get("record_batch_size", 1),
+                                         concurrency=ServiceClassParameters.LOCAL_PARAMETERS.get("sender_concurrency", 1),
+                                         rate_limit=ServiceClassParameters.LOCAL_PARAMETERS.get("sender_rate_limit"),
+                                         max_retries=ServiceClassParameters.LOCAL_PARAMETERS.get("sender_max_retries", 5))
 
 
 
@@ -43,7 +64,7 @@ class ServiceClassOrchestrator:
         print("Service Class started.")
 
         # Start the Service Receiver server
-        self.serviceReceiver.start_server()
+        self.serviceReceiver.start_server(ServiceClassParameters.LOCAL_PARAMETERS.get("serving"))
 
 
         if ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "all_phases":
@@ -156,13 +177,45 @@ class ServiceClassOrchestrator:
 
             print("All production phases completed.")
 
+        elif ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "open_loop":
+            open_loop = ServiceClassParameters.LOCAL_PARAMETERS["open_loop"]
+            print("Open-loop test: sessions will be sent for " + str(open_loop["duration"]) + " seconds, with "
+                  + open_loop["arrival_process"] + " arrivals.")
+
+            trace_path = open_loop.get("trace_path")
+            load_generator = LoadGenerator(self.recordSender, self.csv_logger,
+                                           arrival_process=open_loop["arrival_process"],
+                                           duration=open_loop["duration"],
+                                           rate=open_loop.get("rate"),
+                                           trace_path=f"{self.basedir}/{trace_path}" if trace_path else None,
+                                           include_labels=open_loop.get("include_labels", False),
+                                           concurrency=open_loop.get("concurrency", 8),
+                                           seed=open_loop.get("seed"))
+
+            # The send time of each session is logged in the CSV file
+            sessions = load_generator.run()
+
+            print(f"Open-loop test completed, {sessions} sessions sent.")
+
         else:
             print("Invalid value for the phase parameter.")
-            print("Please, choose between 'all_phases', 'development' or 'production'.")
+            print("Please, choose between 'all_phases', 'development', 'production' or 'open_loop'.")
             return
 
+        # Latency percentiles of each stage of the sessions traced so far
+        self.trace_collector.write_summary()
+
         print("Service Class stopped.")
 
+    def stop(self):
+        """
+        Write the remaining lines of the logs, the labels received after start returns are logged as well.
+        """
+
+        self.csv_logger.close()
+        self.serviceReceiver.close_log()
+        self.trace_collector.close()
+
 
 if __name__ == "__main__":
 
@@ -173,3 +226,5 @@ if __name__ == "__main__":
 
     # Wait user input to stop the program
     input("Press Enter to stop the program...")
+
+    service_class_orchestrator.stop()
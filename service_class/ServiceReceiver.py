@@ -2,15 +2,21 @@
 Author: Giovanni Ligato
 """
 
+import os
 import time
 import json
 import queue
-import threading
+from typing import Optional, Dict
 import jsonschema
 from flask import Flask, request, jsonify
 
 from service_class.ServiceClassParameters import ServiceClassParameters
 from service_class.CSVLogger import CSVLogger
+from service_class.LogWriter import LogWriter
+from service_class.TraceCollector import TraceCollector
+from utility.json_handler.schema_registry import SchemaRegistry
+from utility.tracing.tracer import TRACE_HEADER, parse_context
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class ServiceReceiver:
@@ -19,7 +25,8 @@ class ServiceReceiver:
 
     """
 
-    def __init__(self, host: str = '0.0.0.0', port: int = None, basedir: str = ".", csv_logger: CSVLogger = None):
+    def __init__(self, host: str = '0.0.0.0', port: int = None, basedir: str = ".", csv_logger: CSVLogger = None,
+                 trace_collector: TraceCollector = None, log_flush_interval: float = 1.0, log_buffer_size: int = 1000):
         """
         Initialize the Flask communication server.
 
@@ -27,6 +34,9 @@ class ServiceReceiver:
         :param port: The port number for the Flask server.
         :param basedir: The base directory for the Flask server.
         :param csv_logger: The CSVLogger instance to be used for logging.
+        :param trace_collector: The TraceCollector receiving the spans of the systems, None to ignore them.
+        :param log_flush_interval: Maximum time (in seconds) a timestamp waits in memory before being written to the log.
+        :param log_buffer_size: Number of timestamps in memory that triggers a write to the log.
         """
 
         if port is None:
@@ -37,6 +47,7 @@ class ServiceReceiver:
         self.port = port
 
         self.csv_logger = csv_logger
+        self.trace_collector = trace_collector
 
         # Queue to store received configuration messages
         self.configuration_queue = queue.Queue()
@@ -53,8 +64,15 @@ class ServiceReceiver:
         # Path of the JSON schema for the label
         self.label_schema_path = f"{basedir}/schemas/label_schema.json"
 
+        # Path of the JSON schema for the spans
+        self.trace_schema_path = f"{basedir}/schemas/trace_schema.json"
+
         # Path of the timestamp log
         self.timestamp_log_path = f"{basedir}/log/timestamp_log.txt"
+        os.makedirs(os.path.dirname(self.timestamp_log_path), exist_ok=True)
+
+        # The timestamps are written in the background, the handlers only enqueue them
+        self.timestamp_log = LogWriter(self.timestamp_log_path, log_flush_interval, log_buffer_size)
 
         # Developed Classifiers counter, used only when the phase is "development"
         self.developed_classifiers = 1
@@ -79,8 +97,7 @@ class ServiceReceiver:
                 print(f"Received timestamp: {json_timestamp}")
 
                 # Write the timestamp to the log
-                with open(self.timestamp_log_path, "a") as log_file:
-                    log_file.write(f"{json_timestamp['timestamp']},{json_timestamp['system']},{json_timestamp['status']}\n")
+                self.timestamp_log.write(f"{json_timestamp['timestamp']},{json_timestamp['system']},{json_timestamp['status']}")
 
                 return jsonify({"status": "received"}), 200
 
@@ -88,6 +105,33 @@ class ServiceReceiver:
                 # JSON timestamp is invalid
                 return jsonify({"status": "error", "message": "Invalid JSON timestamp"}), 400
 
+        # Define a route to receive the spans of the sessions
+        @self.app.route('/Trace', methods=['POST'])
+        def receive_trace():
+
+            packet = request.get_json()
+
+            # Get the json spans from the packet
+            json_trace = json.loads(packet["message"])
+
+            # Validate the spans
+            if self._validate_json(json_trace, self.trace_schema_path):
+                if self.trace_collector is not None:
+                    self.trace_collector.add_spans(json_trace["spans"])
+
+                return jsonify({"status": "received"}), 200
+
+            return jsonify({"status": "error", "message": "Invalid JSON trace"}), 400
+
+        # Define a route to get the latency percentiles of each stage
+        @self.app.route('/Trace', methods=['GET'])
+        def get_trace_summary():
+
+            if self.trace_collector is None:
+                return jsonify({}), 200
+
+            return jsonify(self.trace_collector.summary()), 200
+
         # Define a route to receive configuration messages
         @self.app.route('/MessagingSystem', methods=['POST'])
         def receive_configuration():
@@ -103,8 +147,7 @@ class ServiceReceiver:
 
                 print(f"Received configuration: {json_configuration}")
 
-                with open(self.timestamp_log_path, "a") as log_file:
-                    log_file.write(f"{time.time()},Service Class,{json_configuration['configuration']}\n")
+                self.timestamp_log.write(f"{time.time()},Service Class,{json_configuration['configuration']}")
 
                 if ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "development":
                     if json_configuration["configuration"] == "production":
@@ -124,6 +167,7 @@ class ServiceReceiver:
         @self.app.route('/ClientSide', methods=['POST'])
         def receive_label():
 
+            received = time.time()
             packet = request.get_json()
 
             # Get the json label from the packet
@@ -135,6 +179,19 @@ class ServiceReceiver:
 
                 print(f"Received label: {json_label}")
 
+                # The Service Class is the last hop of the session
+                trace_id, parent_id = parse_context(request.headers.get(TRACE_HEADER))
+                if self.trace_collector is not None and trace_id is not None:
+                    self.trace_collector.add_spans([{
+                        "trace_id": trace_id,
+                        "span_id": f"{trace_id}-client",
+                        "parent_id": parent_id,
+                        "system": "Service Class",
+                        "received": received,
+                        "processed": time.time(),
+                        "sent": None
+                    }])
+
                 if ServiceClassParameters.LOCAL_PARAMETERS["phase"] == "production":
 
                     self.labels_counter += 1
@@ -159,17 +216,25 @@ class ServiceReceiver:
                 # JSON label is invalid
                 return jsonify({"status": "error", "message": "Invalid JSON label"}), 400
 
-    def start_server(self):
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
 
         # Writing the start time in the log
-        with open(self.timestamp_log_path, "a") as log_file:
-            log_file.write(f"{time.time()},Service Class,start\n")
+        self.timestamp_log.write(f"{time.time()},Service Class,start")
 
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
+
+    def close_log(self):
+        """
+        Write the remaining timestamps to the log and stop its writer.
+        """
+
+        self.timestamp_log.close()
 
     def get_label(self) -> dict:
         """
@@ -198,11 +263,9 @@ class ServiceReceiver:
         :return: True if the JSON object is valid, False otherwise.
         """
 
-        with open(schema_path, "r") as schema_file:
-            schema = json.load(schema_file)
-
         try:
-            jsonschema.validate(json_data, schema)
+            # the schema is read and compiled once, not on every message
+            SchemaRegistry.get_instance().validate(json_data, schema_path)
             return True
         except jsonschema.ValidationError as e:
             print(f"Invalid JSON data: {e}")
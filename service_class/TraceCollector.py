@@ -0,0 +1,173 @@
+"""
+Author: Giovanni Ligato
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque, OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from service_class.LogWriter import LogWriter
+
+
+class TraceCollector:
+    """
+    Collects the spans reported by the systems and computes the latency breakdown of each session.
+
+    The stages of a session are:
+    - "<system>": time from the reception of the session to the end of its processing (queueing included);
+    - "<system> send": time spent sending the session to the next systems;
+    - "<sender> -> <receiver>": time from the send of the sender to the reception of the receiver;
+    - "end_to_end": time from the first reception to the last recorded event of the session.
+
+    The memory is bounded: the spans of a session are kept until no span of it is received for idle_timeout
+    seconds, or until more than max_traces sessions are kept. Then the session is folded into the latency
+    samples of its stages (the most recent max_samples of each stage are kept) and its spans are dropped.
+    """
+
+    def __init__(self, basedir: str = ".", percentiles: tuple = (50, 95, 99), max_traces: int = 10000,
+                 max_samples: int = 100000, idle_timeout: float = 60.0):
+        """
+        Initialize the collector.
+
+        :param basedir: The base directory of the Service Class, the spans are logged in its log folder.
+        :param percentiles: The percentiles of the latency of each stage computed by summary.
+        :param max_traces: Maximum number of sessions whose spans are kept.
+        :param max_samples: Maximum number of latency samples kept for each stage.
+        :param idle_timeout: Time (in seconds) after the last span of a session after which it is folded.
+        """
+        self.percentiles = percentiles
+        self.max_traces = max_traces
+        self.max_samples = max_samples
+        self.idle_timeout = idle_timeout
+        self.trace_log_path = os.path.join(basedir, "log", "trace_log.csv")
+        self.summary_path = os.path.join(basedir, "log", "trace_summary.json")
+        os.makedirs(os.path.dirname(self.trace_log_path), exist_ok=True)
+
+        # trace id (session uuid) -> spans of the session, least recently updated first
+        self.spans = OrderedDict()
+        # trace id -> time of the last span received (time.monotonic)
+        self.updated = {}
+        # stage -> latencies of the folded sessions (the most recent ones) and number of folded sessions
+        self.samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.counts = defaultdict(int)
+        self.lock = threading.Lock()
+
+        if not os.path.exists(self.trace_log_path):
+            with open(self.trace_log_path, "w") as log_file:
+                log_file.write("trace_id,span_id,parent_id,system,received,processed,sent\n")
+
+        # the spans are written in the background, the /Trace handler only enqueues them
+        self.trace_log = LogWriter(self.trace_log_path)
+
+    def add_spans(self, spans: List[Dict]):
+        """
+        Store the spans reported by a system and append them to the trace log.
+
+        :param spans: The spans (trace_id, span_id, parent_id, system, received, processed, sent).
+        """
+        now = time.monotonic()
+        with self.lock:
+            for span in spans:
+                trace_id = span["trace_id"]
+                self.spans.setdefault(trace_id, []).append(span)
+                self.spans.move_to_end(trace_id)
+                self.updated[trace_id] = now
+                self.trace_log.write(",".join("" if span.get(field) is None else str(span[field])
+                                              for field in ("trace_id", "span_id", "parent_id", "system",
+                                                            "received", "processed", "sent")))
+            self._fold(now)
+
+    def _fold(self, now: float):
+        # to be called holding the lock: fold the idle sessions and the ones exceeding max_traces
+        while self.spans:
+            trace_id = next(iter(self.spans))
+            if len(self.spans) <= self.max_traces and now - self.updated[trace_id] < self.idle_timeout:
+                break
+            for stage, latency in self._stages(self.spans.pop(trace_id)).items():
+                self.samples[stage].append(latency)
+                self.counts[stage] += 1
+            del self.updated[trace_id]
+
+    def breakdown(self, trace_id: str) -> Dict[str, float]:
+        """
+        Compute the latency (in seconds) of each stage of a session whose spans are kept.
+
+        :param trace_id: The session uuid.
+        :return: The latency of each stage, empty if the session is unknown or already folded.
+        """
+        with self.lock:
+            spans = list(self.spans.get(trace_id, []))
+        return self._stages(spans)
+
+    @staticmethod
+    def _stages(spans: List[Dict]) -> Dict[str, float]:
+        """
+        :param spans: The spans of a session.
+        :return: The latency of each stage of the session, empty if there are no spans.
+        """
+        if not spans:
+            return {}
+
+        by_id = {span["span_id"]: span for span in spans}
+        stages = {}
+        for span in spans:
+            processed = span.get("processed")
+            if processed is not None:
+                stages[span["system"]] = processed - span["received"]
+                if span.get("sent") is not None:
+                    stages[f"{span['system']} send"] = span["sent"] - processed
+
+            parent = by_id.get(span.get("parent_id"))
+            if parent is not None and parent.get("sent") is not None:
+                stages[f"{parent['system']} -> {span['system']}"] = span["received"] - parent["sent"]
+
+        events = [span[field] for span in spans for field in ("received", "processed", "sent")
+                  if span.get(field) is not None]
+        stages["end_to_end"] = max(events) - min(span["received"] for span in spans)
+        return stages
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Compute the percentiles of the latency of each stage over all the sessions.
+
+        The percentiles of the folded sessions are computed over their most recent max_samples latencies.
+
+        :return: For each stage the number of sessions and the latency percentiles (p50, p95, ...) in seconds.
+        """
+        with self.lock:
+            self._fold(time.monotonic())
+            latencies = {stage: list(samples) for stage, samples in self.samples.items()}
+            counts = dict(self.counts)
+            open_traces = [list(spans) for spans in self.spans.values()]
+
+        for spans in open_traces:
+            for stage, latency in self._stages(spans).items():
+                latencies.setdefault(stage, []).append(latency)
+                counts[stage] = counts.get(stage, 0) + 1
+
+        summary = {}
+        for stage, values in sorted(latencies.items()):
+            summary[stage] = {"count": counts[stage]}
+            for percentile, value in zip(self.percentiles, np.percentile(values, self.percentiles)):
+                summary[stage][f"p{percentile}"] = float(value)
+        return summary
+
+    def close(self):
+        """
+        Write the remaining spans to the trace log and stop its writer.
+        """
+        self.trace_log.close()
+
+    def write_summary(self, path: Optional[str] = None):
+        """
+        Write the summary of the latencies in a JSON file.
+
+        :param path: The path of the file, log/trace_summary.json if None.
+        """
+        with open(path or self.summary_path, "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=4)
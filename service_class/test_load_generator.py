@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from service_class.CSVLogger import CSVLogger
+from service_class.LoadGenerator import LoadGenerator
+from service_class.UniqueRandomGenerator import UniqueRandomGenerator
+
+
+class _StubRecordSender:
+    """
+    Prepares one record per session and fails the sessions whose index is in `failing`.
+    """
+
+    def __init__(self, failing=()):
+        self.unique_random_generator = UniqueRandomGenerator(0, 4)
+        self.failing = set(failing)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def prepare_session(self, index, include_labels):
+        return [{"source": "calendar", "value": {"UUID": f"uuid-{index}"}}]
+
+    def send_session(self, records):
+        with self.lock:
+            self.sent.append(records[0]["value"]["UUID"])
+        return int(records[0]["value"]["UUID"][5:]) not in self.failing
+
+
+class TestLoadGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_logger = CSVLogger(self.directory.name, "open_loop")
+
+    def tearDown(self):
+        self.csv_logger.close()
+        self.directory.cleanup()
+
+    def _generator(self, arrival_process, duration, **kwargs):
+        return LoadGenerator(_StubRecordSender(), self.csv_logger, arrival_process, duration, **kwargs)
+
+    def test_constant_arrivals(self):
+        arrival_times = self._generator("constant", 2, rate=5).arrival_times()
+        self.assertEqual(len(arrival_times), 10)
+        for number, arrival_time in enumerate(arrival_times):
+            self.assertAlmostEqual(arrival_time, number * 0.2)
+
+    def test_poisson_arrivals(self):
+        arrival_times = self._generator("poisson", 1000, rate=10, seed=42).arrival_times()
+
+        # the same seed gives the same arrivals
+        self.assertEqual(arrival_times, self._generator("poisson", 1000, rate=10, seed=42).arrival_times())
+        self.assertNotEqual(arrival_times, self._generator("poisson", 1000, rate=10, seed=43).arrival_times())
+
+        self.assertEqual(arrival_times, sorted(arrival_times))
+        self.assertLess(arrival_times[-1], 1000)
+        self.assertAlmostEqual(len(arrival_times) / 1000, 10, delta=0.3)
+
+    def test_trace_arrivals(self):
+        trace_path = os.path.join(self.directory.name, "trace.txt")
+        with open(trace_path, "w") as trace_file:
+            # absolute timestamps, not in order
+            trace_file.write("1700000001.5\n1700000000.25\n\n1700000003.0\n1700000000.75\n")
+
+        arrival_times = self._generator("trace", 2, trace_path=trace_path).arrival_times()
+        self.assertEqual(arrival_times, [0.0, 0.5, 1.25])
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            self._generator("burst", 10, rate=1)
+        with self.assertRaises(ValueError):
+            self._generator("poisson", 10)
+        with self.assertRaises(ValueError):
+            self._generator("trace", 10)
+
+    def test_run(self):
+        record_sender = _StubRecordSender(failing={0, 3})
+        load_generator = LoadGenerator(record_sender, self.csv_logger, "constant", 0.5, rate=24, concurrency=4)
+
+        # the 12 sessions reuse the 5 sessions of the CSV files
+        self.assertEqual(load_generator.run(), 12)
+        self.csv_logger.close()
+
+        with open(self.csv_logger.file_path) as log_file:
+            header, *rows = log_file.read().splitlines()
+        self.assertEqual(header, "session,uuid,scheduled_timestamp,send_timestamp,sent_timestamp,status")
+
+        # every session is logged once, with the result of send_session
+        rows = [row.split(",") for row in rows]
+        self.assertEqual(sorted(int(row[0]) for row in rows), list(range(1, 13)))
+        self.assertEqual(sorted(row[1] for row in rows), sorted(record_sender.sent))
+        for row in rows:
+            failed = row[1] in ("uuid-0", "uuid-3")
+            self.assertEqual(row[5], "failed" if failed else "sent")
+            self.assertLessEqual(float(row[3]), float(row[4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from service_class.RecordSender import RecordSender
+from service_class.ServiceClassParameters import ServiceClassParameters
+
+
+class _IngestionHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        if self.path == "/send":
+            records = [json.loads(json.loads(body)["message"])]
+        else:
+            records = [json.loads(line) for line in body.splitlines()]
+
+        with self.server.lock:
+            self.server.requests.append(records)
+            self.server.times.append(time.monotonic())
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+
+        invalid = [index for index, record in enumerate(records) if record["source"] == "invalid"]
+        if status == 200 and invalid:
+            self._reply(400, {"error": "Invalid records", "invalid": invalid})
+            return
+        if status == 200:
+            with self.server.lock:
+                self.server.received.extend(records)
+        self._reply(status, {})
+
+    def _reply(self, status, body):
+        body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRecordSender(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _IngestionHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.times = []
+        self.server.received = []
+        # statuses of the next requests, 200 when empty
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.global_parameters = ServiceClassParameters.GLOBAL_PARAMETERS
+        ServiceClassParameters.GLOBAL_PARAMETERS = {
+            "Ingestion System": {"ip": "127.0.0.1", "port": self.server.server_address[1]},
+            "Service Class": {"ip": "127.0.0.1", "port": 5000}
+        }
+
+        # the sender reads the sessions from basedir/../data
+        self.directory = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.directory.name, "data"))
+        for source in ("calendar", "environment", "helmet", "labels"):
+            with open(os.path.join(self.directory.name, "data", f"{source}.csv"), "w") as csv_file:
+                csv_file.write("UUID,value\n" + "".join(f"{number},{number}\n" for number in range(10)))
+        self.basedir = os.path.join(self.directory.name, "service_class")
+        os.mkdir(self.basedir)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        ServiceClassParameters.GLOBAL_PARAMETERS = self.global_parameters
+        self.directory.cleanup()
+
+    def _bucket(self, count):
+        return [{"source": "helmet", "value": {"UUID": number}} for number in range(count)]
+
+    def test_all_records_sent_in_order(self):
+        sender = RecordSender(self.basedir, batch_size=7)
+        bucket = self._bucket(100)
+        random.seed(0)
+        expected = list(bucket)
+        random.shuffle(expected)
+
+        # a single thread sends the shuffled bucket in order, batch_size records per request
+        random.seed(0)
+        stats = sender.send_bucket(bucket)
+        self.assertEqual(stats, {"sent": 100, "retried": 0, "failed": 0})
+        self.assertEqual(bucket, [])
+        self.assertEqual([len(records) for records in self.server.requests], [7] * 14 + [2])
+        self.assertEqual(self.server.received, expected)
+
+    def test_concurrent_requests(self):
+        sender = RecordSender(self.basedir, batch_size=3, concurrency=8)
+        bucket = self._bucket(200)
+
+        # every record is received exactly once
+        stats = sender.send_bucket(bucket)
+        self.assertEqual(stats, {"sent": 200, "retried": 0, "failed": 0})
+        self.assertEqual(len(self.server.requests), 67)
+        self.assertEqual(sorted(record["value"]["UUID"] for record in self.server.received), list(range(200)))
+
+    def test_retry_then_success(self):
+        sender = RecordSender(self.basedir, batch_size=5, max_retries=3, retry_delay=0.2)
+        self.server.statuses = [500]
+
+        # the failed request waits in the retry queue, meanwhile the other requests are sent
+        bucket = self._bucket(15)
+        stats = sender.send_bucket(bucket)
+        self.assertEqual(stats, {"sent": 15, "retried": 1, "failed": 0})
+        self.assertEqual(bucket, [])
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(self.server.requests[3], self.server.requests[0])
+        self.assertGreaterEqual(self.server.times[3] - self.server.times[0], 0.2)
+        self.assertEqual(sorted(record["value"]["UUID"] for record in self.server.received), list(range(15)))
+
+    def test_retries_exhausted(self):
+        sender = RecordSender(self.basedir, batch_size=10, max_retries=2, retry_delay=0.01)
+        self.server.statuses = [500] * 3
+
+        bucket = self._bucket(10)
+        stats = sender.send_bucket(bucket)
+        self.assertEqual(stats, {"sent": 0, "retried": 2, "failed": 10})
+
+        # the bucket is left with the records of the request that failed 1 + max_retries times
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.received, [])
+        self.assertEqual(bucket, self.server.requests[0])
+
+    def test_rate_limit(self):
+        sender = RecordSender(self.basedir, concurrency=4, rate_limit=20)
+
+        stats = sender.send_bucket(self._bucket(10))
+        self.assertEqual(stats["sent"], 10)
+
+        # 4 threads, but at most 20 requests per second
+        times = sorted(self.server.times)
+        self.assertGreaterEqual(times[-1] - times[0], 9 / 20 - 0.02)
+        for first, last in zip(times, times[4:]):
+            self.assertGreaterEqual(last - first, 4 / 20 - 0.02)
+
+    def test_invalid_records_dropped(self):
+        sender = RecordSender(self.basedir, batch_size=10)
+        bucket = self._bucket(18)
+        invalid = [{"source": "invalid", "value": {"UUID": number}} for number in range(2)]
+        bucket.extend(invalid)
+
+        # the batch refused for its invalid records is sent again without them, never retried as a whole
+        stats = sender.send_bucket(bucket)
+        self.assertEqual(stats, {"sent": 18, "retried": 0, "failed": 2})
+        self.assertEqual(sorted(record["value"]["UUID"] for record in self.server.received), list(range(18)))
+        self.assertCountEqual(bucket, invalid)
+
+    def test_refused_request_not_retried(self):
+        sender = RecordSender(self.basedir, batch_size=5, max_retries=3)
+        self.server.statuses = [413]
+
+        bucket = self._bucket(5)
+        stats = sender.send_bucket(bucket)
+        self.assertEqual(stats, {"sent": 0, "retried": 0, "failed": 5})
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(len(bucket), 5)
+
+    def test_send_session(self):
+        sender = RecordSender(self.basedir)
+        records = sender.prepare_session(3, include_labels=True)
+        self.assertTrue(sender.send_session(records))
+        self.assertEqual(len(self.server.received), 4)
+
+        self.server.statuses = [400]
+        self.assertFalse(sender.send_session(sender.prepare_session(4, include_labels=False)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import sqlite3
-from typing import List, Tuple, Any, Dict
+from typing import List, Tuple, Any, Dict, Iterable
+
+from utility.database.sqlite_connection_pool import SQLiteConnectionPool
 
 
 class DatabaseManager:
@@ -8,19 +10,29 @@ class DatabaseManager:
 
     Provides methods to interact with a SQLite database, including
     creating tables, inserting records, updating, deleting, and fetching data.
+    Each thread keeps its own long-lived connection (see SQLiteConnectionPool).
     """
 
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, journal_mode: str = "WAL", synchronous: str = "NORMAL", cache_size: int = -8000):
         """
         Initialize the DatabaseManager with a given database name.
 
         :param db_name: The name of the SQLite database file.
+        :param journal_mode: SQLite journal mode.
+        :param synchronous: SQLite synchronous mode.
+        :param cache_size: Page cache of each connection, in pages if positive or in KiB if negative.
         """
         self.db_name = db_name
+        self._pool = SQLiteConnectionPool(db_name, journal_mode=journal_mode, synchronous=synchronous,
+                                          cache_size=cache_size)
 
     def _connect(self):
-        """Establish a connection to the database."""
-        return sqlite3.connect(self.db_name)
+        """Get the connection of the calling thread to the database."""
+        return self._pool.connection()
+
+    def close(self) -> None:
+        """Close the connections to the database."""
+        self._pool.close()
 
     def execute_query(self, query: str, params: Tuple = ()) -> None:
         """
@@ -30,10 +42,19 @@ class DatabaseManager:
         :param params: A tuple of parameters to bind to the query.
         """
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
+            self._pool.execute(query, params)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+
+    def execute_many(self, query: str, params_list: Iterable[Tuple]) -> None:
+        """
+        Execute a query once for each tuple of parameters, in a single transaction.
+
+        :param query: The SQL query to execute.
+        :param params_list: The tuples of parameters to bind to the query.
+        """
+        try:
+            self._pool.execute_many(query, params_list)
         except sqlite3.Error as e:
             print(f"Database error: {e}")
 
@@ -44,10 +65,7 @@ class DatabaseManager:
         :param script: The SQL script to execute.
         """
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.executescript(script)
-                conn.commit()
+            self._pool.execute_script(script)
         except sqlite3.Error as e:
             print(f"Database error: {e}")
 
@@ -60,10 +78,7 @@ class DatabaseManager:
         :return: A list of tuples representing the fetched rows.
         """
         try:
-            with self._connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                return cursor.fetchall()
+            return self._pool.fetch_all(query, params)
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             return []
@@ -91,6 +106,20 @@ class DatabaseManager:
         query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
         self.execute_query(query, tuple(data.values()))
 
+    def insert_many(self, table_name: str, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert several records into a table in a single transaction.
+
+        :param table_name: The name of the table.
+        :param rows: Dictionaries of column names and values to insert, all with the same columns.
+        """
+        if not rows:
+            return
+        columns = ", ".join(rows[0].keys())
+        placeholders = ", ".join(["?" for _ in rows[0]])
+        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        self.execute_many(query, [tuple(row.values()) for row in rows])
+
     def update(self, table_name: str, data: Dict[str, Any], condition: str, condition_params: Tuple) -> None:
         """
         Update records in a table based on a condition.
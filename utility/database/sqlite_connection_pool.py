@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import threading
+from typing import List, Tuple, Optional, Iterable, Any
+
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+class SQLiteConnectionPool:
+    """
+    Keeps one long-lived SQLite connection for each thread using a database file.
+
+    Every connection is configured with the same pragmas (journal mode, synchronous, cache size)
+    and caches its prepared statements, so a query does not pay the cost of opening the database,
+    reading the schema and compiling the statement each time.
+    """
+
+    def __init__(self, path: str, journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                 cache_size: int = -8000, cached_statements: int = 256, timeout: float = 5.0):
+        """
+        Initialize the pool, the connections are opened by each thread on first use.
+
+        :param path: Path of the SQLite database file.
+        :param journal_mode: Journal mode of the database (WAL lets readers work while a thread writes).
+        :param synchronous: When SQLite waits for the data to reach the disk (NORMAL is safe with WAL).
+        :param cache_size: Page cache of each connection, in pages if positive or in KiB if negative.
+        :param cached_statements: Number of prepared statements cached by each connection.
+        :param timeout: Time (in seconds) a connection waits for a lock held by another connection.
+        """
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode '{journal_mode}', expected one of {JOURNAL_MODES}")
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Unknown synchronous mode '{synchronous}', expected one of {SYNCHRONOUS_MODES}")
+
+        self.path = path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = int(cache_size)
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+
+        self._local = threading.local()
+        # all the open connections, to close them from any thread
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Get the connection of the calling thread, opening it if necessary.
+
+        :return: The connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # each connection is used by a single thread, but it can be closed by any thread
+            conn = sqlite3.connect(self.path, timeout=self.timeout, cached_statements=self.cached_statements,
+                                   check_same_thread=False)
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode};")
+            conn.execute(f"PRAGMA synchronous = {self.synchronous};")
+            conn.execute(f"PRAGMA cache_size = {self.cache_size};")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def execute(self, query: str, values: Optional[Tuple] = None) -> int:
+        """
+        Execute a query and commit it.
+
+        :param query: SQL query to execute.
+        :param values: Tuple of values to substitute in the query (optional).
+        :return: Number of rows changed by the query.
+        """
+        conn = self.connection()
+        with conn:
+            cursor = conn.execute(query, values if values is not None else ())
+            return cursor.rowcount
+
+    def execute_many(self, query: str, values_list: Iterable[Tuple]) -> int:
+        """
+        Execute a query once for each tuple of values, in a single transaction.
+
+        :param query: SQL query to execute.
+        :param values_list: Tuples of values to substitute in the query.
+        :return: Number of rows changed.
+        """
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany(query, values_list)
+            return cursor.rowcount
+
+    def execute_transaction(self, queries: Iterable[Tuple[str, Optional[Tuple]]]) -> None:
+        """
+        Execute several queries in a single transaction, rolled back if one of them fails.
+
+        :param queries: (query, values) tuples, values is a tuple or None.
+        """
+        conn = self.connection()
+        with conn:
+            for query, values in queries:
+                conn.execute(query, values if values is not None else ())
+
+    def execute_script(self, script: str) -> None:
+        """
+        Execute a script containing multiple SQL statements.
+
+        :param script: The SQL script to execute.
+        """
+        conn = self.connection()
+        conn.executescript(script)
+        conn.commit()
+
+    def fetch_all(self, query: str, values: Optional[Tuple] = None) -> List[Tuple[Any, ...]]:
+        """
+        Execute a query and return the results.
+
+        :param query: SQL query to execute.
+        :param values: Tuple of values to substitute in the query (optional).
+        :return: A list of tuples representing the fetched rows.
+        """
+        return self.connection().execute(query, values if values is not None else ()).fetchall()
+
+    def close(self) -> None:
+        """
+        Close all the connections, the threads open a new one on their next query.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+            for conn in connections:
+                conn.close()
+        # new thread-local storage: every thread opens a new connection on its next query
+        self._local = threading.local()
+
+    def remove_database(self) -> None:
+        """
+        Close all the connections and remove the database file with its journal files.
+        """
+        self.close()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
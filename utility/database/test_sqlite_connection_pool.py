@@ -0,0 +1,66 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from utility.database.sqlite_connection_pool import SQLiteConnectionPool
+
+
+class TestSQLiteConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test_pool.db")
+        self.pool = SQLiteConnectionPool(self.path, journal_mode="wal", synchronous="normal", cache_size=-2000)
+        self.pool.execute("CREATE TABLE IF NOT EXISTS records (uuid TEXT PRIMARY KEY, value INTEGER)")
+
+    def tearDown(self):
+        self.pool.close()
+        self.directory.cleanup()
+
+    def test_pragmas(self):
+        conn = self.pool.connection()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        # NORMAL
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -2000)
+
+    def test_one_connection_per_thread(self):
+        main_connection = self.pool.connection()
+        self.assertIs(self.pool.connection(), main_connection)
+
+        other_connections = []
+        thread = threading.Thread(target=lambda: other_connections.append(self.pool.connection()))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(other_connections[0], main_connection)
+
+    def test_execute_many_and_fetch(self):
+        self.pool.execute_many("INSERT INTO records (uuid, value) VALUES (?, ?)",
+                               [(f"uuid-{number}", number) for number in range(100)])
+
+        rows = self.pool.fetch_all("SELECT COUNT(*), SUM(value) FROM records")
+        self.assertEqual(rows, [(100, sum(range(100)))])
+
+    def test_transaction_is_rolled_back(self):
+        with self.assertRaises(Exception):
+            self.pool.execute_transaction([
+                ("INSERT INTO records (uuid, value) VALUES (?, ?)", ("uuid-1", 1)),
+                ("INSERT INTO records (uuid, value) VALUES (?, ?)", ("uuid-1", 2)),
+            ])
+
+        self.assertEqual(self.pool.fetch_all("SELECT * FROM records"), [])
+
+    def test_remove_database(self):
+        self.pool.execute("INSERT INTO records (uuid, value) VALUES (?, ?)", ("uuid-1", 1))
+        self.pool.remove_database()
+
+        self.assertFalse(os.path.exists(self.path))
+        # the database is created again by the next query
+        self.pool.execute("CREATE TABLE IF NOT EXISTS records (uuid TEXT PRIMARY KEY, value INTEGER)")
+        self.assertEqual(self.pool.fetch_all("SELECT * FROM records"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
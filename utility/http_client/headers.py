@@ -0,0 +1,18 @@
+"""
+Header names and content types of the binary messages exchanged by the systems.
+"""
+
+# header carrying the sender port, since a binary message has no JSON payload
+SENDER_PORT_HEADER = "X-Sender-Port"
+
+# header with the encoding of an uploaded classifier: "gzip" or "identity"
+MODEL_ENCODING_HEADER = "X-Model-Encoding"
+
+# content type of a raw session sent in binary format (see RawSession.to_bytes)
+RAW_SESSION_CONTENT_TYPE = "application/x-raw-session"
+
+# content type of a stream of records, one JSON record per line (the default of /send_batch is a JSON array)
+RECORD_STREAM_CONTENT_TYPE = "application/x-ndjson"
+
+# content type of a chunk of an uploaded classifier
+CLASSIFIER_CONTENT_TYPE = "application/octet-stream"
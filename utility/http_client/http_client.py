@@ -0,0 +1,116 @@
+import threading
+from typing import Optional, Collection
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpClient:
+    """
+    A keep-alive HTTP client shared by the modules of a system to send messages to the other systems.
+
+    Connections are kept open and reused: the underlying pool manager keeps one connection pool
+    per target (ip, port), so sending a message does not open a new TCP connection each time.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, timeout: Optional[float] = None, retries: int = 3, backoff_factor: float = 0.1,
+                 retry_statuses: Collection[int] = (503,), pool_connections: int = 10, pool_maxsize: int = 10):
+        """
+        Initialize the HTTP client.
+
+        :param timeout: Default timeout (in seconds) of each request, None means wait indefinitely.
+        :param retries: Number of retries of a request whose connection failed or whose status is in retry_statuses.
+        :param backoff_factor: Factor of the exponential sleep between retries (in seconds).
+        :param retry_statuses: Response statuses meaning that the message was not accepted and can be sent again.
+        :param pool_connections: Number of targets whose connection pool is kept.
+        :param pool_maxsize: Maximum number of connections kept open towards each target.
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = retry_statuses
+        self.pool_maxsize = pool_maxsize
+
+        # POST is not idempotent: it is retried only if the target did not read the request
+        # (connection errors) or explicitly refused it (retry_statuses), never after a read timeout
+        retry = Retry(total=retries, connect=retries, read=0, status=retries,
+                      status_forcelist=retry_statuses, allowed_methods=None,
+                      backoff_factor=backoff_factor, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def get_instance(cls) -> "HttpClient":
+        """
+        Get the HTTP client shared by the whole process, creating it with the default parameters if necessary.
+
+        :return: The shared HttpClient instance.
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def configure(cls, **kwargs) -> "HttpClient":
+        """
+        Replace the shared HTTP client with one created with the given parameters (see __init__).
+        Each system calls it at startup with the http_client object of its configuration (timeout, retries,
+        backoff_factor), before creating the modules that send messages.
+
+        :return: The new shared HttpClient instance.
+        """
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.close()
+            cls._instance = cls(**kwargs)
+            return cls._instance
+
+    def post(self, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Send a POST request over a pooled connection.
+
+        :param url: The URL of the target.
+        :param timeout: Timeout of this request (in seconds), the client default if None.
+        :param kwargs: Other arguments of requests.post (e.g. json, data, headers).
+        :return: The response of the target.
+        :raises requests.RequestException: If the request fails after all the retries.
+        """
+        return self.session.post(url, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Send a GET request over a pooled connection.
+
+        :param url: The URL of the target.
+        :param timeout: Timeout of this request (in seconds), the client default if None.
+        :param kwargs: Other arguments of requests.get (e.g. params, headers).
+        :return: The response of the target.
+        :raises requests.RequestException: If the request fails after all the retries.
+        """
+        return self.session.get(url, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+    def put(self, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Send a PUT request over a pooled connection.
+
+        :param url: The URL of the target.
+        :param timeout: Timeout of this request (in seconds), the client default if None.
+        :param kwargs: Other arguments of requests.put (e.g. data, headers).
+        :return: The response of the target.
+        :raises requests.RequestException: If the request fails after all the retries.
+        """
+        return self.session.put(url, timeout=timeout if timeout is not None else self.timeout, **kwargs)
+
+    def close(self) -> None:
+        """
+        Close all the pooled connections.
+        """
+        self.session.close()
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utility.http_client.http_client import HttpClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Keep-alive handler recording the client port of each request, it answers 503 to the first
+    'unavailable' requests and 200 to the others.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.client_ports.append(self.client_address[1])
+        status = 200
+        if self.server.unavailable > 0:
+            self.server.unavailable -= 1
+            status = 503
+        body = b'{"status": "received"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    """
+    A test class for testing the HttpClient class.
+    """
+
+    def setUp(self):
+        """
+        Start a local HTTP server and create a client.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.client_ports = []
+        self.server.unavailable = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/send"
+        self.client = HttpClient(timeout=2.0, retries=2, backoff_factor=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        """
+        Test that consecutive messages to the same target use a single connection.
+        """
+        for _ in range(5):
+            response = self.client.post(self.url, json={"port": 5000, "message": "{}"})
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(self.server.client_ports), 5)
+        self.assertEqual(len(set(self.server.client_ports)), 1)
+
+    def test_unavailable_target_is_retried(self):
+        """
+        Test that a message refused with 503 is sent again.
+        """
+        self.server.unavailable = 2
+
+        response = self.client.post(self.url, json={"port": 5000, "message": "{}"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.client_ports), 3)
+
+    def test_shared_instance(self):
+        """
+        Test that get_instance returns the same client until it is configured again.
+        """
+        instance = HttpClient.get_instance()
+        self.assertIs(HttpClient.get_instance(), instance)
+
+        configured = HttpClient.configure(timeout=1.0)
+        self.assertIsNot(configured, instance)
+        self.assertIs(HttpClient.get_instance(), configured)
+        self.assertEqual(configured.timeout, 1.0)
+
+    def test_configure_from_system_configuration(self):
+        """
+        Test that the http_client object of a system configuration sets the timeout and the retries.
+        """
+        with open(os.path.join(os.path.dirname(__file__), "..", "..", "production_system", "configuration",
+                               "prod_sys_conf.json")) as configuration_file:
+            configuration = json.load(configuration_file)
+
+        configured = HttpClient.configure(**configuration["http_client"])
+        self.assertEqual((configured.timeout, configured.retries, configured.backoff_factor), (30, 3, 0.1))
+        self.assertEqual(configured.session.get_adapter("http://127.0.0.1").max_retries.total, 3)
+
+        # without a configuration the requests wait indefinitely, as the requests module does
+        self.assertIsNone(HttpClient.configure().timeout)
+
+
+if __name__ == "__main__":
+    unittest.main()
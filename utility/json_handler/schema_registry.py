@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import jsonschema
+from jsonschema.validators import validator_for
+
+try:
+    # optional: compiles a schema to Python code, much faster on large schemas
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+
+class CompiledSchema:
+    """
+    A JSON schema loaded from a file and compiled to a reusable validator.
+    """
+
+    def __init__(self, schema: dict, fast_path: bool = True):
+        """
+        Check and compile the schema.
+
+        :param schema: The JSON schema.
+        :param fast_path: Also compile the schema with fastjsonschema, if it is installed.
+        :raises jsonschema.SchemaError: If the schema itself is not valid.
+        """
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        self.schema = schema
+        self.validator = validator_class(schema)
+
+        self._fast_validate: Optional[Callable] = None
+        if fast_path and fastjsonschema is not None:
+            try:
+                self._fast_validate = fastjsonschema.compile(schema)
+            except Exception:
+                # some schemas are not supported by fastjsonschema: jsonschema validates them
+                self._fast_validate = None
+
+    def validate(self, instance) -> None:
+        """
+        Validate an instance against the schema.
+
+        :param instance: The JSON object to validate.
+        :raises jsonschema.ValidationError: If the instance is not valid.
+        """
+        if self._fast_validate is not None:
+            try:
+                self._fast_validate(instance)
+                return
+            except fastjsonschema.JsonSchemaException:
+                # jsonschema decides and raises the usual ValidationError
+                pass
+        self.validator.validate(instance)
+
+    def is_valid(self, instance) -> bool:
+        """
+        :param instance: The JSON object to validate.
+        :return: True if the instance is valid, False otherwise.
+        """
+        try:
+            self.validate(instance)
+        except jsonschema.ValidationError:
+            return False
+        return True
+
+
+class SchemaRegistry:
+    """
+    Loads each JSON schema file once and keeps its compiled validator.
+
+    A schema is loaded again only when its file changes (modification time or size), so validating
+    a message does not read, parse and check the schema each time.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, fast_path: bool = True):
+        """
+        Initialize an empty registry.
+
+        :param fast_path: Compile the schemas with fastjsonschema too, if it is installed.
+        """
+        self.fast_path = fast_path
+        # absolute path -> ((mtime_ns, size), compiled schema)
+        self._schemas: Dict[str, Tuple[Tuple[int, int], CompiledSchema]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "SchemaRegistry":
+        """
+        Get the registry shared by the whole process, creating it if necessary.
+
+        :return: The shared SchemaRegistry instance.
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def get_schema(self, schema_path: str) -> CompiledSchema:
+        """
+        Get the compiled schema of a file, loading it if it is not cached or the file has changed.
+
+        :param schema_path: Path of the JSON schema file.
+        :return: The compiled schema.
+        :raises OSError: If the file cannot be read.
+        :raises jsonschema.SchemaError: If the schema is not valid.
+        """
+        path = os.path.abspath(schema_path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._schemas.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with open(path, "r", encoding="UTF-8") as file:
+            compiled = CompiledSchema(json.load(file), self.fast_path)
+        with self._lock:
+            self._schemas[path] = (version, compiled)
+        return compiled
+
+    def validate(self, instance, schema_path: str) -> None:
+        """
+        Validate a JSON object against the schema in a file.
+
+        :param instance: The JSON object to validate.
+        :param schema_path: Path of the JSON schema file.
+        :raises jsonschema.ValidationError: If the instance is not valid.
+        """
+        self.get_schema(schema_path).validate(instance)
+
+    def is_valid(self, instance, schema_path: str) -> bool:
+        """
+        :param instance: The JSON object to validate.
+        :param schema_path: Path of the JSON schema file.
+        :return: True if the instance is valid, False otherwise.
+        """
+        return self.get_schema(schema_path).is_valid(instance)
+
+    def clear(self) -> None:
+        """
+        Forget all the loaded schemas.
+        """
+        with self._lock:
+            self._schemas.clear()
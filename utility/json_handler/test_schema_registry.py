@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import jsonschema
+
+from utility.json_handler import schema_registry
+from utility.json_handler.schema_registry import SchemaRegistry
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"uuid": {"type": "string"}, "label": {"type": "string"}},
+    "required": ["uuid", "label"],
+}
+
+
+class TestSchemaRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.schema_path = os.path.join(self.directory.name, "labelSchema.json")
+        self._write_schema(SCHEMA)
+        self.registry = SchemaRegistry()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write_schema(self, schema, mtime_ns=None):
+        with open(self.schema_path, "w", encoding="UTF-8") as file:
+            json.dump(schema, file)
+        if mtime_ns is not None:
+            os.utime(self.schema_path, ns=(mtime_ns, mtime_ns))
+
+    def test_validate(self):
+        self.registry.validate({"uuid": "1234", "label": "move"}, self.schema_path)
+        self.assertTrue(self.registry.is_valid({"uuid": "1234", "label": "move"}, self.schema_path))
+
+        self.assertFalse(self.registry.is_valid({"uuid": "1234"}, self.schema_path))
+        with self.assertRaises(jsonschema.ValidationError):
+            self.registry.validate({"uuid": "1234", "label": 5}, self.schema_path)
+
+    def test_schema_is_loaded_once(self):
+        with patch.object(schema_registry, "CompiledSchema", wraps=schema_registry.CompiledSchema) as compiled:
+            for _ in range(10):
+                self.registry.is_valid({"uuid": "1234", "label": "move"}, self.schema_path)
+            # a relative path of the same file shares the entry
+            self.registry.is_valid({"uuid": "1234", "label": "move"}, os.path.relpath(self.schema_path))
+
+        self.assertEqual(compiled.call_count, 1)
+
+    def test_schema_is_reloaded_when_the_file_changes(self):
+        self._write_schema(SCHEMA, mtime_ns=1_000_000_000)
+        self.assertTrue(self.registry.is_valid({"uuid": "1234", "label": "move"}, self.schema_path))
+
+        self._write_schema(dict(SCHEMA, required=["uuid", "label", "timestamp"]), mtime_ns=2_000_000_000)
+        self.assertFalse(self.registry.is_valid({"uuid": "1234", "label": "move"}, self.schema_path))
+
+    def test_invalid_schema(self):
+        self._write_schema({"type": "not a type"})
+        with self.assertRaises(jsonschema.SchemaError):
+            self.registry.validate({}, self.schema_path)
+
+    def test_without_fast_path(self):
+        registry = SchemaRegistry(fast_path=False)
+        self.assertTrue(registry.is_valid({"uuid": "1234", "label": "move"}, self.schema_path))
+        self.assertFalse(registry.is_valid({"uuid": 1234, "label": "move"}, self.schema_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Optional, Dict, List, Tuple, Coroutine
+
+import aiohttp
+from aiohttp import web
+
+
+class AsyncMessageBroker:
+    """
+    A utility class to enable inter-module communication using asyncio.
+
+    The HTTP server, the HTTP client and the queue of the received messages run on an event loop
+    owned by the broker, in a separate thread. The coroutines (async_*) must run on that loop
+    (see submit), while send_message, send_messages and get_last_message can be called from any thread.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 5000, timeout: float = 5.0, pool_maxsize: int = 10):
+        """
+        Initialize the broker and start its event loop.
+
+        :param host: The host address for the HTTP server.
+        :param port: The port number for the HTTP server.
+        :param timeout: Timeout (in seconds) of each message sent.
+        :param pool_maxsize: Maximum number of connections kept open towards each target.
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+
+        # Received messages, in arrival order
+        self.message_queue = asyncio.Queue()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_post('/send', self._receive_message)
+
+        self.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        thread.start()
+
+    async def _receive_message(self, request: web.Request) -> web.Response:
+        """
+        Put a received message in the queue.
+
+        :param request: The HTTP request.
+        :return: The HTTP response.
+        """
+        data = await request.json()
+        await self.message_queue.put({
+            'ip': request.remote,
+            'port': data.get('port'),
+            'message': data.get('message')
+        })
+        return web.json_response({"status": "received"}, status=200)
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Run a coroutine on the broker event loop.
+
+        :param coroutine: The coroutine to run (e.g. async_send_message(...)).
+        :return: A future with the result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def _start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+    def start_server(self):
+        """
+        Start the HTTP server on the broker event loop.
+        """
+        self.submit(self._start()).result()
+
+    async def _stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def stop_server(self):
+        """
+        Stop the HTTP server, close the connections and stop the broker event loop.
+        """
+        self.submit(self._stop()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # the session is bound to the broker event loop, so it is created on the first send
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_maxsize),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def async_send_message(self, target_ip: str, target_port: int, message: str,
+                                 route: str = "send", headers: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Send a message to a target module without blocking the event loop.
+
+        :param target_ip: The IP address of the target module.
+        :param target_port: The port of the target module.
+        :param message: The message to send (typically a JSON string).
+        :param route: The route of the target module receiving the message.
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from the target, if any.
+        """
+        url = f"http://{target_ip}:{target_port}/{route}"
+        payload = {
+            "port": self.port,
+            "message": message
+        }
+        try:
+            async with self._get_session().post(url, json=payload, headers=headers) as response:
+                if response.status == 200:
+                    return await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error sending message: {e}")
+        return None
+
+    async def async_send_messages(self, targets: List[Tuple[str, int, str]], message: str,
+                                  headers: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """
+        Send the same message to several target modules at the same time.
+
+        :param targets: The (ip, port, route) of each target module.
+        :param message: The message to send (typically a JSON string).
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from each target, in the same order of targets.
+        """
+        return list(await asyncio.gather(
+            *(self.async_send_message(ip, port, message, route, headers) for ip, port, route in targets)))
+
+    async def async_get_last_message(self) -> Dict:
+        """
+        Wait for a message to be received and return it.
+
+        :return: A dictionary containing the sender's IP, port, and the message content.
+        """
+        return await self.message_queue.get()
+
+    def send_message(self, target_ip: str, target_port: int, message: str, route: str = "send",
+                     headers: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Send a message to a target module and wait for the response.
+
+        :param target_ip: The IP address of the target module.
+        :param target_port: The port of the target module.
+        :param message: The message to send (typically a JSON string).
+        :param route: The route of the target module receiving the message.
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from the target, if any.
+        """
+        return self.submit(self.async_send_message(target_ip, target_port, message, route, headers)).result()
+
+    def send_messages(self, targets: List[Tuple[str, int, str]], message: str,
+                      headers: Optional[Dict] = None) -> List[Optional[Dict]]:
+        """
+        Send the same message to several target modules at the same time and wait for all the responses.
+
+        :param targets: The (ip, port, route) of each target module.
+        :param message: The message to send (typically a JSON string).
+        :param headers: Additional HTTP headers (e.g. the trace context).
+        :return: The response from each target, in the same order of targets.
+        """
+        return self.submit(self.async_send_messages(targets, message, headers)).result()
+
+    def get_last_message(self) -> Optional[Dict]:
+        """
+        Wait for a message to be received and return it.
+
+        :return: A dictionary containing the sender's IP, port, and the message content.
+        """
+        return self.submit(self.async_get_last_message()).result()
@@ -1,7 +1,9 @@
 from flask import Flask, request, jsonify
-import threading
 import requests
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from utility.http_client.http_client import HttpClient
+from utility.message_broker.message_inbox import MessageInbox, REJECT
+from utility.wsgi_server.wsgi_server import WsgiServer
 
 
 class MessageBroker:
@@ -9,22 +11,28 @@ class MessageBroker:
     A utility class to enable inter-module communication using Flask.
 
     This class supports sending and receiving messages in a blocking manner.
+    Received messages are kept in a bounded inbox, so they are not lost while nobody is waiting for them.
     """
 
-    def __init__(self, host: str = '0.0.0.0', port: int = 5000):
+    def __init__(self, host: str = '0.0.0.0', port: int = 5000, inbox_capacity: int = 1024,
+                 overflow_policy: str = REJECT, spill_path: Optional[str] = None):
         """
         Initialize the Flask communication server.
 
         :param host: The host address for the Flask server.
         :param port: The port number for the Flask server.
+        :param inbox_capacity: Maximum number of received messages kept in memory.
+        :param overflow_policy: Policy of a full inbox: reject (answer 503), drop_oldest or spill (to spill_path).
+        :param spill_path: File where the messages are spilled by the spill policy.
         """
         self.app = Flask(__name__)
         self.host = host
         self.port = port
-        self.last_message = None
+        # keep-alive connections shared by all the senders of the process
+        self.http_client = HttpClient.get_instance()
 
-        # Lock and condition for blocking behavior
-        self.message_condition = threading.Condition()
+        # Bounded FIFO of the received messages
+        self.inbox = MessageInbox(inbox_capacity, overflow_policy, spill_path)
 
         # Define a route to receive messages
         @self.app.route('/send', methods=['POST'])
@@ -34,23 +42,25 @@ class MessageBroker:
             sender_port = data.get('port')
             message = data.get('message')
 
-            with self.message_condition:
-                self.last_message = {
-                    'ip': sender_ip,
-                    'port': sender_port,
-                    'message': message
-                }
-                # Notify any threads waiting for a message
-                self.message_condition.notify_all()
+            accepted = self.inbox.put({
+                'ip': sender_ip,
+                'port': sender_port,
+                'message': message
+            })
+            if not accepted:
+                # the sender can retry later
+                return jsonify({"status": "error", "message": "Inbox full"}), 503
 
             return jsonify({"status": "received"}), 200
 
-    def start_server(self):
+    def start_server(self, serving: Optional[Dict] = None):
         """
         Start the Flask server in a separate thread.
+
+        :param serving: The serving parameters of the system configuration (backend, threads, connection_limit,
+                        keep_alive_timeout), None to use the development server.
         """
-        thread = threading.Thread(target=self.app.run, kwargs={'host': self.host, 'port': self.port}, daemon=True)
-        thread.start()
+        WsgiServer(self.app, self.host, self.port, serving).start()
 
     def send_message(self, target_ip: str, target_port: int, message: str) -> Optional[Dict]:
         """
@@ -67,28 +77,39 @@ class MessageBroker:
             "message": message
         }
         try:
-            response = requests.post(url, json=payload)
+            response = self.http_client.post(url, json=payload)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException as e:
             print(f"Error sending message: {e}")
         return None
 
-    def get_last_message(self) -> Optional[Dict]:
+    def get_last_message(self, timeout: Optional[float] = None) -> Optional[Dict]:
         """
        Wait for a message to be received and return it.
 
-        :return: A dictionary containing the sender's IP, port, and the message content.
+        :param timeout: Maximum time to wait (in seconds), None to wait indefinitely.
+        :return: A dictionary containing the sender's IP, port, and the message content (None if the timeout expired).
+        """
+        return self.inbox.get(timeout)
+
+    def get_messages(self, max_n: int, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Wait for a message to be received, then return up to max_n of the received messages.
+
+        :param max_n: Maximum number of messages to return.
+        :param timeout: Maximum time to wait for the first message (in seconds), None to wait indefinitely.
+        :return: The received messages in arrival order (empty if the timeout expired).
+        """
+        return self.inbox.get_messages(max_n, timeout)
+
+    def get_stats(self) -> Dict:
+        """
+        Get the counters of the inbox (depth, received, dropped, rejected and spilled messages).
+
+        :return: A dictionary with the counters.
         """
-        with self.message_condition:
-            # Wait until a message is received
-            while self.last_message is None:
-                self.message_condition.wait()
-
-            # Retrieve and clear the last message
-            message = self.last_message
-            self.last_message = None
-            return message
+        return self.inbox.stats()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, List
+
+# Overflow policies of a full inbox
+REJECT = "reject"
+DROP_OLDEST = "drop_oldest"
+SPILL = "spill"
+OVERFLOW_POLICIES = (REJECT, DROP_OLDEST, SPILL)
+
+
+class MessageInbox:
+    """
+    A bounded, thread-safe FIFO of the received messages.
+
+    When the inbox is full a new message is rejected (the receiver answers 503 so that the sender
+    can retry), replaces the oldest message, or is spilled to a file on disk and read back,
+    in order, as soon as there is room in memory.
+    """
+
+    def __init__(self, capacity: int = 1024, overflow_policy: str = REJECT, spill_path: Optional[str] = None):
+        """
+        Initialize the inbox.
+
+        :param capacity: Maximum number of messages kept in memory.
+        :param overflow_policy: What to do with a message received when the inbox is full (reject, drop_oldest, spill).
+        :param spill_path: File where the messages are spilled, required by the spill policy.
+        """
+        if capacity < 1:
+            raise ValueError("The inbox capacity must be at least 1")
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+        if overflow_policy == SPILL and spill_path is None:
+            raise ValueError("The spill overflow policy requires a spill_path")
+
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+        self.spill_path = spill_path
+
+        self._messages = deque()
+        self._condition = threading.Condition()
+
+        # Messages written to the spill file and not read back yet
+        self._spill_pending = 0
+        self._spill_writer = None
+        self._spill_reader = None
+
+        # Counters
+        self.received = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.spilled = 0
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of messages waiting to be retrieved, in memory and on disk.
+        """
+        with self._condition:
+            return len(self._messages) + self._spill_pending
+
+    def stats(self) -> Dict:
+        """
+        Get the counters of the inbox.
+
+        :return: A dictionary with the current depth and the number of received, dropped, rejected and spilled messages.
+        """
+        with self._condition:
+            return {
+                "depth": len(self._messages) + self._spill_pending,
+                "received": self.received,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "spilled": self.spilled
+            }
+
+    def put(self, message: Dict) -> bool:
+        """
+        Add a received message, applying the overflow policy if the inbox is full.
+
+        :param message: The message.
+        :return: False if the message was rejected, True otherwise.
+        """
+        with self._condition:
+            # once spilling started, new messages follow the spilled ones to keep the arrival order
+            if len(self._messages) >= self.capacity or self._spill_pending > 0:
+                if self.overflow_policy == REJECT:
+                    self.rejected += 1
+                    return False
+                if self.overflow_policy == DROP_OLDEST:
+                    self._messages.popleft()
+                    self.dropped += 1
+                    self._messages.append(message)
+                else:
+                    self._spill(message)
+            else:
+                self._messages.append(message)
+
+            self.received += 1
+            self._condition.notify()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Wait for a message and return it.
+
+        :param timeout: Maximum time to wait (in seconds), None to wait indefinitely.
+        :return: The oldest message, None if the timeout expired.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._messages, timeout):
+                return None
+            message = self._messages.popleft()
+            self._refill()
+            return message
+
+    def get_messages(self, max_messages: int, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Wait for at least one message, then return up to max_messages messages without waiting further.
+
+        :param max_messages: Maximum number of messages to return.
+        :param timeout: Maximum time to wait for the first message (in seconds), None to wait indefinitely.
+        :return: The oldest messages, in arrival order (empty if the timeout expired).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        messages = []
+        with self._condition:
+            while len(messages) < max_messages:
+                if not self._messages:
+                    if messages:
+                        break
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    if not self._condition.wait_for(lambda: self._messages, remaining):
+                        break
+                messages.append(self._messages.popleft())
+                self._refill()
+        return messages
+
+    def _spill(self, message: Dict) -> None:
+        if self._spill_writer is None:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._spill_writer = open(self.spill_path, "w", encoding="utf-8")
+            self._spill_reader = open(self.spill_path, "r", encoding="utf-8")
+        self._spill_writer.write(json.dumps(message) + "\n")
+        self._spill_writer.flush()
+        self._spill_pending += 1
+        self.spilled += 1
+
+    def _refill(self) -> None:
+        # move the spilled messages back to memory, in order, while there is room
+        while self._spill_pending > 0 and len(self._messages) < self.capacity:
+            self._messages.append(json.loads(self._spill_reader.readline()))
+            self._spill_pending -= 1
+
+        if self._spill_writer is not None and self._spill_pending == 0:
+            # the spill file is empty, it is truncated when the next message is spilled
+            self._spill_reader.close()
+            self._spill_writer.close()
+            self._spill_reader = None
+            self._spill_writer = None
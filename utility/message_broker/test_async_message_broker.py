@@ -0,0 +1,74 @@
+import json
+import unittest
+
+from utility.message_broker.async_message_broker import AsyncMessageBroker
+
+
+class TestAsyncMessageBroker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Setup three AsyncMessageBroker instances on different ports for testing communication.
+        """
+        cls.module_a = AsyncMessageBroker(host='127.0.0.1', port=5071)
+        cls.module_b = AsyncMessageBroker(host='127.0.0.1', port=5072)
+        cls.module_c = AsyncMessageBroker(host='127.0.0.1', port=5073)
+        for module in (cls.module_a, cls.module_b, cls.module_c):
+            module.start_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        for module in (cls.module_a, cls.module_b, cls.module_c):
+            module.stop_server()
+
+    def test_send_and_receive_message(self):
+        """
+        Test that a message sent from module_a is received by module_b.
+        """
+        message = json.dumps({"action": "test_action", "payload": "test_payload"})
+        response = self.module_a.send_message(target_ip=self.module_b.host, target_port=self.module_b.port,
+                                              message=message)
+
+        self.assertEqual(response, {"status": "received"})
+
+        received_message = self.module_b.get_last_message()
+        self.assertEqual(received_message['message'], message)
+        self.assertEqual(received_message['ip'], self.module_a.host)
+        self.assertEqual(received_message['port'], self.module_a.port)
+
+    def test_fan_out(self):
+        """
+        Test that the same message is sent to several modules at the same time.
+        """
+        targets = [(self.module_b.host, self.module_b.port, "send"), (self.module_c.host, self.module_c.port, "send")]
+        responses = self.module_a.send_messages(targets, "fan-out")
+
+        self.assertEqual(responses, [{"status": "received"}, {"status": "received"}])
+        self.assertEqual(self.module_b.get_last_message()['message'], "fan-out")
+        self.assertEqual(self.module_c.get_last_message()['message'], "fan-out")
+
+    def test_unreachable_target(self):
+        """
+        Test that a message sent to a module that is not running returns None.
+        """
+        responses = self.module_a.send_messages(
+            [(self.module_b.host, self.module_b.port, "send"), ('127.0.0.1', 5079, "send")], "partial")
+
+        self.assertEqual(responses, [{"status": "received"}, None])
+        self.assertEqual(self.module_b.get_last_message()['message'], "partial")
+
+    def test_awaitable_api(self):
+        """
+        Test the coroutines on the broker event loop.
+        """
+        async def exchange():
+            await self.module_c.async_send_message(self.module_c.host, self.module_c.port, "awaited")
+            return await self.module_c.async_get_last_message()
+
+        # the client session and the queue of module_c are bound to module_c loop
+        received_message = self.module_c.submit(exchange()).result(timeout=5)
+        self.assertEqual(received_message['message'], "awaited")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from utility.message_broker.message_inbox import MessageInbox, REJECT, DROP_OLDEST, SPILL
+
+
+class TestMessageInbox(unittest.TestCase):
+    """
+    A test class for testing the MessageInbox class.
+    """
+
+    def test_reject_when_full(self):
+        inbox = MessageInbox(capacity=2, overflow_policy=REJECT)
+
+        self.assertTrue(inbox.put({"message": 1}))
+        self.assertTrue(inbox.put({"message": 2}))
+        self.assertFalse(inbox.put({"message": 3}))
+
+        self.assertEqual(inbox.stats(), {"depth": 2, "received": 2, "dropped": 0, "rejected": 1, "spilled": 0})
+        self.assertEqual(inbox.get()["message"], 1)
+        self.assertTrue(inbox.put({"message": 3}))
+
+    def test_drop_oldest_when_full(self):
+        inbox = MessageInbox(capacity=2, overflow_policy=DROP_OLDEST)
+        for number in range(4):
+            inbox.put({"message": number})
+
+        self.assertEqual([message["message"] for message in inbox.get_messages(10, 0)], [2, 3])
+        self.assertEqual(inbox.stats()["dropped"], 2)
+
+    def test_spill_keeps_arrival_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            inbox = MessageInbox(capacity=3, overflow_policy=SPILL, spill_path=os.path.join(directory, "spill.jsonl"))
+            for number in range(10):
+                self.assertTrue(inbox.put({"message": number}))
+            self.assertEqual(inbox.depth, 10)
+
+            received = [inbox.get()["message"] for _ in range(4)]
+            # new messages follow the spilled ones
+            inbox.put({"message": 10})
+            received += [message["message"] for message in inbox.get_messages(20, 0)]
+
+            self.assertEqual(received, list(range(11)))
+            self.assertEqual(inbox.stats()["spilled"], 8)
+            self.assertEqual(inbox.depth, 0)
+
+    def test_get_messages_waits_for_the_first_message(self):
+        inbox = MessageInbox(capacity=10)
+        threading.Timer(0.1, lambda: [inbox.put({"message": number}) for number in range(3)]).start()
+
+        start = time.monotonic()
+        messages = inbox.get_messages(5, timeout=2)
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertGreaterEqual(len(messages), 1)
+        self.assertEqual(inbox.get_messages(5, timeout=0.05), [])
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            MessageInbox(capacity=0)
+        with self.assertRaises(ValueError):
+            MessageInbox(overflow_policy="block")
+        with self.assertRaises(ValueError):
+            MessageInbox(overflow_policy=SPILL)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from service_class.LogWriter import LogWriter
+from service_class.TraceCollector import TraceCollector
+from utility.tracing.tracer import Tracer, TRACE_HEADER, parse_context
+
+
+class _CollectorHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.packets.append(json.loads(json.loads(body)["message"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _CollectorHandler)
+        self.server.packets = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.collector_url = f"http://127.0.0.1:{self.server.server_address[1]}/Trace"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _spans(self):
+        return [span for packet in self.server.packets for span in packet["spans"]]
+
+    def test_parse_context(self):
+        self.assertEqual(parse_context("1234/abcd"), ("1234", "abcd"))
+        self.assertEqual(parse_context(None), (None, None))
+        self.assertEqual(parse_context("malformed"), (None, None))
+
+    def test_disabled_tracer(self):
+        tracer = Tracer("Ingestion System")
+        self.assertFalse(tracer.enabled)
+
+        tracer.receive("1234")
+        self.assertEqual(tracer.context("1234"), {})
+        tracer.send("1234")
+        tracer.close()
+
+    def test_context_propagation(self):
+        ingestion = Tracer("Ingestion System", self.collector_url, flush_interval=60)
+        preparation = Tracer("Preparation System", self.collector_url, flush_interval=60)
+
+        ingestion.receive("1234", timestamp=1.0)
+        ingestion.process("1234", timestamp=2.0)
+        headers = ingestion.context("1234")
+        ingestion.send("1234", timestamp=3.0)
+
+        preparation.receive("1234", headers[TRACE_HEADER], timestamp=4.0)
+        preparation.end("1234", timestamp=5.0)
+
+        ingestion.close()
+        preparation.close()
+
+        spans = {span["system"]: span for span in self._spans()}
+        self.assertEqual(set(spans), {"Ingestion System", "Preparation System"})
+        self.assertIsNone(spans["Ingestion System"]["parent_id"])
+        self.assertEqual(spans["Preparation System"]["parent_id"], spans["Ingestion System"]["span_id"])
+        self.assertEqual(spans["Ingestion System"]["sent"], 3.0)
+        self.assertEqual(spans["Preparation System"]["processed"], 5.0)
+
+    def test_report_batch(self):
+        tracer = Tracer("Segregation System", self.collector_url, flush_interval=60, batch_size=2)
+        tracer.record("1", None, received=1.0, processed=1.5)
+        tracer.record("2", None, received=2.0, processed=2.5)
+
+        # the batch is full: it is reported without waiting for the flush interval
+        for _ in range(100):
+            if self.server.packets:
+                break
+            threading.Event().wait(0.05)
+        tracer.close()
+
+        self.assertEqual(len(self.server.packets), 1)
+        self.assertEqual(self.server.packets[0]["system"], "Segregation System")
+        self.assertEqual([span["trace_id"] for span in self._spans()], ["1", "2"])
+
+
+class TestTraceCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.collector = TraceCollector(self.directory.name)
+
+    def tearDown(self):
+        self.collector.close()
+        self.directory.cleanup()
+
+    def _add_session(self, trace_id, offset):
+        self.collector.add_spans([
+            {"trace_id": trace_id, "span_id": "a", "parent_id": None, "system": "Ingestion System",
+             "received": 0.0, "processed": 1.0, "sent": 1.5},
+            {"trace_id": trace_id, "span_id": "b", "parent_id": "a", "system": "Preparation System",
+             "received": 2.0 + offset, "processed": 4.0 + offset, "sent": None},
+        ])
+
+    def test_breakdown(self):
+        self._add_session("1234", 0.0)
+
+        self.assertEqual(self.collector.breakdown("1234"), {
+            "Ingestion System": 1.0,
+            "Ingestion System send": 0.5,
+            "Ingestion System -> Preparation System": 0.5,
+            "Preparation System": 2.0,
+            "end_to_end": 4.0
+        })
+        self.assertEqual(self.collector.breakdown("unknown"), {})
+
+    def test_summary(self):
+        for number in range(101):
+            self._add_session(str(number), number / 100)
+
+        summary = self.collector.summary()
+        self.assertEqual(summary["end_to_end"]["count"], 101)
+        self.assertAlmostEqual(summary["end_to_end"]["p50"], 4.5)
+        self.assertAlmostEqual(summary["end_to_end"]["p99"], 4.99)
+        self.assertAlmostEqual(summary["Ingestion System"]["p95"], 1.0)
+
+        self.collector.write_summary()
+        with open(self.collector.summary_path) as summary_file:
+            self.assertEqual(json.load(summary_file), summary)
+
+        self.collector.close()
+        with open(self.collector.trace_log_path) as log_file:
+            self.assertEqual(len(log_file.readlines()), 1 + 2 * 101)
+
+    def test_bounded_memory(self):
+        collector = TraceCollector(self.directory.name, max_traces=10, max_samples=50)
+        self.collector.close()
+        self.collector = collector
+        for number in range(101):
+            self._add_session(str(number), number / 100)
+
+        # the oldest sessions are folded into the latency samples of their stages
+        self.assertEqual(len(collector.spans), 10)
+        self.assertEqual(len(collector.samples["end_to_end"]), 50)
+        self.assertEqual(collector.breakdown("0"), {})
+        self.assertEqual(collector.breakdown("100")["end_to_end"], 5.0)
+
+        summary = collector.summary()
+        self.assertEqual(summary["end_to_end"]["count"], 101)
+        self.assertEqual(summary["Ingestion System"]["count"], 101)
+        # percentiles of the 50 most recent folded sessions and of the 10 kept
+        self.assertAlmostEqual(summary["end_to_end"]["p50"], 4.705)
+
+    def test_idle_sessions_folded(self):
+        collector = TraceCollector(self.directory.name, idle_timeout=0)
+        self.collector.close()
+        self.collector = collector
+        self._add_session("1234", 0.0)
+
+        self.assertEqual(collector.spans, {})
+        self.assertEqual(collector.summary()["end_to_end"], {"count": 1, "p50": 4.0, "p95": 4.0, "p99": 4.0})
+
+
+class TestLogWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "log.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _lines(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as log_file:
+            return log_file.read().splitlines()
+
+    def _wait_lines(self, count):
+        for _ in range(100):
+            if len(self._lines()) >= count:
+                break
+            time.sleep(0.02)
+        return self._lines()
+
+    def test_flush_when_buffer_full(self):
+        writer = LogWriter(self.path, flush_interval=60, buffer_size=3)
+        writer.write("1")
+        writer.write("2")
+        time.sleep(0.1)
+        self.assertEqual(self._lines(), [])
+
+        # the third line fills the buffer: written without waiting for the flush interval
+        writer.write("3")
+        self.assertEqual(self._wait_lines(3), ["1", "2", "3"])
+        writer.close()
+
+    def test_flush_after_interval(self):
+        writer = LogWriter(self.path, flush_interval=0.3, buffer_size=1000)
+        start = time.monotonic()
+        writer.write("1")
+        self.assertEqual(self._lines(), [])
+
+        self.assertEqual(self._wait_lines(1), ["1"])
+        self.assertLess(time.monotonic() - start, 1.0)
+        writer.close()
+
+    def test_close_writes_remaining_lines(self):
+        writer = LogWriter(self.path, flush_interval=60, buffer_size=1000)
+        for number in range(10):
+            writer.write(str(number))
+        writer.close()
+        self.assertEqual(self._lines(), [str(number) for number in range(10)])
+
+        # a line logged after the close is written immediately
+        writer.write("10")
+        self.assertEqual(self._lines()[-1], "10")
+        writer.close()
+
+    def test_rewrite_drops_pending_lines(self):
+        writer = LogWriter(self.path, flush_interval=60, buffer_size=1000)
+        writer.write("old")
+        writer.rewrite("header")
+        self.assertEqual(self._lines(), ["header"])
+
+        writer.write("1")
+        writer.close()
+        self.assertEqual(self._lines(), ["header", "1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+import requests
+
+from utility.http_client.http_client import HttpClient
+
+# header carrying the trace context of a message: "<trace id>/<span id of the sender>"
+TRACE_HEADER = "X-Trace-Context"
+
+# Tracing parameters used when they are missing from the configuration
+DEFAULT_TRACING = {
+    "enabled": False,
+    "collector_ip": "127.0.0.1",
+    "collector_port": 5010,
+    "flush_interval": 1.0,
+    "batch_size": 100
+}
+
+
+def parse_context(context: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Read the trace context of a received message.
+
+    :param context: Value of the TRACE_HEADER header, None if the message has no trace context.
+    :return: The trace id and the span id of the sender, (None, None) if the context is missing or malformed.
+    """
+    if not context or "/" not in context:
+        return None, None
+    trace_id, _, parent_id = context.rpartition("/")
+    return trace_id, parent_id
+
+
+class Tracer:
+    """
+    Records the spans of the sessions handled by a system and reports them to the Service Class.
+
+    A trace is a session (the trace id is the session uuid), a span is the passage of the session through
+    a system: its receive, process and send times. The span id of the sender travels with each message
+    in the TRACE_HEADER header, so the Service Class can put the hops in order.
+
+    The finished spans are sent in batches by a background thread, a disabled tracer does nothing.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, system: str, collector_url: Optional[str] = None, flush_interval: float = 1.0,
+                 batch_size: int = 100, max_open_spans: int = 10000):
+        """
+        Initialize the tracer.
+
+        :param system: Name of the system recording the spans.
+        :param collector_url: URL of the /Trace route of the Service Class, None to disable the tracer.
+        :param flush_interval: Maximum time (in seconds) a finished span waits before being reported.
+        :param batch_size: Number of finished spans that triggers a report.
+        :param max_open_spans: Maximum number of spans not finished yet, the oldest ones are discarded.
+        """
+        self.system = system
+        self.collector_url = collector_url
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_open_spans = max_open_spans
+
+        # trace id -> span not finished yet
+        self._open_spans = OrderedDict()
+        # finished spans not reported yet
+        self._finished_spans = []
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._thread = None
+        if self.enabled:
+            self._thread = threading.Thread(target=self._report_loop, daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.collector_url is not None
+
+    @classmethod
+    def get_instance(cls) -> "Tracer":
+        """
+        Get the tracer of the process, a disabled one if it has not been configured.
+
+        :return: The shared Tracer instance.
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls("unknown")
+            return cls._instance
+
+    @classmethod
+    def configure(cls, system: str, tracing: Optional[Dict] = None) -> "Tracer":
+        """
+        Replace the tracer of the process with one created from the tracing parameters of the system configuration.
+
+        :param system: Name of the system.
+        :param tracing: The tracing parameters (enabled, collector_ip, collector_port, flush_interval, batch_size),
+                        the missing ones take the default value.
+        :return: The new shared Tracer instance.
+        """
+        tracing = {**DEFAULT_TRACING, **(tracing or {})}
+        collector_url = None
+        if tracing["enabled"]:
+            collector_url = f"http://{tracing['collector_ip']}:{tracing['collector_port']}/Trace"
+
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.close()
+            cls._instance = cls(system, collector_url, tracing["flush_interval"], tracing["batch_size"])
+            return cls._instance
+
+    def receive(self, trace_id: str, context: Optional[str] = None, timestamp: Optional[float] = None) -> None:
+        """
+        Open the span of a session received by the system.
+
+        :param trace_id: The session uuid.
+        :param context: Value of the TRACE_HEADER header of the received message, None if the system is the first one.
+        :param timestamp: Receive time, now if None.
+        """
+        if not self.enabled:
+            return
+        span = self._new_span(trace_id, context, timestamp)
+        with self._condition:
+            self._open_spans[trace_id] = span
+            self._open_spans.move_to_end(trace_id)
+            if len(self._open_spans) > self.max_open_spans:
+                # a session dropped by the system: its span is never finished
+                self._open_spans.popitem(last=False)
+
+    def process(self, trace_id: str, timestamp: Optional[float] = None) -> None:
+        """
+        Record the end of the processing of a session.
+
+        :param trace_id: The session uuid.
+        :param timestamp: Process time, now if None.
+        """
+        if not self.enabled:
+            return
+        with self._condition:
+            span = self._open_spans.get(trace_id)
+            if span is not None:
+                span["processed"] = timestamp if timestamp is not None else time.time()
+
+    def context(self, trace_id: str) -> Dict[str, str]:
+        """
+        Get the trace context to send with the messages of a session.
+
+        :param trace_id: The session uuid.
+        :return: The headers to add to the messages, empty if the session is not traced.
+        """
+        if not self.enabled:
+            return {}
+        with self._condition:
+            span = self._open_spans.get(trace_id)
+        if span is None:
+            return {}
+        return {TRACE_HEADER: f"{trace_id}/{span['span_id']}"}
+
+    def send(self, trace_id: str, timestamp: Optional[float] = None) -> None:
+        """
+        Record the send time of a session and finish its span.
+
+        :param trace_id: The session uuid.
+        :param timestamp: Send time, now if None.
+        """
+        self._finish(trace_id, "sent", timestamp)
+
+    def end(self, trace_id: str, timestamp: Optional[float] = None) -> None:
+        """
+        Finish the span of a session that is not sent to another system.
+
+        :param trace_id: The session uuid.
+        :param timestamp: Process time, if the processing end has not been recorded yet (now if None).
+        """
+        self._finish(trace_id, "processed", timestamp)
+
+    def record(self, trace_id: str, context: Optional[str], received: float, processed: Optional[float] = None) -> None:
+        """
+        Record the whole span of a message handled as soon as it is received (e.g. a label at the end of the pipeline).
+
+        :param trace_id: The session uuid.
+        :param context: Value of the TRACE_HEADER header of the received message.
+        :param received: Receive time.
+        :param processed: Process time, now if None.
+        """
+        if not self.enabled:
+            return
+        span = self._new_span(trace_id, context, received)
+        span["processed"] = processed if processed is not None else time.time()
+        self._report(span)
+
+    def _new_span(self, trace_id: str, context: Optional[str], timestamp: Optional[float]) -> Dict:
+        _, parent_id = parse_context(context)
+        return {
+            "trace_id": trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent_id,
+            "system": self.system,
+            "received": timestamp if timestamp is not None else time.time(),
+            "processed": None,
+            "sent": None
+        }
+
+    def _finish(self, trace_id: str, field: str, timestamp: Optional[float]) -> None:
+        if not self.enabled:
+            return
+        with self._condition:
+            span = self._open_spans.pop(trace_id, None)
+        if span is None:
+            return
+        if span[field] is None:
+            span[field] = timestamp if timestamp is not None else time.time()
+        if span["processed"] is None:
+            span["processed"] = span["sent"]
+        self._report(span)
+
+    def _report(self, span: Dict) -> None:
+        with self._condition:
+            self._finished_spans.append(span)
+            if len(self._finished_spans) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self) -> None:
+        """
+        Send the finished spans to the Service Class.
+        """
+        with self._condition:
+            spans, self._finished_spans = self._finished_spans, []
+        if not spans:
+            return
+
+        packet = {
+            "port": None,
+            "message": json.dumps({"system": self.system, "spans": spans})
+        }
+        try:
+            response = HttpClient.get_instance().post(self.collector_url, json=packet)
+            if response.status_code != 200:
+                print(f"Spans not accepted by the Service Class: {response.status_code}")
+        except requests.RequestException as e:
+            # the tracing must not stop the system: the spans are lost
+            print(f"Error sending spans: {e}")
+
+    def close(self) -> None:
+        """
+        Send the finished spans and stop the background reporter.
+        """
+        if self._thread is None:
+            return
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+    def _report_loop(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or len(self._finished_spans) >= self.batch_size,
+                                         self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
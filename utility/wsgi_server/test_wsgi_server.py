@@ -0,0 +1,57 @@
+import unittest
+
+from flask import Flask, request, jsonify
+
+from utility.http_client.http_client import HttpClient
+from utility.wsgi_server.wsgi_server import WsgiServer
+
+
+class TestWsgiServer(unittest.TestCase):
+    """
+    A test class for testing the WsgiServer class.
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.received = []
+
+        @self.app.route('/send', methods=['POST'])
+        def receive_message():
+            self.received.append({'ip': request.remote_addr, 'message': request.json.get('message')})
+            return jsonify({"status": "received"}), 200
+
+    def test_waitress_backend(self):
+        """
+        Test that the waitress backend serves the Flask routes with the sender address.
+        """
+        server = WsgiServer(self.app, '127.0.0.1', 0, {"backend": "waitress", "threads": 2})
+        server.start()
+        client = HttpClient(timeout=2.0)
+        try:
+            for number in range(3):
+                response = client.post(f"http://127.0.0.1:{server.effective_port}/send",
+                                       json={"port": 5000, "message": str(number)})
+                self.assertEqual(response.json(), {"status": "received"})
+        finally:
+            client.close()
+            server.stop()
+
+        self.assertEqual([message['message'] for message in self.received], ["0", "1", "2"])
+        self.assertEqual(self.received[0]['ip'], '127.0.0.1')
+
+    def test_default_serving_parameters(self):
+        """
+        Test that the missing serving parameters take the default value.
+        """
+        server = WsgiServer(self.app, '127.0.0.1', 5000, {"backend": "waitress"})
+
+        self.assertEqual(server.serving["threads"], 8)
+        self.assertEqual(WsgiServer(self.app, '127.0.0.1', 5000).serving["backend"], "development")
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            WsgiServer(self.app, '127.0.0.1', 5000, {"backend": "gunicorn"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import threading
+from typing import Optional, Dict
+
+from flask import Flask
+
+# Serving backends
+DEVELOPMENT = "development"
+WAITRESS = "waitress"
+BACKENDS = (DEVELOPMENT, WAITRESS)
+
+# Serving parameters used when they are missing from the configuration
+DEFAULT_SERVING = {
+    "backend": DEVELOPMENT,
+    "threads": 8,
+    "connection_limit": 100,
+    "keep_alive_timeout": 30
+}
+
+
+class WsgiServer:
+    """
+    Serves a Flask application with the backend chosen in the system configuration.
+
+    - development: the Werkzeug development server of Flask (one thread for each request).
+    - waitress: a production WSGI server with a fixed pool of worker threads, a limit on the open
+      connections and keep-alive connections closed after keep_alive_timeout seconds of inactivity.
+
+    Only multi-threaded servers are supported: the systems hand the received messages to the
+    orchestrator through in-process queues, so the application must run in a single process.
+    """
+
+    def __init__(self, app: Flask, host: str, port: int, serving: Optional[Dict] = None):
+        """
+        Initialize the server.
+
+        :param app: The Flask application.
+        :param host: The host address of the server.
+        :param port: The port number of the server.
+        :param serving: The serving parameters (backend, threads, connection_limit, keep_alive_timeout),
+                        the missing ones take the default value.
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.serving = {**DEFAULT_SERVING, **(serving or {})}
+        if self.serving["backend"] not in BACKENDS:
+            raise ValueError(f"Unknown serving backend '{self.serving['backend']}', expected one of {BACKENDS}")
+
+        self._server = None
+
+    def _create_waitress_server(self):
+        try:
+            from waitress import create_server
+        except ImportError as e:
+            raise ImportError("The waitress serving backend requires the waitress package") from e
+
+        return create_server(self.app, host=self.host, port=self.port,
+                             threads=self.serving["threads"],
+                             connection_limit=self.serving["connection_limit"],
+                             channel_timeout=self.serving["keep_alive_timeout"])
+
+    def serve(self) -> None:
+        """
+        Serve the application, blocking the calling thread.
+        """
+        if self.serving["backend"] == WAITRESS:
+            if self._server is None:
+                self._server = self._create_waitress_server()
+            self._server.run()
+        else:
+            self.app.run(host=self.host, port=self.port, threaded=True)
+
+    def start(self) -> threading.Thread:
+        """
+        Serve the application in a separate thread.
+
+        :return: The server thread.
+        """
+        if self.serving["backend"] == WAITRESS:
+            # the socket is bound here, so binding errors are raised to the caller
+            self._server = self._create_waitress_server()
+
+        thread = threading.Thread(target=self.serve, daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def effective_port(self) -> int:
+        """
+        The port the server is listening on (differs from port when port is 0 with the waitress backend).
+        """
+        if self._server is not None:
+            return self._server.effective_port
+        return self.port
+
+    def stop(self) -> None:
+        """
+        Stop the waitress server (the development server runs until the process exits).
+        """
+        if self._server is not None:
+            self._server.close()
+            self._server = None